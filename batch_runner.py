@@ -0,0 +1,201 @@
+"""Run a questions file through both pipelines concurrently.
+
+Every (question, pipeline) pair is one job; up to `--concurrency` jobs run at
+once against a single warm `query_server.QueryService`, so the wall time of the
+set approaches that of the slowest question instead of the sum. All answers go
+into one `run_result_writer` session file, in questions-file order.
+
+    python3 batch_runner.py questions.json --concurrency 8
+
+Questions file (JSON, or YAML with a .yaml/.yml extension): either a list of
+questions, or {"questions": [...]}. An entry is a string or
+{"question": "...", "pipelines": ["rag", "graph_rag"]}.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+# Project root and graph_rag/ (for its sibling-module imports) on sys.path
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_ROOT)
+sys.path.append(os.path.join(_ROOT, "graph_rag"))
+from config import settings, ensure_openai_key
+from logger_factory import bind, get_logger, new_run_id
+from query_timing import QueryAnswer, format_timings
+from run_result_writer import create_run_session_file, write_run_result
+
+log = get_logger("batch_runner")
+
+PIPELINES = ("rag", "graph_rag")
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    index: int
+    question: str
+    pipeline: str
+
+
+@dataclass(frozen=True)
+class BatchOutcome:
+    job: BatchJob
+    answer: Optional[QueryAnswer]
+    error: Optional[str]
+    latency_s: float
+
+
+def load_questions(path: str, *, default_pipelines: tuple[str, ...] = PIPELINES) -> list[BatchJob]:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError as e:  # pragma: no cover
+                raise RuntimeError("YAML questions files need PyYAML: pip install pyyaml") from e
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("questions")
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a list of questions (or {{'questions': [...]}})")
+
+    jobs: list[BatchJob] = []
+    for entry in data:
+        if isinstance(entry, str):
+            question, pipelines = entry, default_pipelines
+        elif isinstance(entry, dict) and entry.get("question"):
+            question = entry["question"]
+            pipelines = tuple(entry.get("pipelines") or default_pipelines)
+        else:
+            raise ValueError(f"{path}: bad question entry {entry!r}")
+        for p in pipelines:
+            if p not in PIPELINES:
+                raise ValueError(f"{path}: unknown pipeline {p!r} for question {question!r}")
+            jobs.append(BatchJob(index=len(jobs), question=str(question).strip(), pipeline=p))
+    return jobs
+
+
+def run_batch(
+    answer_fn: Callable[[str, str], QueryAnswer],
+    jobs: list[BatchJob],
+    *,
+    concurrency: int,
+    on_outcome: Optional[Callable[[BatchOutcome], None]] = None,
+) -> list[BatchOutcome]:
+    """Run `jobs` with at most `concurrency` in flight.
+
+    `on_outcome` is called on the calling thread in job order: an outcome is
+    held back until every earlier job has finished, so records stay ordered.
+    """
+
+    def run(job: BatchJob) -> BatchOutcome:
+        t0 = time.perf_counter()
+        try:
+            answer = answer_fn(job.pipeline, job.question)
+            return BatchOutcome(job=job, answer=answer, error=None, latency_s=time.perf_counter() - t0)
+        except Exception as e:
+            log.exception("Job %d (%s) failed: %s", job.index, job.pipeline, e)
+            return BatchOutcome(job=job, answer=None, error=f"{type(e).__name__}: {e}", latency_s=time.perf_counter() - t0)
+
+    outcomes: dict[int, BatchOutcome] = {}
+    next_index = 0
+    with ThreadPoolExecutor(max_workers=max(1, int(concurrency)), thread_name_prefix="batch") as pool:
+        futures: list[Future] = [pool.submit(run, job) for job in jobs]
+        for fut in as_completed(futures):
+            outcome = fut.result()
+            outcomes[outcome.job.index] = outcome
+            while next_index in outcomes and on_outcome is not None:
+                on_outcome(outcomes[next_index])
+                next_index += 1
+    return [outcomes[j.index] for j in jobs]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a questions file through both pipelines concurrently")
+    parser.add_argument("questions", help="Questions file (.json, .yaml or .yml)")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.batch_concurrency,
+        help="Jobs (question x pipeline) in flight (default: BATCH_CONCURRENCY)",
+    )
+    parser.add_argument(
+        "--pipelines",
+        default=",".join(PIPELINES),
+        help="Comma-separated default pipelines for plain-string questions",
+    )
+    args = parser.parse_args()
+
+    default_pipelines = tuple(p.strip() for p in args.pipelines.split(",") if p.strip())
+    jobs = load_questions(args.questions, default_pipelines=default_pipelines)
+    if not jobs:
+        print("No questions to run.")
+        return 0
+
+    ensure_openai_key()
+    # Imported here so `--help` and bad questions files fail fast.
+    from query_server import QueryService
+
+    log_ctx = bind(log, run_id=new_run_id(), source="batch", op="batch_run")
+    session = create_run_session_file(header=f"batch_runner {os.path.basename(args.questions)}")
+    # write_run_result appends to the session file while this is set.
+    os.environ["RUN_RESULTS_PATH"] = session.path
+    log_ctx.info("Writing all results to %s", session.path, path=session.path)
+
+    service = QueryService(tuple(sorted({j.pipeline for j in jobs}, key=PIPELINES.index)))
+
+    def record(outcome: BatchOutcome) -> None:
+        job = outcome.job
+        if outcome.answer is None:
+            answer = f"ERROR: {outcome.error}"
+            detail = outcome.error
+            write_run_result(question=job.question, answer=answer, source=job.pipeline, error=outcome.error)
+        else:
+            answer = outcome.answer.answer
+            detail = format_timings(outcome.answer.timings)
+            write_run_result(
+                question=job.question,
+                answer=answer,
+                source=job.pipeline,
+                timings=outcome.answer.timings,
+                metrics=outcome.answer.metrics,
+                sources=outcome.answer.sources,
+            )
+        log_ctx.info("[%d/%d] %s: %s", job.index + 1, len(jobs), job.pipeline, detail)
+
+    t0 = time.perf_counter()
+    try:
+        outcomes = run_batch(
+            lambda pipeline, question: service.answer(pipeline, question),
+            jobs,
+            concurrency=args.concurrency,
+            on_outcome=record,
+        )
+    finally:
+        service.close()
+    wall_s = time.perf_counter() - t0
+
+    failed = sum(1 for o in outcomes if o.error)
+    sequential_s = sum(o.latency_s for o in outcomes)
+    slowest_s = max(o.latency_s for o in outcomes)
+    log_ctx.info(
+        "Batch finished: %d job(s), %d failed; wall %0.2fs vs. %0.2fs sequential (slowest job %0.2fs)",
+        len(outcomes),
+        failed,
+        wall_s,
+        sequential_s,
+        slowest_s,
+        path=session.path,
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""GraphRAG question throughput: the blocking query path vs. `aanswer_question` on one event loop.
+
+Runs the full question path of `graph_rag/query.py` (embedding, vector lookup,
+graph expansion, prompt, streamed answer) against local fakes:
+
+- Neo4j: the in-memory graph from `data/` (`fakes.FakeGraphDriver` /
+  `FakeAsyncGraphDriver`), `--db-latency` per statement
+- embeddings: `fakes.FakeEmbedder`, `--embed-latency` per question
+- LLM: the real `OpenAILLM` clients against `fakes.FakeOpenAIServer`, the first
+  word after `--ttft`, then one word per `--token-latency`
+
+Modes, at every `--concurrency` level:
+
+- sync: `answer_question` one after another. This is what the blocking path gets
+  on an event loop whatever the concurrency, so it runs once as the baseline.
+- threads: `answer_question` on a thread pool of that size (the query server's model)
+- async: `aanswer_question` tasks on one event loop, at most that many in flight
+
+Every mode must produce the same answers as the baseline.
+
+    python benchmarks/async_query_bench.py --questions 64 --concurrency 1,8,32
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+if __name__ == "__main__":
+    # Ensure project root (and graph_rag/ for its sibling-module imports) on sys.path
+    _root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.append(_root)
+    sys.path.append(os.path.join(_root, "graph_rag"))
+    # Offline and quiet: nothing below talks to OpenAI, Neo4j or the on-disk caches.
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    os.environ.update(TRACE_EXPORTER="none", QUERY_CACHE="0", EMBED_CACHE="0", RETRIEVAL_BACKEND="neo4j")
+import query as graph_rag_query
+from neo4j_graphrag.llm import OpenAILLM
+
+from chunk_utils import get_documents
+from fakes import FakeAsyncGraphDriver, FakeEmbedder, FakeGraphDriver, FakeOpenAIServer, percentile
+from retrieval_bench import GOLDEN_PATH, load_golden
+
+
+def _summary(mode: str, concurrency: int, wall_s: float, latencies: list[float], timeouts: int) -> dict:
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "wall_s": wall_s,
+        "qps": len(latencies) / wall_s if wall_s else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000.0,
+        "p95_ms": percentile(latencies, 95) * 1000.0,
+        "timeouts": timeouts,
+    }
+
+
+def _timed_sync(question: str) -> tuple[str, float]:
+    t0 = time.perf_counter()
+    answer = graph_rag_query.answer_question(question).answer
+    return answer, time.perf_counter() - t0
+
+
+def run_sync(questions: list[str], *, concurrency: int) -> tuple[dict, dict[int, str]]:
+    answers: dict[int, str] = {}
+    latencies: list[float] = []
+    t0 = time.perf_counter()
+    if concurrency <= 1:
+        for i, question in enumerate(questions):
+            answers[i], latency = _timed_sync(question)
+            latencies.append(latency)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for i, (answer, latency) in enumerate(pool.map(_timed_sync, questions)):
+                answers[i] = answer
+                latencies.append(latency)
+    wall_s = time.perf_counter() - t0
+    return _summary("sync" if concurrency <= 1 else "threads", concurrency, wall_s, latencies, 0), answers
+
+
+async def run_async(questions: list[str], *, concurrency: int, timeout: float) -> tuple[dict, dict[int, str]]:
+    answers: dict[int, str] = {}
+    latencies: list[float] = []
+    timeouts = 0
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(i: int, question: str) -> None:
+        nonlocal timeouts
+        async with limit:
+            t0 = time.perf_counter()
+            try:
+                result = await graph_rag_query.aanswer_question(question, timeout=timeout)
+            except asyncio.TimeoutError:
+                timeouts += 1
+                return
+            latencies.append(time.perf_counter() - t0)
+            answers[i] = result.answer
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i, q) for i, q in enumerate(questions)))
+    wall_s = time.perf_counter() - t0
+    return _summary("async", concurrency, wall_s, latencies, timeouts), answers
+
+
+async def run_async_levels(questions: list[str], levels: list[int], *, timeout: float) -> list[tuple[dict, dict[int, str]]]:
+    # One loop for every level: the async OpenAI client's connections belong to it.
+    try:
+        return [await run_async(questions, concurrency=c, timeout=timeout) for c in levels]
+    finally:
+        await graph_rag_query.llm.async_client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="GraphRAG query throughput: blocking vs. async path (local fakes)")
+    parser.add_argument("--questions", type=int, default=32, help="Questions per run (golden questions, repeated)")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated questions in flight")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="Fake Neo4j latency per statement (s)")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Fake embedding latency per question (s)")
+    parser.add_argument("--ttft", type=float, default=0.15, help="Fake LLM time to the first answer word (s)")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="Fake LLM time per further answer word (s)")
+    parser.add_argument("--answer-words", type=int, default=20, help="Words per fake answer")
+    parser.add_argument("--timeout", type=float, default=0, help="Per-question timeout on the async path (0 = none)")
+    parser.add_argument("--skip-threads", action="store_true", help="Only compare the sequential and async paths")
+    args = parser.parse_args()
+
+    golden = [item["question"] for item in load_golden(GOLDEN_PATH)]
+    questions = [golden[i % len(golden)] for i in range(args.questions)]
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    documents = get_documents()
+    chunks = [(d.metadata["source"], int(d.metadata["chunk_index"]), d.page_content) for d in documents]
+    expansion = graph_rag_query.EXPANSION
+    graph = FakeGraphDriver(
+        chunks,
+        FakeEmbedder(),
+        hops=expansion.hops,
+        max_entities=expansion.max_entities,
+        max_relations=expansion.max_relations,
+        hub_degree=expansion.hub_degree,
+        max_facts=expansion.max_facts,
+        latency_s=args.db_latency,
+    )
+    graph_rag_query.driver = graph
+    graph_rag_query.async_driver = FakeAsyncGraphDriver(graph)
+    graph_rag_query.embeddings = FakeEmbedder(latency_s=args.embed_latency)
+    graph_rag_query.query_cache = None
+    graph_rag_query.local_index = None
+
+    print(
+        f"questions={len(questions)} db={args.db_latency * 1000:.0f}ms embed={args.embed_latency * 1000:.0f}ms "
+        f"ttft={args.ttft * 1000:.0f}ms answer={args.answer_words}x{args.token_latency * 1000:.0f}ms"
+    )
+    print(f"{'mode':>8} {'conc':>5} {'wall_s':>7} {'q/s':>7} {'p50_ms':>8} {'p95_ms':>8} {'speedup':>8} {'timeouts':>8}  answers")
+    server = FakeOpenAIServer(latency_s=args.ttft, token_latency_s=args.token_latency, answer_words=args.answer_words)
+    with server:
+        graph_rag_query.llm = OpenAILLM(
+            model_name="fake-chat", model_params={"top_p": 1.0}, base_url=server.base_url, api_key="fake"
+        )
+        baseline, expected = run_sync(questions, concurrency=1)
+        runs = [(baseline, expected)]
+        if not args.skip_threads:
+            runs += [run_sync(questions, concurrency=c) for c in levels if c > 1]
+        runs += asyncio.run(run_async_levels(questions, levels, timeout=args.timeout))
+        graph_rag_query.llm.client.close()
+
+    failed = False
+    for result, answers in runs:
+        mismatched = sum(1 for i, answer in answers.items() if answer != expected[i])
+        failed = failed or bool(mismatched)
+        verdict = "same" if not mismatched else f"{mismatched} DIFFERENT"
+        print(
+            f"{result['mode']:>8} {result['concurrency']:>5} {result['wall_s']:>7.2f} {result['qps']:>7.1f} "
+            f"{result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} {result['qps'] / baseline['qps']:>7.1f}x "
+            f"{result['timeouts']:>8}  {verdict}"
+        )
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark chunk embedding throughput: per-chunk calls vs. batched requests.
+
+Uses the real `OpenAIEmbeddings` client against a local fake OpenAI endpoint
+(see `fakes.FakeOpenAIServer`), so request overhead and round-trip latency are
+part of the measurement. Chunk texts come from `data/` and are repeated to reach
+`--chunks`.
+
+    python benchmarks/embed_throughput_bench.py --latency 0.05 --chunks 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+if __name__ == "__main__":
+    # Ensure project root (and graph_rag/ for its sibling-module imports) on sys.path
+    _root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.append(_root)
+    sys.path.append(os.path.join(_root, "graph_rag"))
+from neo4j_graphrag.embeddings import OpenAIEmbeddings
+
+from chunk_utils import get_documents
+from embedding_batches import run_embedding_stage
+from fakes import FakeOpenAIServer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Embedding throughput benchmark (fake OpenAI endpoint)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake endpoint latency per request (s)")
+    parser.add_argument("--per-input", type=float, default=0.0005, help="Extra fake latency per input (s)")
+    parser.add_argument("--chunks", type=int, default=1000, help="Number of chunk texts to embed")
+    parser.add_argument("--batch-sizes", default="16,64,256", help="Comma-separated max inputs per request")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated requests in flight")
+    parser.add_argument("--batch-tokens", type=int, default=50000, help="Token budget per request")
+    args = parser.parse_args()
+
+    base = [d.page_content for d in get_documents()]
+    texts = [base[i % len(base)] for i in range(args.chunks)]
+    items = [(str(i), t) for i, t in enumerate(texts)]
+
+    print(f"{'mode':>22} {'wall_s':>8} {'chunks/s':>9} {'speedup':>8} {'requests':>8}")
+    with FakeOpenAIServer(latency_s=args.latency, per_input_s=args.per_input) as server:
+        embedder = OpenAIEmbeddings(model="fake-embedding", base_url=server.base_url, api_key="fake")
+        try:
+            # Baseline: what populate_vector_index.py used to do.
+            t0 = time.perf_counter()
+            for t in texts:
+                embedder.embed_query(t)
+            baseline_s = time.perf_counter() - t0
+            print(f"{'per-chunk':>22} {baseline_s:>8.2f} {len(texts) / baseline_s:>9.1f} {1.0:>7.1f}x {server.requests:>8}")
+
+            for size in [int(x) for x in args.batch_sizes.split(",") if x.strip()]:
+                for conc in [int(x) for x in args.concurrency.split(",") if x.strip()]:
+                    before = server.requests
+                    received: list[int] = []
+                    stats = run_embedding_stage(
+                        embedder,
+                        items,
+                        lambda ids, vectors: received.append(len(vectors)),
+                        max_tokens=args.batch_tokens,
+                        max_items=size,
+                        concurrency=conc,
+                    )
+                    assert sum(received) == len(texts)
+                    label = f"batch={size} conc={conc}"
+                    print(
+                        f"{label:>22} {stats.latency_s:>8.2f} {stats.texts_per_s:>9.1f} "
+                        f"{baseline_s / stats.latency_s:>7.1f}x {server.requests - before:>8}"
+                    )
+        finally:
+            embedder.client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,619 @@
+"""Local stand-ins for OpenAI and Neo4j used by the benchmark scripts.
+
+Everything here is deterministic: the same input text always produces the same
+extraction / embedding, so benchmark runs can be compared for equality as well
+as for speed.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from neo4j_graphrag.embeddings.base import Embedder
+from neo4j_graphrag.exceptions import LLMGenerationError
+from neo4j_graphrag.experimental.components.kg_writer import KGWriter, KGWriterModel
+from neo4j_graphrag.experimental.components.types import LexicalGraphConfig, Neo4jGraph
+from neo4j_graphrag.llm.base import LLMInterface
+from neo4j_graphrag.llm.types import LLMResponse
+from neo4j_graphrag.utils.rate_limit import NoOpRateLimitHandler
+from pydantic import validate_call
+
+_ADR_RE = re.compile(r"\bADR[- ]?(\d{4})\b", re.IGNORECASE)
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9._/-]*")
+
+# Small vocabulary matching the sample ADRs in data/.
+_TECHNOLOGIES = (
+    "Kafka", "Pub/Sub", "Keycloak", "Prometheus", "Grafana", "Elasticsearch",
+    "Kibana", "Logstash", "OpenTelemetry", "PostgreSQL", "mTLS", "JWT",
+    "Schema Registry", "Avro", "Kong",
+)
+
+
+class FakeLLM(LLMInterface):
+    """LLM with configurable latency that "extracts" ADR ids and known technologies.
+
+    `rate_limit_every=N` makes every Nth call fail with a 429-style error so the
+    adaptive backoff path can be exercised.
+    """
+
+    def __init__(self, *, latency_s: float = 0.2, rate_limit_every: int = 0):
+        super().__init__(model_name="fake-llm", rate_limit_handler=NoOpRateLimitHandler())
+        self.latency_s = latency_s
+        self.rate_limit_every = rate_limit_every
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _next_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+        if self.rate_limit_every and n % self.rate_limit_every == 0:
+            raise LLMGenerationError("Error code: 429 - rate limit exceeded (fake)")
+
+    @staticmethod
+    def _extract(prompt: str) -> str:
+        _, _, text = prompt.rpartition("Input text:")
+        nodes: list[dict[str, Any]] = []
+        rels: list[dict[str, Any]] = []
+        decisions = sorted({f"ADR-{m}" for m in _ADR_RE.findall(text)})
+        for adr in decisions:
+            nodes.append({"id": adr, "label": "Decision", "properties": {"adr_num": adr, "title": adr}})
+        for tech in _TECHNOLOGIES:
+            if tech.lower() in text.lower():
+                tid = f"tech:{tech}"
+                nodes.append({"id": tid, "label": "Technology", "properties": {"name": tech}})
+                for adr in decisions:
+                    rels.append({"type": "USES", "start_node_id": adr, "end_node_id": tid, "properties": {}})
+        return json.dumps({"nodes": nodes, "relationships": rels})
+
+    def invoke(self, input: str, message_history=None, system_instruction=None) -> LLMResponse:
+        time.sleep(self.latency_s)
+        self._next_call()
+        return LLMResponse(content=self._extract(input))
+
+    async def ainvoke(self, input: str, message_history=None, system_instruction=None) -> LLMResponse:
+        await asyncio.sleep(self.latency_s)
+        self._next_call()
+        return LLMResponse(content=self._extract(input))
+
+
+def hashed_bow_vector(text: str, dimensions: int) -> list[float]:
+    """Hashing-trick bag-of-words vector, L2-normalised.
+
+    Texts sharing tokens get a high cosine similarity, which is enough for
+    retrieval benchmarks to behave like a (weak) semantic embedder.
+    """
+    vec = [0.0] * dimensions
+    for tok in _TOKEN_RE.findall(text.lower()):
+        h = hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(h[:4], "little") % dimensions
+        sign = 1.0 if h[4] & 1 else -1.0
+        vec[bucket] += sign
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+class FakeEmbedder(Embedder):
+    """Deterministic embedder with configurable per-call latency; counts calls."""
+
+    def __init__(self, *, dimensions: int = 256, latency_s: float = 0.0, model: str = "fake-embedding"):
+        super().__init__(rate_limit_handler=NoOpRateLimitHandler())
+        self.dimensions = dimensions
+        self.latency_s = latency_s
+        self.model = model
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def embed_query(self, text: str) -> list[float]:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        with self._lock:
+            self.calls += 1
+        return hashed_bow_vector(text, self.dimensions)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        with self._lock:
+            self.calls += 1
+        return hashed_bow_vector(text, self.dimensions)
+
+
+class InMemoryKGWriter(KGWriter):
+    """KGWriter that keeps every written node/relationship in memory."""
+
+    def __init__(self) -> None:
+        self.nodes: list[Any] = []
+        self.relationships: list[Any] = []
+
+    @validate_call
+    async def run(
+        self,
+        graph: Neo4jGraph,
+        lexical_graph_config: LexicalGraphConfig = LexicalGraphConfig(),
+    ) -> KGWriterModel:
+        self.nodes.extend(graph.nodes)
+        self.relationships.extend(graph.relationships)
+        return KGWriterModel(
+            status="SUCCESS",
+            metadata={"node_count": len(graph.nodes), "relationship_count": len(graph.relationships)},
+        )
+
+    def canonical(self) -> tuple[tuple, tuple]:
+        """Order- and uuid-independent view of the written graph, for equality checks."""
+        volatile = {"createdAt", "embedding"}
+
+        def key(node: Any) -> tuple:
+            props = tuple(sorted((k, str(v)) for k, v in node.properties.items() if k not in volatile))
+            return (node.label, props)
+
+        by_id = {n.id: key(n) for n in self.nodes}
+        nodes = tuple(sorted(set(by_id.values())))
+        rels = tuple(sorted({
+            (r.type, by_id.get(r.start_node_id, ("?",)), by_id.get(r.end_node_id, ("?",)))
+            for r in self.relationships
+        }))
+        return nodes, rels
+
+
+class FakeOpenAIServer:
+    """Minimal OpenAI-compatible HTTP server on localhost.
+
+    Serves `POST /v1/embeddings` plus the files / vector-store endpoints used by
+    `rag/ingest.py`, so the real `openai` client (and so the real request and
+    serialisation cost) can be benchmarked without network access. Each request
+    sleeps `latency_s` (plus `per_input_s` per embedding input), roughly
+    mimicking a remote endpoint. `fail_uploads_after=N` makes every file upload
+    after the Nth fail with a 500, to exercise resumable ingest.
+
+    `POST /v1/chat/completions` answers with `answer_words` words derived from
+    the last message, streamed (`stream=True`, server-sent events) one word
+    every `token_latency_s` after the first arrives at `latency_s`.
+
+        with FakeOpenAIServer(latency_s=0.05) as server:
+            OpenAIEmbeddings(model="fake", base_url=server.base_url, api_key="fake")
+    """
+
+    def __init__(
+        self,
+        *,
+        dimensions: int = 256,
+        latency_s: float = 0.05,
+        per_input_s: float = 0.0,
+        fail_uploads_after: int = 0,
+        token_latency_s: float = 0.01,
+        answer_words: int = 20,
+    ):
+        self.dimensions = dimensions
+        self.latency_s = latency_s
+        self.per_input_s = per_input_s
+        self.fail_uploads_after = fail_uploads_after
+        self.token_latency_s = token_latency_s
+        self.answer_words = answer_words
+        self.requests = 0
+        self.inputs = 0
+        # Files / vector stores state
+        self.files: dict[str, int] = {}
+        self.vector_stores: dict[str, list[str]] = {}
+        self.attach_calls = 0
+        self._lock = threading.Lock()
+        self._httpd: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        assert self._httpd is not None, "server not started"
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _embeddings(self, body: dict[str, Any]) -> dict[str, Any]:
+        inputs = body.get("input")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        with self._lock:
+            self.requests += 1
+            self.inputs += len(inputs)
+        time.sleep(self.latency_s + self.per_input_s * len(inputs))
+        as_base64 = body.get("encoding_format") == "base64"
+        data = []
+        for i, text in enumerate(inputs):
+            vec = hashed_bow_vector(str(text), self.dimensions)
+            if as_base64:
+                emb: Any = base64.b64encode(struct.pack(f"<{len(vec)}f", *vec)).decode("ascii")
+            else:
+                emb = vec
+            data.append({"object": "embedding", "index": i, "embedding": emb})
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "fake-embedding"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+    def _answer_words(self, body: dict[str, Any]) -> list[str]:
+        messages = body.get("messages") or [{}]
+        words = _TOKEN_RE.findall(str(messages[-1].get("content") or "").lower()) or ["answer"]
+        return [words[i % len(words)] for i in range(self.answer_words)]
+
+    def _chat(self, body: dict[str, Any]) -> dict[str, Any]:
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency_s + self.token_latency_s * self.answer_words)
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake-chat"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(self._answer_words(body))},
+                    "finish_reason": "stop",
+                }
+            ],
+        }
+
+    def _chat_stream(self, body: dict[str, Any]):
+        """Server-sent event payloads for a streamed chat completion, paced like a model."""
+        with self._lock:
+            self.requests += 1
+        words = self._answer_words(body)
+        time.sleep(self.latency_s)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_latency_s)
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake-chat"),
+                "choices": [{"index": 0, "delta": {"content": word if not i else " " + word}, "finish_reason": None}],
+            }
+            yield json.dumps(chunk)
+        yield "[DONE]"
+
+    def _next_id(self, prefix: str, table: dict) -> str:
+        return f"{prefix}-{len(table) + 1:06d}"
+
+    def _create_file(self, body: bytes) -> tuple[int, dict[str, Any]]:
+        time.sleep(self.latency_s)
+        with self._lock:
+            self.requests += 1
+            if self.fail_uploads_after and len(self.files) >= self.fail_uploads_after:
+                return 500, {"error": {"message": "upload failed (fake)", "type": "server_error"}}
+            file_id = self._next_id("file", self.files)
+            self.files[file_id] = len(body)
+        return 200, {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(body),
+            "created_at": int(time.time()),
+            "filename": "upload.txt",
+            "purpose": "user_data",
+            "status": "processed",
+        }
+
+    def _create_vector_store(self, body: dict[str, Any]) -> dict[str, Any]:
+        with self._lock:
+            self.requests += 1
+            vs_id = self._next_id("vs", self.vector_stores)
+            self.vector_stores[vs_id] = []
+        return {
+            "id": vs_id,
+            "object": "vector_store",
+            "created_at": int(time.time()),
+            "name": body.get("name"),
+            "status": "completed",
+            "usage_bytes": 0,
+            "file_counts": {"in_progress": 0, "completed": 0, "failed": 0, "cancelled": 0, "total": 0},
+        }
+
+    def _attach(self, vs_id: str, file_ids: list[str]) -> tuple[int, dict[str, Any]]:
+        time.sleep(self.latency_s)
+        with self._lock:
+            self.requests += 1
+            self.attach_calls += 1
+            if vs_id not in self.vector_stores:
+                return 404, {"error": {"message": f"no vector store {vs_id}"}}
+            unknown = [f for f in file_ids if f not in self.files]
+            if unknown:
+                return 400, {"error": {"message": f"unknown files {unknown[:3]}"}}
+            self.vector_stores[vs_id].extend(file_ids)
+        counts = {"in_progress": 0, "completed": len(file_ids), "failed": 0, "cancelled": 0, "total": len(file_ids)}
+        return 200, {
+            "id": f"vsfb-{self.attach_calls:06d}",
+            "object": "vector_store.files_batch",
+            "created_at": int(time.time()),
+            "vector_store_id": vs_id,
+            "status": "completed",
+            "file_counts": counts,
+        }
+
+    def _route(self, path: str, raw: bytes) -> tuple[int, dict[str, Any]]:
+        parts = [p for p in path.split("?")[0].split("/") if p]
+        if parts[:1] == ["v1"]:
+            parts = parts[1:]
+        if parts == ["embeddings"]:
+            return 200, self._embeddings(json.loads(raw or b"{}"))
+        if parts == ["chat", "completions"]:
+            return 200, self._chat(json.loads(raw or b"{}"))
+        if parts == ["files"]:
+            return self._create_file(raw)
+        if parts == ["vector_stores"]:
+            return 200, self._create_vector_store(json.loads(raw or b"{}"))
+        if len(parts) == 3 and parts[0] == "vector_stores" and parts[2] == "file_batches":
+            return self._attach(parts[1], json.loads(raw or b"{}").get("file_ids") or [])
+        if len(parts) == 3 and parts[0] == "vector_stores" and parts[2] == "files":
+            return self._attach(parts[1], [json.loads(raw or b"{}").get("file_id")])
+        return 404, {"error": {"message": f"unknown path {path}"}}
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Keep-alive + small writes would otherwise stall on delayed ACKs.
+            disable_nagle_algorithm = True
+
+            def log_message(self, format: str, *args: Any) -> None:  # silence access log
+                pass
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length)
+                if self.path.rstrip("/").endswith("/chat/completions"):
+                    body = json.loads(raw or b"{}")
+                    if body.get("stream"):
+                        self._send_events(server._chat_stream(body))
+                        return
+                code, payload = server._route(self.path, raw)
+                self._send(code, payload)
+
+            def _send_events(self, events) -> None:
+                # Chunked transfer encoding keeps the connection reusable after the stream.
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for event in events:
+                        data = f"data: {event}\n\n".encode("utf-8")
+                        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading (cancelled or timed out).
+                    self.close_connection = True
+
+            def _send(self, code: int, payload: dict[str, Any]) -> None:
+                raw = json.dumps(payload).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+        return Handler
+
+    def start(self) -> "FakeOpenAIServer":
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+class _FakeResult:
+    def __init__(self, rows: list[dict[str, Any]]):
+        self._rows = rows
+
+    def single(self) -> dict[str, Any] | None:
+        return self._rows[0] if self._rows else None
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+class FakeChunkDriver:
+    """Just enough of `neo4j.Driver` for `local_index.export_local_index`: serves Chunk embeddings."""
+
+    def __init__(self, ids: list[str], vectors: Any):
+        self.ids = ids
+        self.vectors = vectors
+
+    def session(self, **kwargs: Any) -> "FakeChunkDriver":
+        return self
+
+    def __enter__(self) -> "FakeChunkDriver":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def execute_read(self, work: Any, *args: Any) -> Any:
+        return work(self, *args)
+
+    def run(self, query: str, parameters: Any = None, **params: Any) -> _FakeResult:
+        if "count(" in query:
+            return _FakeResult([{"c": len(self.ids)}])
+        return _FakeResult([{"id": i, "embedding": v} for i, v in zip(self.ids, self.vectors)])
+
+
+class FakeGraphDriver:
+    """Just enough of `neo4j.Driver` for `graph_rag/retrieval.py`, over an in-memory graph.
+
+    Chunks are embedded with `embedder`; entities and their relationships come
+    from `FakeLLM`'s extraction of each chunk. `execute_query` answers the three
+    statements the query path runs: the vector lookup (cosine on Neo4j's
+    (1 + cos) / 2 scale), the full-text lookup (BM25 over chunk tokens) and the
+    expansion query, emulated with the same caps as `expansion.ExpansionConfig`.
+    Each statement takes `latency_s` (a round trip to the server).
+    """
+
+    def __init__(
+        self,
+        chunks: list[tuple[str, int, str]],
+        embedder: Embedder,
+        *,
+        hops: int = 2,
+        max_entities: int = 15,
+        max_relations: int = 8,
+        hub_degree: int = 50,
+        max_facts: int = 40,
+        latency_s: float = 0.0,
+    ):
+        self.latency_s = latency_s
+        self.ids = [f"chunk:{i}" for i in range(len(chunks))]
+        self.chunks = {cid: {"source": src, "index": idx, "text": text} for cid, (src, idx, text) in zip(self.ids, chunks)}
+        self.vectors = {cid: embedder.embed_query(text) for cid, (_, _, text) in zip(self.ids, chunks)}
+        self.hops = hops
+        self.max_entities = max_entities
+        self.max_relations = max_relations
+        self.hub_degree = hub_degree
+        self.max_facts = max_facts
+
+        # Entity key -> display string; chunk -> mentioned entities; entity -> relationships.
+        self.entities: dict[str, str] = {}
+        self.mentions: dict[str, list[str]] = {}
+        self.relations: dict[str, set[tuple[str, str, str]]] = {}
+        for cid, (_, _, text) in zip(self.ids, chunks):
+            graph = json.loads(FakeLLM._extract("Input text:" + text))
+            for node in graph["nodes"]:
+                props = node["properties"]
+                self.entities[node["id"]] = f"{node['label']}:{props.get('name') or props.get('title')}"
+            self.mentions[cid] = [n["id"] for n in graph["nodes"]]
+            for rel in graph["relationships"]:
+                edge = (rel["start_node_id"], rel["type"], rel["end_node_id"])
+                self.relations.setdefault(edge[0], set()).add(edge)
+                self.relations.setdefault(edge[2], set()).add(edge)
+        self.degree = {e: len(self.relations.get(e, ())) for e in self.entities}
+        for mentioned in self.mentions.values():
+            for e in mentioned:
+                self.degree[e] += 1
+
+        # Full-text index: token counts per chunk.
+        self.terms = {cid: _TOKEN_RE.findall(self.chunks[cid]["text"].lower()) for cid in self.ids}
+        self.doc_freq: dict[str, int] = {}
+        for tokens in self.terms.values():
+            for tok in set(tokens):
+                self.doc_freq[tok] = self.doc_freq.get(tok, 0) + 1
+        self.avg_len = sum(len(t) for t in self.terms.values()) / max(1, len(self.terms))
+
+    def _vector(self, query_vector: list[float], top_k: int) -> list[dict[str, Any]]:
+        scored = [
+            (cid, (1.0 + sum(a * b for a, b in zip(vec, query_vector))) / 2.0) for cid, vec in self.vectors.items()
+        ]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return [{"id": cid, "score": score} for cid, score in scored[:top_k]]
+
+    def _fulltext(self, query_text: str, top_k: int, *, k1: float = 1.2, b: float = 0.75) -> list[dict[str, Any]]:
+        terms = set(_TOKEN_RE.findall(query_text.replace("\\", "").lower()))
+        n = len(self.terms)
+        scored = []
+        for cid, tokens in self.terms.items():
+            score = 0.0
+            for term in terms:
+                tf = tokens.count(term)
+                if not tf:
+                    continue
+                idf = math.log(1.0 + (n - self.doc_freq[term] + 0.5) / (self.doc_freq[term] + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / self.avg_len))
+            if score > 0:
+                scored.append((cid, score))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return [{"id": cid, "score": score} for cid, score in scored[:top_k]]
+
+    def _expand(self, hit: dict[str, Any]) -> dict[str, Any]:
+        cid = hit["id"]
+        entities = sorted(self.mentions.get(cid, ()), key=lambda e: (self.degree[e], e))[: self.max_entities]
+        entity_facts = [
+            f"MENTIONS -> {self.entities[e]}" + (" (hub)" if self.degree[e] > self.hub_degree else "") for e in entities
+        ]
+        rel_facts: list[str] = []
+        if self.hops >= 2:
+            for e in entities:
+                if self.degree[e] > self.hub_degree:
+                    continue
+                for src, rel_type, dst in sorted(self.relations.get(e, ()))[: self.max_relations]:
+                    fact = f"{self.entities[src]} -{rel_type}-> {self.entities[dst]}"
+                    if fact not in rel_facts:
+                        rel_facts.append(fact)
+        return {
+            "node": dict(self.chunks[cid]),
+            "id": cid,
+            "elementId": cid,
+            "score": hit["score"],
+            "graph_facts": (entity_facts + rel_facts)[: self.max_facts],
+            "entity_count": len(entities),
+            "hub_count": sum(1 for e in entities if self.degree[e] > self.hub_degree),
+        }
+
+    def run_statement(self, query: str, parameters: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+        """The records for `query`, without the simulated latency."""
+        params = parameters or {}
+        if "db.index.vector.queryNodes" in query:
+            records = self._vector(params["query_vector"], int(params["top_k"]))
+        elif "db.index.fulltext.queryNodes" in query:
+            records = self._fulltext(params["query_text"], int(params["top_k"]))
+        elif "UNWIND $hits" in query:
+            records = [self._expand(h) for h in params["hits"] if h["id"] in self.chunks]
+        else:
+            raise NotImplementedError(f"FakeGraphDriver cannot run: {query.strip()[:80]}")
+        return records
+
+    def execute_query(self, query: str, parameters: dict[str, Any] | None = None, **kwargs: Any):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return self.run_statement(query, parameters), None, None
+
+    def close(self) -> None:
+        return None
+
+
+class FakeAsyncGraphDriver:
+    """`FakeGraphDriver` as a `neo4j.AsyncDriver`: the same graph, awaiting its latency."""
+
+    def __init__(self, graph: FakeGraphDriver):
+        self.graph = graph
+
+    async def execute_query(self, query: str, parameters: dict[str, Any] | None = None, **kwargs: Any):
+        if self.graph.latency_s:
+            await asyncio.sleep(self.graph.latency_s)
+        return self.graph.run_statement(query, parameters), None, None
+
+    async def close(self) -> None:
+        return None
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = math.floor(k)
+    hi = math.ceil(k)
+    if lo == hi:
+        return ordered[int(k)]
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
@@ -0,0 +1,124 @@
+"""Records/s through `logger_factory`: per-call env parsing vs. the parsed-once fast path.
+
+Each scenario logs `--records` calls shaped like the per-batch `log_ctx.debug`
+in `populate_vector_index.py` (a bound adapter plus a few keyword fields):
+
+- `legacy`: the previous adapter, which re-read LOG_CONTEXT* and formatted the
+  context suffix inside every call
+- `text` / `json`: `ContextLoggerAdapter` with `ContextFormatter` / `JsonFormatter`
+- `file` / `file+queue`: a FileHandler written on the calling thread vs. the
+  queue-backed handler `get_logger` installs for LOG_FILE (caller-side rate,
+  then the rate including the background drain)
+- `debug-off`: DEBUG calls with the logger at INFO
+
+Stream output goes to an in-memory buffer, so only formatting is measured.
+
+    python benchmarks/logging_bench.py --records 100000
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+
+if __name__ == "__main__":
+    # Ensure project root on sys.path
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import logger_factory
+from logger_factory import ContextFormatter, ContextLoggerAdapter, JsonFormatter
+
+FORMAT = "[%(asctime)s] %(levelname)s %(name)s: %(message)s"
+DEFAULT_KEYS = set(logger_factory._DEFAULT_CONTEXT_KEYS_MINIMAL)
+
+
+class LegacyContextAdapter(logging.LoggerAdapter):
+    """The adapter as it was: environment lookups and suffix formatting on every call."""
+
+    def process(self, msg, kwargs):
+        ctx = dict(self.extra or {})
+        extra = kwargs.pop("extra", None)
+        if isinstance(extra, dict):
+            ctx.update(extra)
+        for k in list(kwargs.keys()):
+            if k not in {"exc_info", "stack_info", "stacklevel"}:
+                ctx[k] = kwargs.pop(k)
+        kwargs["extra"] = {}
+        mode = os.getenv("LOG_CONTEXT", "minimal").strip().lower()
+        if mode not in {"0", "off", "false", "none"}:
+            if mode not in {"all", "full"}:
+                allow = set(os.getenv("LOG_CONTEXT_KEYS", "").replace(",", " ").split()) or DEFAULT_KEYS
+                ctx = {k: v for k, v in ctx.items() if k in allow}
+            for k in os.getenv("LOG_CONTEXT_EXCLUDE_KEYS", "").replace(",", " ").split():
+                ctx.pop(k, None)
+            if ctx:
+                max_len = int(os.getenv("LOG_CONTEXT_VALUE_MAXLEN", "120").strip())
+                parts = []
+                for k in sorted(ctx):
+                    text = str(ctx[k])
+                    if k in {"path", "run_dir"} and "/" in text:
+                        text = os.path.basename(text)
+                    if max_len > 0 and len(text) > max_len:
+                        text = text[: max_len - 1] + "…"
+                    parts.append(f'{k}="{text}"' if any(c.isspace() for c in text) else f"{k}={text}")
+                msg = f"{msg} | {' '.join(parts)}"
+        return msg, kwargs
+
+
+def _logger(name: str, handler: logging.Handler, level: int = logging.DEBUG) -> logging.Logger:
+    logger = logging.Logger(name, level)
+    logger.addHandler(handler)
+    return logger
+
+
+def _run(adapter: logging.LoggerAdapter, records: int, *, level: int = logging.DEBUG) -> float:
+    t0 = time.perf_counter()
+    for i in range(records):
+        adapter.log(level, "Upserted batch", count=i, path="/tmp/data/0001-use-kafka.md", latency_s=0.01)
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="logger_factory throughput benchmark")
+    parser.add_argument("--records", type=int, default=100_000, help="Log calls per scenario")
+    args = parser.parse_args()
+    n = args.records
+    ctx = {"run_id": "bench", "source": "graph_rag", "op": "populate"}
+
+    def stream(formatter: logging.Formatter) -> logging.Handler:
+        handler = logging.StreamHandler(io.StringIO())
+        handler.setFormatter(formatter)
+        return handler
+
+    rows: list[tuple[str, float]] = []
+    rows.append(("legacy", _run(LegacyContextAdapter(_logger("legacy", stream(logging.Formatter(FORMAT))), ctx), n)))
+    rows.append(("text", _run(ContextLoggerAdapter(_logger("text", stream(ContextFormatter(FORMAT))), ctx), n)))
+    rows.append(("json", _run(ContextLoggerAdapter(_logger("json", stream(JsonFormatter())), ctx), n)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        direct = logging.FileHandler(os.path.join(tmp, "direct.log"), encoding="utf-8")
+        direct.setFormatter(ContextFormatter(FORMAT))
+        rows.append(("file", _run(ContextLoggerAdapter(_logger("file", direct), ctx), n)))
+        direct.close()
+
+        queued = logger_factory._file_handler(os.path.join(tmp, "queued.log"))
+        t0 = time.perf_counter()
+        rows.append(("file+queue", _run(ContextLoggerAdapter(_logger("queued", queued), ctx), n)))
+        logger_factory._stop_listeners()  # waits for the background writer to drain
+        rows.append(("file+queue (drained)", time.perf_counter() - t0))
+
+    info_only = _logger("off", stream(ContextFormatter(FORMAT)), level=logging.INFO)
+    rows.append(("legacy debug-off", _run(LegacyContextAdapter(info_only, ctx), n)))
+    rows.append(("debug-off", _run(ContextLoggerAdapter(info_only, ctx), n)))
+
+    legacy_rate = n / rows[0][1]
+    print(f"records={n}")
+    print(f"{'scenario':>22} {'wall_s':>8} {'records/s':>11} {'vs legacy':>9}")
+    for name, seconds in rows:
+        rate = n / seconds if seconds else 0.0
+        print(f"{name:>22} {seconds:>8.3f} {rate:>11,.0f} {rate / legacy_rate:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
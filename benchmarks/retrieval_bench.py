@@ -0,0 +1,234 @@
+"""Retrieval quality and speed of the GraphRAG query path against a golden question set.
+
+Runs `graph_rag/query.retrieve` and `build_prompt` (vector lookup, optional
+full-text lookup and fusion, graph expansion, context packing) for every
+question in `retrieval_golden.json`, with deterministic fake embeddings and an
+in-memory graph built from `data/` (`fakes.FakeGraphDriver`) in place of OpenAI
+and Neo4j. Reports recall@k and MRR against the expected `source`/`chunk_index`
+hits, p50/p95 latency and prompt context tokens.
+
+Every mode runs at each `--top-k` (by default 10 and 15 next to
+RETRIEVAL_TOP_K), so a smaller top_k can be judged against the full one.
+Results are compared with `retrieval_baseline.json` (keyed by mode and top_k);
+a drop in recall / MRR, or a rise in context tokens or latency beyond the
+tolerances, is reported as a regression and exits non-zero. So is a wrong
+result from the context packer's chunk merging on `MERGE_CASES`.
+
+    python benchmarks/retrieval_bench.py --mode vector,hybrid --top-k 10,25
+    python benchmarks/retrieval_bench.py --save-baseline
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+if __name__ == "__main__":
+    # Ensure project root (and graph_rag/ for its sibling-module imports) on sys.path
+    _root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.append(_root)
+    sys.path.append(os.path.join(_root, "graph_rag"))
+    # Offline and quiet: nothing below talks to OpenAI, Neo4j or the on-disk caches.
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    os.environ.update(TRACE_EXPORTER="none", QUERY_CACHE="0", EMBED_CACHE="0", RETRIEVAL_BACKEND="neo4j")
+import query as graph_rag_query
+from chunk_utils import get_documents
+from config import settings
+from context_packer import _merge_overlap, merge_overlap_bounds
+from fakes import FakeEmbedder, FakeGraphDriver, percentile
+from tracing import Trace
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_PATH = os.path.join(HERE, "retrieval_golden.json")
+BASELINE_PATH = os.path.join(HERE, "retrieval_baseline.json")
+QUALITY_METRICS = ("mrr",)
+# (previous chunk, next chunk, expected merged text) for `_merge_overlap`.
+MERGE_CASES = (
+    # A real splitter overlap is dropped once.
+    (
+        "The ingestion worker batches embeddings before writing them to Neo4j.",
+        "batches embeddings before writing them to Neo4j. Retries back off exponentially.",
+        "The ingestion worker batches embeddings before writing them to Neo4j. Retries back off exponentially.",
+    ),
+    # A short, mid-word coincidence is not an overlap.
+    ("We run 3 services", "service mesh uses Istio", "We run 3 services\nservice mesh uses Istio"),
+    # Nor is a long one that stops inside a word.
+    (
+        "Each service owns its schema, its migrations and its seed data",
+        "its schema, its migrations and its seed dataXYZ are reviewed",
+        "Each service owns its schema, its migrations and its seed data\n"
+        "its schema, its migrations and its seed dataXYZ are reviewed",
+    ),
+)
+
+
+def load_golden(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        golden = json.load(f)
+    for item in golden:
+        item["expected_keys"] = {(e["source"], int(e["chunk_index"])) for e in item["expected"]}
+    return golden
+
+
+def run_question(question: str, *, top_k: int) -> tuple[list[tuple[str, int]], float, int]:
+    """Ranked (source, chunk_index) hits, retrieval + prompt latency (ms) and context tokens."""
+    trace = Trace("retrieval_bench", top_k=top_k)
+    t0 = time.perf_counter()
+    hits = graph_rag_query.retrieve(question, top_k=top_k, trace=trace)
+    graph_rag_query.build_prompt(question, hits, trace=trace)
+    latency_ms = (time.perf_counter() - t0) * 1000.0
+    trace.finish()
+    ranked = [(h.source, h.chunk_index) for h in hits]
+    return ranked, latency_ms, int(trace.attributes().get("prompt.context_tokens") or 0)
+
+
+def evaluate(golden: list[dict], *, top_k: int, ks: list[int], repeat: int, verbose: bool) -> dict:
+    recalls: dict[int, list[float]] = {k: [] for k in ks}
+    reciprocal_ranks: list[float] = []
+    latencies: list[float] = []
+    tokens: list[int] = []
+    for item in golden:
+        expected = item["expected_keys"]
+        ranked, latency_ms, context_tokens = run_question(item["question"], top_k=top_k)
+        latencies.append(latency_ms)
+        for _ in range(repeat - 1):
+            latencies.append(run_question(item["question"], top_k=top_k)[1])
+        for k in ks:
+            recalls[k].append(len(expected & set(ranked[:k])) / len(expected))
+        first = next((rank for rank, key in enumerate(ranked, start=1) if key in expected), None)
+        reciprocal_ranks.append(1.0 / first if first else 0.0)
+        tokens.append(context_tokens)
+        if verbose:
+            found = " ".join(f"r@{k}={recalls[k][-1]:.2f}" for k in ks)
+            print(f"  {item['id']:<32} {found} rr={reciprocal_ranks[-1]:.2f} tokens={context_tokens}")
+    result = {f"recall@{k}": round(statistics.fmean(recalls[k]), 4) for k in ks}
+    result.update(
+        mrr=round(statistics.fmean(reciprocal_ranks), 4),
+        p50_ms=round(percentile(latencies, 50), 3),
+        p95_ms=round(percentile(latencies, 95), 3),
+        context_tokens=round(statistics.fmean(tokens), 1),
+        questions=len(golden),
+    )
+    return result
+
+
+def merge_failures() -> list[str]:
+    found = []
+    min_overlap, max_overlap = merge_overlap_bounds()
+    for a, b, expected in MERGE_CASES:
+        merged = _merge_overlap(a, b, max_overlap=max_overlap, min_overlap=min_overlap)
+        if merged != expected:
+            found.append(f"_merge_overlap({a!r}, {b!r}) = {merged!r}")
+    return found
+
+
+def regressions(current: dict, baseline: dict, *, tolerance: float, token_tolerance: float, latency_tolerance: float) -> list[str]:
+    found = []
+    for name, value in current.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]
+        if (name.startswith("recall@") or name in QUALITY_METRICS) and value < before - tolerance:
+            found.append(f"{name} {before:.3f} -> {value:.3f}")
+        elif name == "context_tokens" and value > before * (1 + token_tolerance):
+            found.append(f"{name} {before:.0f} -> {value:.0f}")
+        elif name == "p95_ms" and value > before * (1 + latency_tolerance):
+            found.append(f"{name} {before:.2f} -> {value:.2f}")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Golden-set retrieval benchmark (fake embeddings, in-memory graph)")
+    parser.add_argument("--golden", default=GOLDEN_PATH, help="Golden questions JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline metrics JSON")
+    parser.add_argument("--mode", default="vector,hybrid", help="Comma-separated retrieval modes: vector,hybrid")
+    parser.add_argument(
+        "--top-k",
+        default=f"10,15,{settings.retrieval_top_k}",
+        help="Comma-separated chunks retrieved per question (default: 10, 15 and RETRIEVAL_TOP_K)",
+    )
+    parser.add_argument("--k", default="5,10", help="Comma-separated cut-offs for recall@k (top_k is always added)")
+    parser.add_argument("--dimensions", type=int, default=256, help="Fake embedding dimensions")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per question for the latency percentiles")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Allowed absolute drop in recall / MRR")
+    parser.add_argument("--token-tolerance", type=float, default=0.10, help="Allowed relative rise in context tokens")
+    parser.add_argument("--latency-tolerance", type=float, default=1.0, help="Allowed relative rise in p95 latency")
+    parser.add_argument("--save-baseline", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--verbose", action="store_true", help="Print per-question results")
+    args = parser.parse_args()
+
+    golden = load_golden(args.golden)
+    top_ks = sorted({int(k) for k in args.top_k.split(",") if k.strip()})
+    cutoffs = {int(k) for k in args.k.split(",") if k.strip()}
+    modes = [m.strip() for m in args.mode.split(",") if m.strip()]
+
+    documents = get_documents()
+    chunks = [(d.metadata["source"], int(d.metadata["chunk_index"]), d.page_content) for d in documents]
+    embedder = FakeEmbedder(dimensions=args.dimensions)
+    expansion = graph_rag_query.EXPANSION
+    graph_rag_query.driver = FakeGraphDriver(
+        chunks,
+        embedder,
+        hops=expansion.hops,
+        max_entities=expansion.max_entities,
+        max_relations=expansion.max_relations,
+        hub_degree=expansion.hub_degree,
+        max_facts=expansion.max_facts,
+    )
+    graph_rag_query.embeddings = embedder
+    graph_rag_query.query_cache = None
+    graph_rag_query.local_index = None
+
+    baseline: dict = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print(f"questions={len(golden)} chunks={len(chunks)} dims={args.dimensions} repeat={args.repeat}")
+    results: dict[str, dict] = {}
+    failed = False
+    for failure in merge_failures():
+        print(f"REGRESSION: {failure}")
+        failed = True
+    for top_k in top_ks:
+        ks = sorted(cutoffs | {top_k})
+        header = " ".join(f"{'r@' + str(k):>6}" for k in ks)
+        print(f"top_k={top_k}")
+        print(f"{'mode':>7} {header} {'mrr':>6} {'p50_ms':>7} {'p95_ms':>7} {'ctx_tok':>8}  vs baseline")
+        for mode in modes:
+            graph_rag_query.HYBRID = mode == "hybrid"
+            if args.verbose:
+                print(f"[{mode}@{top_k}]")
+            result = evaluate(golden, top_k=top_k, ks=ks, repeat=max(1, args.repeat), verbose=args.verbose)
+            key = f"{mode}@{top_k}"
+            results[key] = result
+            if key not in baseline:
+                verdict = "no baseline"
+            else:
+                found = regressions(
+                    result,
+                    baseline[key],
+                    tolerance=args.tolerance,
+                    token_tolerance=args.token_tolerance,
+                    latency_tolerance=args.latency_tolerance,
+                )
+                verdict = "REGRESSION: " + "; ".join(found) if found else "ok"
+                failed = failed or bool(found)
+            recall = " ".join(f"{result[f'recall@{k}']:>6.3f}" for k in ks)
+            print(
+                f"{mode:>7} {recall} {result['mrr']:>6.3f} {result['p50_ms']:>7.2f} {result['p95_ms']:>7.2f} "
+                f"{result['context_tokens']:>8.0f}  {verdict}"
+            )
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+    elif failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
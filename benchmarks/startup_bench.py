@@ -0,0 +1,158 @@
+"""Cold-start cost of the CLIs: `python -X importtime <script> --help`, checked against a budget.
+
+For every script, `--help` runs in a fresh interpreter. Nothing in that path
+needs a driver, an API client or an API key. The benchmark reports:
+
+- import_ms: the sum of the top-level cumulative times that `-X importtime`
+  reports, minus whatever a bare `python -c pass` imports (`site`, `encodings`,
+  ...), best of `--repeat` runs
+- wall_ms: the median wall time without `-X importtime`
+- the heaviest top-level imports
+- any of the HEAVY packages that were loaded anyway
+
+A script entry may carry environment overrides after the path
+(`graph_rag/query.py RETRIEVAL_BACKEND=local`); it is budgeted on its own.
+
+Results are compared with `startup_budget.json`. A script fails when its import
+time exceeds its budget, or when it loads a heavy package listed as forbidden
+for it. A failure exits non-zero.
+
+    python benchmarks/startup_bench.py
+    python benchmarks/startup_bench.py --save-budget --headroom 0.5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BUDGET_PATH = os.path.join(HERE, "startup_budget.json")
+
+SCRIPTS = (
+    "graph_rag/query.py",
+    # The local index (numpy, hnswlib) is opened on the first question, not at import.
+    "graph_rag/query.py RETRIEVAL_BACKEND=local",
+    "rag/query.py",
+    "graph_rag/builder.py",
+    "graph_rag/cleanup.py",
+    "graph_rag/entity_resolution.py",
+    "query_client.py",
+    "run_result_writer.py",
+)
+# Packages whose import alone costs 100ms+ here; `--help` should not need them.
+HEAVY = ("openai", "neo4j", "neo4j_graphrag", "langchain_core", "langchain_text_splitters", "numpy")
+
+
+def parse_importtime(stderr: str, *, skip: frozenset[str] = frozenset()) -> tuple[float, list[tuple[str, float]], set[str]]:
+    """Total top-level import ms, top-level (module, ms) heaviest first, and every module imported.
+
+    Top-level modules in `skip` (interpreter startup) are left out of the total and the ranking.
+    """
+    top: list[tuple[str, float]] = []
+    modules: set[str] = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        module = name.strip()
+        modules.add(module)
+        if not name[1:2].isspace() and module not in skip:
+            top.append((module, int(cumulative) / 1000.0))
+    top.sort(key=lambda item: item[1], reverse=True)
+    return sum(ms for _, ms in top), top, modules
+
+
+def _importtime(argv: list[str], *, env: dict[str, str]) -> str:
+    proc = subprocess.run([sys.executable, "-X", "importtime", *argv], capture_output=True, text=True, env=env, cwd=ROOT)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} exited {proc.returncode}:\n{proc.stderr[-2000:]}")
+    return proc.stderr
+
+
+def interpreter_modules(env: dict[str, str]) -> frozenset[str]:
+    """Top-level modules a bare interpreter imports before any script runs."""
+    _, top, _ = parse_importtime(_importtime(["-c", "pass"], env=env))
+    return frozenset(name for name, _ in top)
+
+
+def measure(entry: str, *, repeat: int, env: dict[str, str], skip: frozenset[str]) -> dict:
+    script, *overrides = entry.split()
+    env = {**env, **dict(item.split("=", 1) for item in overrides)}
+    argv = [sys.executable, os.path.join(ROOT, script), "--help"]
+    # Best of `repeat`: import time only goes up with noise (disk, CPU contention).
+    import_ms, top, modules = min(
+        (parse_importtime(_importtime(argv[1:], env=env), skip=skip) for _ in range(repeat)),
+        key=lambda parsed: parsed[0],
+    )
+    walls = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run(argv, capture_output=True, env=env, cwd=ROOT, check=True)
+        walls.append((time.perf_counter() - t0) * 1000.0)
+    return {
+        "import_ms": round(import_ms, 1),
+        "wall_ms": round(statistics.median(walls), 1),
+        "heavy": sorted(p for p in HEAVY if p in modules),
+        "top": top[:3],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CLI cold-start (import time) benchmark")
+    parser.add_argument("--scripts", default=",".join(SCRIPTS), help="Comma-separated scripts, relative to the repo root")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per script (best import time, median wall time)")
+    parser.add_argument("--budget", default=BUDGET_PATH, help="Budget JSON")
+    parser.add_argument("--save-budget", action="store_true", help="Write budgets from this run (import_ms * (1 + headroom))")
+    parser.add_argument("--headroom", type=float, default=0.5, help="Slack over the measured import time when saving")
+    args = parser.parse_args()
+
+    scripts = [s.strip() for s in args.scripts.split(",") if s.strip()]
+    # No credentials: --help must not need them.
+    env = {k: v for k, v in os.environ.items() if k not in ("OPENAI_API_KEY", "NEO4J_PASS")}
+    budget: dict = {}
+    if os.path.exists(args.budget):
+        with open(args.budget, encoding="utf-8") as f:
+            budget = json.load(f)
+
+    skip = interpreter_modules(env)
+    print(f"{'script':>32} {'import_ms':>9} {'wall_ms':>8} {'budget':>7}  heaviest imports / verdict")
+    results: dict[str, dict] = {}
+    failed = False
+    for script in scripts:
+        result = measure(script, repeat=max(1, args.repeat), env=env, skip=skip)
+        results[script] = result
+        limits = budget.get(script)
+        problems = []
+        if limits:
+            if result["import_ms"] > limits["import_ms"]:
+                problems.append(f"import {result['import_ms']:.0f}ms > {limits['import_ms']:.0f}ms")
+            loaded = sorted(set(result["heavy"]) & set(limits.get("forbidden", ())))
+            if loaded:
+                problems.append("loads " + ", ".join(loaded))
+        verdict = "no budget" if not limits else ("OVER BUDGET: " + "; ".join(problems) if problems else "ok")
+        failed = failed or bool(problems)
+        top = ", ".join(f"{name} {ms:.0f}" for name, ms in result["top"])
+        limit = f"{limits['import_ms']:.0f}" if limits else "-"
+        print(f"{script:>32} {result['import_ms']:>9.0f} {result['wall_ms']:>8.0f} {limit:>7}  {top} | {verdict}")
+
+    if args.save_budget:
+        for script, result in results.items():
+            budget[script] = {
+                "import_ms": round(result["import_ms"] * (1 + args.headroom)),
+                # Heavy packages this script gets by without today stay off its --help path.
+                "forbidden": [p for p in HEAVY if p not in result["heavy"]],
+            }
+        with open(args.budget, "w", encoding="utf-8") as f:
+            json.dump(budget, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Budget written to {args.budget}")
+    elif failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Recall / size / latency of truncated and quantized Chunk vectors in the local index.
+
+For every (dimensions, quantization) combination the corpus vectors are exported
+through `graph_rag/local_index.export_local_index` (fed by a fake driver) and
+searched with `LocalVectorIndex.search`, so the numbers come from the same code
+the query path runs. Recall@k is measured against exact search over the full,
+untruncated float32 vectors; each query is a corpus vector with itself left out.
+
+Corpus vectors (`--source auto` takes the first of `index` and `cache` that
+exists, and fails if neither does):
+
+- `index`: the local index export (LOCAL_INDEX_PATH), i.e. our Chunk embeddings
+- `cache`: the embedding cache (EMBED_CACHE_PATH) rows for EMBEDDING_MODEL
+- `synthetic`: clustered random vectors whose variance decays with the dimension,
+  a rough stand-in for Matryoshka embeddings (no OpenAI / Neo4j needed). Only
+  when asked for: its numbers say nothing about our corpus.
+
+VECTOR_QUANTIZATION=int8 is Neo4j's index option and is not measured here; the
+local index searches float32 for it (`vector_compression.local_quantization`).
+
+    python benchmarks/vector_quant_bench.py --top-k 10 --dims 3072,1024,512,256
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+if __name__ == "__main__":
+    # Ensure project root (and graph_rag/ for its sibling-module imports) on sys.path
+    _root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.append(_root)
+    sys.path.append(os.path.join(_root, "graph_rag"))
+from config import settings
+from fakes import FakeChunkDriver, percentile
+from local_index import META_FILE, LocalVectorIndex, export_local_index
+from vector_compression import LOCAL_QUANTIZATIONS, normalise, quantized_size, truncate
+
+
+def load_from_index(path: str) -> np.ndarray | None:
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        return None
+    return np.array(LocalVectorIndex(path).vectors)
+
+
+def load_from_cache(path: str, model: str, dimensions: int) -> np.ndarray | None:
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT vector FROM embeddings WHERE model = ? AND dimensions = ?", (model, dimensions)
+        ).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        return None
+    return normalise(np.stack([np.frombuffer(blob, dtype=np.float32) for (blob,) in rows]))
+
+
+def synthetic(count: int, dimensions: int, *, clusters: int = 64, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    decay = 1.0 / np.sqrt(1.0 + np.arange(dimensions) / 64.0)
+    centers = rng.standard_normal((clusters, dimensions))
+    assign = rng.integers(0, clusters, size=count)
+    vectors = (centers[assign] + 0.8 * rng.standard_normal((count, dimensions))) * decay
+    return normalise(vectors.astype(np.float32))
+
+
+def exact_top_k(corpus: np.ndarray, query_rows: np.ndarray, k: int) -> list[set[int]]:
+    truth = []
+    for row in query_rows:
+        sims = corpus @ corpus[row]
+        sims[row] = -np.inf
+        truth.append(set(np.argsort(-sims)[:k].tolist()))
+    return truth
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Embedding truncation / quantization benchmark")
+    parser.add_argument("--source", choices=("auto", "index", "cache", "synthetic"), default="auto")
+    parser.add_argument("--dims", default="3072,1024,512,256", help="Comma-separated stored dimensions")
+    parser.add_argument("--quantization", default=",".join(LOCAL_QUANTIZATIONS), help="Comma-separated: none,binary")
+    parser.add_argument("--rescore", type=int, default=settings.vector_rescore_factor, help="Candidate factor for re-scoring")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200, help="Corpus vectors used as queries")
+    parser.add_argument("--synthetic-count", type=int, default=5000, help="Corpus size for --source synthetic")
+    args = parser.parse_args()
+
+    corpus = None
+    source = args.source
+    if source in ("auto", "index"):
+        corpus = load_from_index(settings.local_index_path)
+        source = "index" if corpus is not None else source
+    if corpus is None and args.source in ("auto", "cache"):
+        corpus = load_from_cache(settings.embed_cache_path, settings.embedding_model, settings.embedding_dimensions)
+        source = "cache" if corpus is not None else source
+    if corpus is None and args.source == "auto":
+        raise SystemExit(
+            f"No Chunk embeddings found: no local index at {settings.local_index_path} and no "
+            f"{settings.embedding_model} rows in {settings.embed_cache_path}. Export them with "
+            "`python graph_rag/local_index.py`, or pass --source synthetic for made-up vectors."
+        )
+    if corpus is None:
+        if args.source != "synthetic":
+            raise SystemExit(f"No vectors found for --source {args.source}")
+        full_dims = max(int(d) for d in args.dims.split(","))
+        corpus = synthetic(args.synthetic_count, full_dims)
+        source = "synthetic"
+    count, full_dims = corpus.shape
+    if count <= args.top_k + 1:
+        raise SystemExit(f"Only {count} corpus vectors; need more than top_k + 1")
+
+    rng = np.random.default_rng(0)
+    query_rows = rng.choice(count, size=min(args.queries, count), replace=False)
+    k = args.top_k
+    truth = exact_top_k(corpus, query_rows, k)
+
+    dims_list = [d for d in (int(x) for x in args.dims.split(",") if x.strip()) if d <= full_dims]
+    kinds = [q.strip() for q in args.quantization.split(",") if q.strip()]
+    unsupported = [q for q in kinds if q not in LOCAL_QUANTIZATIONS]
+    if unsupported:
+        raise SystemExit(f"The local index has no {', '.join(unsupported)} search (choose from {', '.join(LOCAL_QUANTIZATIONS)})")
+    ids = [str(i) for i in range(count)]
+
+    print(f"source={source} vectors={count} full_dims={full_dims} queries={len(query_rows)} top_k={k} rescore={args.rescore}x")
+    print(f"{'dims':>5} {'quant':>7} {'rescore':>7} {'recall@k':>9} {'search_MiB':>10} {'stored_MiB':>10} {'p50_ms':>7} {'p95_ms':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for dims in dims_list:
+            stored = truncate(corpus, dims)
+            for kind in kinds:
+                path = os.path.join(tmp, f"{dims}-{kind}")
+                export_local_index(
+                    FakeChunkDriver(ids, stored), database="bench", path=path, dimensions=dims, hnsw_min=count + 1, quantize=kind
+                )
+                index = LocalVectorIndex(path)
+                factors = [1] if kind == "none" else [1, args.rescore]
+                for factor in factors:
+                    latencies: list[float] = []
+                    recalls: list[float] = []
+                    for row, expected in zip(query_rows, truth):
+                        t0 = time.perf_counter()
+                        hits = index.search(stored[row], k + 1, rescore_factor=factor)
+                        latencies.append((time.perf_counter() - t0) * 1000.0)
+                        found = [int(h["id"]) for h in hits if int(h["id"]) != row][:k]
+                        recalls.append(len(expected & set(found)) / k)
+                    search_bytes = quantized_size(count, dims, kind)
+                    # Full-precision vectors stay on disk for re-scoring (and are what Neo4j stores).
+                    stored_bytes = quantized_size(count, dims, "none")
+                    print(
+                        f"{dims:>5} {kind:>7} {(str(factor) + 'x') if kind != 'none' else '-':>7} "
+                        f"{statistics.fmean(recalls):>9.3f} {search_bytes / 2**20:>10.2f} {stored_bytes / 2**20:>10.2f} "
+                        f"{percentile(latencies, 50):>7.2f} {percentile(latencies, 95):>7.2f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
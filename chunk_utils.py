@@ -1,27 +1,47 @@
-from pathlib import Path
-from typing import List
+from __future__ import annotations
 
-# LangChain text splitters live in a dedicated distribution.
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
+import hashlib
+from pathlib import Path
+from typing import TYPE_CHECKING, List
 
 from config import settings
 from logger_factory import get_logger
 
 log = get_logger("chunk_utils")
 
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 def chunk_documents(raw_text: str, path: Path, doc_index: int) -> List[Document]:
+    # Imported here: langchain_text_splitters alone takes most of a second to import.
+    # LangChain text splitters live in a dedicated distribution.
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from langchain_core.documents import Document
+
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=settings.chunk_size,
         chunk_overlap=settings.chunk_overlap,
         separators=["\n\n", "\n", ". ", " "]
     )
     chunks = splitter.split_text(raw_text)
+    file_hash = content_hash(raw_text)
     # IMPORTANT: "doc_index" identifies the file in this run; "chunk_index" is the position within that file.
+    # "file_hash"/"content_hash" let incremental builds detect which files and chunks changed.
     return [
         Document(
             page_content=chunk,
-            metadata={"source": path.name, "doc_index": doc_index, "chunk_index": chunk_index},
+            metadata={
+                "source": path.name,
+                "doc_index": doc_index,
+                "chunk_index": chunk_index,
+                "file_hash": file_hash,
+                "content_hash": content_hash(chunk),
+            },
         )
         for chunk_index, chunk in enumerate(chunks)
     ]
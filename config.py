@@ -11,25 +11,124 @@ class Settings:
 
     # OpenAI Vector Store naming
     vector_store_name: str = os.getenv("RAG_VECTOR_STORE_NAME", "classic-rag-store")
+    # rag/ingest.py: chunk uploads kept in flight over one shared client.
+    rag_upload_concurrency: int = int(os.getenv("RAG_UPLOAD_CONCURRENCY", "8"))
 
     # Models
     embedding_model: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
-    # Keep this aligned with the embedding model output dimension.
-    # text-embedding-3-large -> 3072, text-embedding-3-small -> 1536
+    # Stored vector size. The model's native size (text-embedding-3-large -> 3072,
+    # text-embedding-3-small -> 1536) or, for text-embedding-3-*, a smaller
+    # Matryoshka prefix such as 1024 / 512 / 256 (graph_rag/vector_compression.py).
     embedding_dimensions: int = int(os.getenv("EMBEDDING_DIMENSIONS", "3072"))
+    # Searched representation: none | int8 | binary (int8: Neo4j index only, binary: local index only),
+    # re-scored at full precision over top_k * VECTOR_RESCORE_FACTOR candidates.
+    vector_quantization: str = os.getenv("VECTOR_QUANTIZATION", "none")
+    vector_rescore_factor: int = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))
     chat_model: str = os.getenv("MODEL_NAME", "gpt-5-nano")
 
     # Chunking
     chunk_size: int = int(os.getenv("CHUNK_SIZE", "600"))
     chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "120"))
 
+    # KG build: how many chunks are extracted concurrently, and per-chunk retry policy.
+    kg_concurrency: int = int(os.getenv("KG_CONCURRENCY", "4"))
+    kg_max_attempts: int = int(os.getenv("KG_MAX_ATTEMPTS", "5"))
+    kg_backoff_base_s: float = float(os.getenv("KG_BACKOFF_BASE_S", "1.0"))
+    kg_backoff_max_s: float = float(os.getenv("KG_BACKOFF_MAX_S", "30.0"))
+
+    # Post-build entity resolution (graph_rag/entity_resolution.py): same-label entities whose
+    # normalised names score >= the threshold are merged; with ENTITY_RESOLUTION_EMBEDDINGS=1
+    # near misses are also merged when their name embeddings are similar enough.
+    entity_resolution_threshold: float = float(os.getenv("ENTITY_RESOLUTION_THRESHOLD", "0.9"))
+    entity_resolution_embeddings: bool = os.getenv("ENTITY_RESOLUTION_EMBEDDINGS", "0").strip().lower() not in ("0", "false", "no", "off")
+    entity_resolution_embed_threshold: float = float(os.getenv("ENTITY_RESOLUTION_EMBED_THRESHOLD", "0.93"))
+    entity_resolution_batch_size: int = int(os.getenv("ENTITY_RESOLUTION_BATCH_SIZE", "200"))
+
+    # Batched embedding (populate_vector_index.py): per-request token budget and
+    # input cap, and how many requests are kept in flight.
+    embed_batch_tokens: int = int(os.getenv("EMBED_BATCH_TOKENS", "50000"))
+    embed_batch_size: int = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+    embed_concurrency: int = int(os.getenv("EMBED_CONCURRENCY", "4"))
+    # Per-batch retries with exponential backoff (same scheme as KG_MAX_ATTEMPTS / KG_BACKOFF_*).
+    embed_max_attempts: int = int(os.getenv("EMBED_MAX_ATTEMPTS", "5"))
+    embed_backoff_base_s: float = float(os.getenv("EMBED_BACKOFF_BASE_S", "1.0"))
+    embed_backoff_max_s: float = float(os.getenv("EMBED_BACKOFF_MAX_S", "30.0"))
+
+    # Persistent embedding cache (embedding_cache.py), keyed by model, dimensions and text hash.
+    embed_cache_enabled: bool = os.getenv("EMBED_CACHE", "1").strip().lower() not in ("0", "false", "no", "off")
+    embed_cache_path: str = os.getenv(
+        "EMBED_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "embeddings.sqlite")
+    )
+    embed_cache_max_mb: int = int(os.getenv("EMBED_CACHE_MAX_MB", "1024"))
+
     # Neo4j
     uri: str = os.getenv("NEO4J_URI", "neo4j://localhost:7687")
     user: str = os.getenv("NEO4J_USER", "neo4j")
     password: str = os.getenv("NEO4J_PASS")
     database: str = os.getenv("NEO4J_DB", "graph.rag.demo")
+    # Driver pool and transaction tuning (neo4j_connection.py); defaults are the driver's own.
+    neo4j_max_pool_size: int = int(os.getenv("NEO4J_MAX_POOL_SIZE", "100"))
+    neo4j_acquisition_timeout_s: float = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT_S", "60"))
+    neo4j_connection_timeout_s: float = float(os.getenv("NEO4J_CONNECTION_TIMEOUT_S", "30"))
+    neo4j_max_connection_lifetime_s: float = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME_S", "3600"))
+    # Records per fetch when streaming results; -1 fetches everything in one go.
+    neo4j_fetch_size: int = int(os.getenv("NEO4J_FETCH_SIZE", "1000"))
+    # How long managed transactions keep retrying transient errors.
+    neo4j_tx_retry_s: float = float(os.getenv("NEO4J_TX_RETRY_S", "30"))
 
     vector_index: str = os.getenv("VECTOR_INDEX", "docs")
+    # Full-text index on Chunk.text, used by RETRIEVAL_MODE=hybrid.
+    fulltext_index: str = os.getenv("FULLTEXT_INDEX", "chunk_text")
+    # GraphRAG retrieval: `vector`, or `hybrid` (vector + full-text, reciprocal rank fusion).
+    retrieval_mode: str = os.getenv("RETRIEVAL_MODE", "vector")
+    retrieval_top_k: int = int(os.getenv("RETRIEVAL_TOP_K", "25"))
+    # Hybrid: candidates taken from each ranking before fusion, and the RRF constant.
+    hybrid_candidates: int = int(os.getenv("HYBRID_CANDIDATES", "50"))
+    rrf_k: int = int(os.getenv("RRF_K", "60"))
+    # GraphRAG vector lookup: `neo4j` (db.index.vector.queryNodes) or `local`
+    # (graph_rag/local_index.py export; graph expansion still runs in Neo4j).
+    retrieval_backend: str = os.getenv("RETRIEVAL_BACKEND", "neo4j")
+    local_index_path: str = os.getenv(
+        "LOCAL_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "local_index")
+    )
+    # Exact top-k below this many chunks, HNSW (hnswlib) from here up.
+    local_index_hnsw_min: int = int(os.getenv("LOCAL_INDEX_HNSW_MIN", "20000"))
+    local_index_hnsw_ef: int = int(os.getenv("LOCAL_INDEX_HNSW_EF", "64"))
+    # graph_rag/query.py in-process cache (question -> embedding, retrieval key -> items);
+    # cleared whenever the build manifest changes.
+    query_cache_enabled: bool = os.getenv("QUERY_CACHE", "1").strip().lower() not in ("0", "false", "no", "off")
+    query_cache_ttl_s: float = float(os.getenv("QUERY_CACHE_TTL_S", "3600"))
+    query_cache_max_entries: int = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+
+    # GraphRAG retrieval expansion (graph_rag/expansion.py): hop 1 = entities mentioned by
+    # a hit chunk, hop 2 = their schema relationships; hubs are listed but never expanded.
+    graph_expansion_hops: int = int(os.getenv("GRAPH_EXPANSION_HOPS", "2"))
+    graph_expansion_max_entities: int = int(os.getenv("GRAPH_EXPANSION_MAX_ENTITIES", "15"))
+    graph_expansion_max_relations: int = int(os.getenv("GRAPH_EXPANSION_MAX_RELATIONS", "8"))
+    graph_expansion_hub_degree: int = int(os.getenv("GRAPH_EXPANSION_HUB_DEGREE", "50"))
+    graph_expansion_max_facts: int = int(os.getenv("GRAPH_EXPANSION_MAX_FACTS", "40"))
+
+    # GraphRAG prompt context (graph_rag/context_packer.py): merge adjacent chunks, dedupe
+    # facts, drop hits below mean - k*stddev of the scores, pack into a token budget.
+    context_packing: bool = os.getenv("CONTEXT_PACKING", "1").strip().lower() not in ("0", "false", "no", "off")
+    context_token_budget: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+    context_score_stddevs: float = float(os.getenv("CONTEXT_SCORE_STDDEVS", "0.5"))
+    context_min_hits: int = int(os.getenv("CONTEXT_MIN_HITS", "5"))
+    context_facts_share: float = float(os.getenv("CONTEXT_FACTS_SHARE", "0.25"))
+
+    # Stream answers token by token (ui.stream_qa_block); TTFT is recorded either way.
+    stream_answers: bool = os.getenv("STREAM_ANSWERS", "1").strip().lower() not in ("0", "false", "no", "off")
+    # Deadline per question on the async GraphRAG path (graph_rag/query.aquery); 0 = none.
+    query_timeout_s: float = float(os.getenv("QUERY_TIMEOUT_S", "120"))
+
+    # Query tracing (tracing.py): log | otel | none
+    trace_exporter: str = os.getenv("TRACE_EXPORTER", "log")
+
+    # Resident query service (query_server.py / query_client.py)
+    query_server_host: str = os.getenv("QUERY_SERVER_HOST", "127.0.0.1")
+    query_server_port: int = int(os.getenv("QUERY_SERVER_PORT", "8765"))
+    # batch_runner.py: (question x pipeline) jobs in flight.
+    batch_concurrency: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
 
 settings = Settings()
 
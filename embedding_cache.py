@@ -0,0 +1,306 @@
+"""Persistent embedding cache shared by the RAG and GraphRAG scripts.
+
+Vectors are stored in a local SQLite file keyed by (model, dimensions, sha256 of
+the text), so rebuilding an unchanged corpus or re-asking a question does not
+hit the embedding API again. The store is bounded by `EMBED_CACHE_MAX_MB`; once
+it grows past that the least recently used vectors are evicted.
+
+    embedder = cached_embedder(OpenAIEmbeddings(model=settings.embedding_model))
+    embedder.embed_query("...")      # miss -> OpenAI, stored
+    embedder.embed_query("...")      # hit  -> SQLite
+    await embedder.aembed_query("...")   # same, for the async query path
+    embedder.stats                   # CacheStats(hits=1, misses=1, ...)
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence
+
+from neo4j_graphrag.embeddings.base import Embedder
+from neo4j_graphrag.utils.rate_limit import NoOpRateLimitHandler
+
+from config import settings
+from logger_factory import get_logger
+
+log = get_logger("embedding_cache")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model      TEXT    NOT NULL,
+    dimensions INTEGER NOT NULL,
+    text_hash  TEXT    NOT NULL,
+    vector     BLOB    NOT NULL,
+    last_used  REAL    NOT NULL,
+    PRIMARY KEY (model, dimensions, text_hash)
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _pack(vector: Sequence[float]) -> bytes:
+    # float32 is what the API returns anyway; halves the store vs. float64.
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> list[float]:
+    vec = array("f")
+    vec.frombytes(blob)
+    return vec.tolist()
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    writes: int
+    evictions: int
+    size_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class EmbeddingCache:
+    """SQLite-backed (model, dimensions, text hash) -> vector store with LRU eviction."""
+
+    def __init__(self, path: str, *, max_bytes: int):
+        self.path = path
+        self.max_bytes = max(0, int(max_bytes))
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        # One connection shared across threads; every access goes through _lock.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._evictions = 0
+        row = self._conn.execute("SELECT coalesce(sum(length(vector)), 0) FROM embeddings").fetchone()
+        self._size_bytes = int(row[0])
+
+    def get_many(self, model: str, dimensions: int, hashes: Sequence[str]) -> dict[str, list[float]]:
+        """Return the cached vectors for `hashes` (missing ones are simply absent)."""
+        if not hashes:
+            return {}
+        found: dict[str, list[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND dimensions = ? AND text_hash IN ({marks})",
+                    (model, dimensions, *part),
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = _unpack(blob)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND dimensions = ? AND text_hash = ?",
+                    [(now, model, dimensions, h) for h in found],
+                )
+            self._hits += sum(1 for h in hashes if h in found)
+            self._misses += sum(1 for h in hashes if h not in found)
+        return found
+
+    def put_many(self, model: str, dimensions: int, entries: dict[str, Sequence[float]]) -> None:
+        if not entries:
+            return
+        now = time.time()
+        rows = [(model, dimensions, h, _pack(v), now) for h, v in entries.items()]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for row in rows:
+                    old = self._conn.execute(
+                        "SELECT length(vector) FROM embeddings WHERE model = ? AND dimensions = ? AND text_hash = ?",
+                        row[:3],
+                    ).fetchone()
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO embeddings (model, dimensions, text_hash, vector, last_used) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        row,
+                    )
+                    self._size_bytes += len(row[3]) - (int(old[0]) if old else 0)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._writes += len(rows)
+            if self.max_bytes and self._size_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Trim to 90% of the bound so we don't evict on every subsequent write.
+        target = int(self.max_bytes * 0.9)
+        while self._size_bytes > target:
+            rows = self._conn.execute(
+                "SELECT model, dimensions, text_hash, length(vector) FROM embeddings ORDER BY last_used LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._size_bytes = 0
+                return
+            victims = []
+            for model, dims, h, n in rows:
+                victims.append((model, dims, h))
+                self._size_bytes -= int(n)
+                if self._size_bytes <= target:
+                    break
+            self._conn.executemany(
+                "DELETE FROM embeddings WHERE model = ? AND dimensions = ? AND text_hash = ?", victims
+            )
+            self._evictions += len(victims)
+        log.debug("Evicted embeddings down to %d bytes", self._size_bytes)
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                writes=self._writes,
+                evictions=self._evictions,
+                size_bytes=self._size_bytes,
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._size_bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbedder(Embedder):
+    """Embedder that consults an `EmbeddingCache` before calling `inner`.
+
+    `batch_fn(texts)` embeds the misses of `embed_documents` in one go (e.g.
+    `embedding_batches.embed_texts`); without it misses are embedded one by one.
+    """
+
+    def __init__(
+        self,
+        inner: Embedder,
+        cache: EmbeddingCache,
+        *,
+        model: Optional[str] = None,
+        dimensions: Optional[int] = None,
+        batch_fn: Optional[Callable[[list[str]], list[list[float]]]] = None,
+    ):
+        # Retries stay with the wrapped embedder.
+        super().__init__(rate_limit_handler=NoOpRateLimitHandler())
+        self.inner = inner
+        self.cache = cache
+        self.model = model or getattr(inner, "model", None) or type(inner).__name__
+        self.dimensions = int(dimensions or getattr(inner, "dimensions", None) or settings.embedding_dimensions)
+        self._batch_fn = batch_fn
+
+    def embed_query(self, text: str) -> list[float]:
+        h = text_hash(text)
+        hit = self.cache.get_many(self.model, self.dimensions, [h])
+        if h in hit:
+            return hit[h]
+        vector = self.inner.embed_query(text)
+        self.cache.put_many(self.model, self.dimensions, {h: vector})
+        return vector
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """`embed_query` for asyncio: the (local) cache is read inline, a miss awaits `inner`."""
+        h = text_hash(text)
+        hit = self.cache.get_many(self.model, self.dimensions, [h])
+        if h in hit:
+            return hit[h]
+        vector = await aembed_query(self.inner, text)
+        self.cache.put_many(self.model, self.dimensions, {h: vector})
+        return vector
+
+    def embed_documents(self, texts: Sequence[str]) -> list[list[float]]:
+        hashes = [text_hash(t) for t in texts]
+        found = self.cache.get_many(self.model, self.dimensions, hashes)
+        missing: dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in found:
+                missing.setdefault(h, t)
+        if missing:
+            miss_texts = list(missing.values())
+            if self._batch_fn is not None:
+                vectors = self._batch_fn(miss_texts)
+            else:
+                vectors = [self.inner.embed_query(t) for t in miss_texts]
+            fresh = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(self.model, self.dimensions, fresh)
+            found.update(fresh)
+        return [found[h] for h in hashes]
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.cache.stats
+
+
+async def aembed_query(embedder: Embedder, text: str) -> list[float]:
+    """`embedder.aembed_query(text)`, or `embed_query` in a worker thread for embedders without one."""
+    native = getattr(embedder, "aembed_query", None)
+    if native is not None:
+        return await native(text)
+    return await asyncio.to_thread(embedder.embed_query, text)
+
+
+def open_default_cache() -> Optional[EmbeddingCache]:
+    """The cache configured in settings, or None when EMBED_CACHE is disabled."""
+    if not settings.embed_cache_enabled:
+        return None
+    return EmbeddingCache(settings.embed_cache_path, max_bytes=settings.embed_cache_max_mb * 1024 * 1024)
+
+
+def cached_embedder(
+    inner: Embedder,
+    *,
+    cache: Optional[EmbeddingCache] = None,
+    batch_fn: Optional[Callable[[list[str]], list[list[float]]]] = None,
+) -> Embedder:
+    """Wrap `inner` with the configured cache; returns `inner` unchanged when caching is off."""
+    cache = cache or open_default_cache()
+    if cache is None:
+        return inner
+    return CachedEmbedder(inner, cache, batch_fn=batch_fn)
+
+
+def close_cache(embedder: Embedder) -> None:
+    """Close the cache behind `embedder` if it is a `CachedEmbedder` (no-op otherwise)."""
+    if isinstance(embedder, CachedEmbedder):
+        embedder.cache.close()
+
+
+def log_cache_stats(logger: Any, embedder: Embedder) -> None:
+    stats = getattr(embedder, "stats", None)
+    if not isinstance(stats, CacheStats):
+        return
+    logger.info(
+        "Embedding cache: %d hit(s), %d miss(es) (%0.0f%% hit rate), %d evicted, %0.1f MB on disk",
+        stats.hits,
+        stats.misses,
+        100.0 * stats.hit_rate,
+        stats.evictions,
+        stats.size_bytes / (1024 * 1024),
+    )
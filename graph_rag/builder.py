@@ -1,83 +1,182 @@
+from __future__ import annotations
+
+import argparse
 import asyncio
 import os
 import sys
 import time
-
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-import neo4j
-
-from neo4j_graphrag.experimental.pipeline.kg_builder import SimpleKGPipeline
-from neo4j_graphrag.llm import OpenAILLM
-from neo4j_graphrag.embeddings import OpenAIEmbeddings
-from neo4j_graphrag.experimental.components.text_splitters.langchain import LangChainTextSplitterAdapter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 if __name__ == "__main__":
     # Ensure project root on sys.path when running as a script
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from config import settings, ensure_openai_key
 from chunk_utils import get_documents
+from entity_resolution import log_report, resolve_entities as resolve_entities_pass
+from embedding_cache import CachedEmbedder, EmbeddingCache, log_cache_stats, open_default_cache
 from logger_factory import bind, get_logger, new_run_id
+from kg_components import ChunkProvenance, CountingEmbedder, PreChunkedSplitter, chunk_provenance
+from kg_concurrency import AdaptiveLimiter, RetryStats, run_with_retry
+from manifest import ChunkRef, diff_manifest, load_manifest, manifest_from_documents, save_manifest
+from neo4j_connection import log_pool_metrics, read, write
+from resources import neo4j_driver, unwrap
 from schema import NODE_TYPES, RELATIONSHIP_TYPES, PATTERNS
+from token_utils import count_tokens
 from ui import status
 
+if TYPE_CHECKING:
+    from neo4j_graphrag.experimental.pipeline.kg_builder import SimpleKGPipeline
+
 log = get_logger("graph_rag.builder")
-driver = neo4j.GraphDatabase.driver(settings.uri, auth=(settings.user, settings.password))
-
-def _format_chunk_for_ingest(*, source: str | None, chunk_index: int | None, text: str) -> str:
-    # Encode provenance into the text so downstream Chunk nodes can be attributed
-    # even if the KG builder does not accept per-chunk metadata.
-    header_lines: list[str] = []
-    if source:
-        header_lines.append(f"SOURCE: {source}")
-    if chunk_index is not None:
-        header_lines.append(f"CHUNK_INDEX: {chunk_index}")
-    if not header_lines:
-        return text
-    return "\n".join(header_lines) + "\n\n" + text
-
-
-async def run_kg_pipeline_over_documents(documents) -> None:
-    """Run the SimpleKGPipeline over already-chunked Documents, preserving provenance."""
-
-    # Define LLM parameters
-    llm_model_params = {
-        # "max_tokens": 2000,
-        "response_format": {"type": "json_object"},
-        # "temperature": 0, not supported in gpt-5-nano
-        "top_p": 1.0,
-    }
-
-    # Create the LLM instance
-    llm = OpenAILLM(
-        model_name=settings.chat_model,
-        model_params=llm_model_params,
+# Created on first use; `--help` neither connects nor needs credentials.
+driver = neo4j_driver()
+
+def _build_kg_pipeline(*, llm, embedder, neo4j_driver, kg_writer=None) -> SimpleKGPipeline:
+    # Entity resolution is deferred to a single pass after all chunks are written,
+    # so the resulting graph does not depend on the order chunks complete in.
+    # Chunks arrive pre-split from chunk_utils, so the pipeline must not split again;
+    # its chunk embedder writes the one and only embedding onto each Chunk node.
+    from neo4j_graphrag.experimental.pipeline.kg_builder import SimpleKGPipeline
+
+    return SimpleKGPipeline(
+        llm=llm,
+        driver=neo4j_driver,
+        embedder=embedder,
+        from_pdf=False,
+        text_splitter=PreChunkedSplitter(),
+        kg_writer=kg_writer,
+        perform_entity_resolution=False,
+        schema={
+            "node_types": NODE_TYPES,
+            "relationship_types": RELATIONSHIP_TYPES,
+            "patterns": PATTERNS,
+        },
+        neo4j_database=settings.database  # Using raw text input, not PDF
+    )
+
+
+@dataclass(frozen=True)
+class KGIngestReport:
+    chunks: int
+    succeeded: int
+    failed: int
+    retries: int
+    rate_limited: int
+    concurrency: int
+    peak_in_flight: int
+    latency_s: float
+    failed_chunks: tuple[ChunkRef, ...] = ()
+    # Chunks written by this run (to be linked to their Document / neighbours).
+    ingested_chunks: tuple[ChunkRef, ...] = ()
+    # Embedding spend of this build vs. the old re-split + re-embed path.
+    embedding_calls: int = 0
+    embedding_tokens: int = 0
+    legacy_embedding_calls: int = 0
+    legacy_embedding_tokens: int = 0
+    # Chunk embeddings served from the local embedding cache instead of the API.
+    embedding_cache_hits: int = 0
+    embedding_cache_misses: int = 0
+
+
+def _legacy_embedding_cost(chunk_texts: list[str]) -> tuple[int, int]:
+    """(calls, tokens) the previous build path would have spent on `chunk_texts`.
+
+    It re-split every chunk with a second RecursiveCharacterTextSplitter, embedded
+    each piece inside the pipeline and then embedded every Chunk node again in
+    populate_vector_index.py. Computed locally; no API calls.
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=settings.chunk_size,
+        chunk_overlap=settings.chunk_overlap,
+        separators=["\n\n", "\n", ". ", " "]
     )
+    calls = 0
+    tokens = 0
+    for text in chunk_texts:
+        pieces = splitter.split_text(text)
+        calls += 2 * len(pieces)
+        tokens += 2 * sum(count_tokens(p) for p in pieces)
+    return calls, tokens
+
+
+async def run_kg_pipeline_over_documents(
+    documents,
+    *,
+    concurrency: int | None = None,
+    llm=None,
+    embedder=None,
+    kg_writer=None,
+    neo4j_driver=None,
+    resolve_entities: bool = True,
+    embedding_cache: EmbeddingCache | None = None,
+) -> KGIngestReport:
+    """Run the SimpleKGPipeline over already-chunked Documents, preserving provenance.
+
+    Up to `concurrency` chunks (default: KG_CONCURRENCY) are extracted at once. Each
+    chunk is retried with backoff, and rate limits shrink the in-flight window for
+    every worker until calls start succeeding again.
+
+    Chunk embeddings go through `embedding_cache` (by default the configured cache
+    when the OpenAI embedder is created here), so unchanged text is never re-embedded.
+    """
 
-    # Create the embedder instance
-    embedder = OpenAIEmbeddings(model=settings.embedding_model)
+    concurrency = max(1, int(concurrency or settings.kg_concurrency))
+    # SimpleKGPipeline type-checks its driver, so hand it the real one.
+    neo4j_driver = unwrap(neo4j_driver or driver)
+    owns_llm = llm is None
+    owns_embedder = embedder is None
+    if llm is None:
+        from neo4j_graphrag.llm import OpenAILLM
+        from neo4j_graphrag.utils.rate_limit import NoOpRateLimitHandler
+
+        # Define LLM parameters
+        llm_model_params = {
+            # "max_tokens": 2000,
+            "response_format": {"type": "json_object"},
+            # "temperature": 0, not supported in gpt-5-nano
+            "top_p": 1.0,
+        }
+        # Create the LLM instance; retries/backoff are owned by the limiter below.
+        llm = OpenAILLM(
+            model_name=settings.chat_model,
+            model_params=llm_model_params,
+            rate_limit_handler=NoOpRateLimitHandler(),
+        )
+    if embedder is None:
+        from vector_compression import make_embedder
+
+        # Create the embedder instance
+        embedder = make_embedder()
+    counting_embedder = CountingEmbedder(embedder)
+    owns_cache = embedding_cache is None and owns_embedder
+    if owns_cache:
+        embedding_cache = open_default_cache()
+    pipeline_embedder = counting_embedder
+    if embedding_cache is not None:
+        pipeline_embedder = CachedEmbedder(counting_embedder, embedding_cache, model=getattr(embedder, "model", None))
+    cache_before = embedding_cache.stats if embedding_cache is not None else None
+
+    documents = list(documents or [])
+    total = len(documents)
+    # Provenance goes into Chunk properties (see PreChunkedSplitter), so the text
+    # that is embedded and later prompted is exactly the chunk.
+    chunk_texts = [d.page_content for d in documents]
+    limiter = AdaptiveLimiter(concurrency)
+    stats = RetryStats()
+    done = 0
+    failed: list[ChunkRef] = []
+    ingested: list[ChunkRef] = []
+    t0 = time.perf_counter()
 
     try:
         # Reuse one pipeline instance; we already chunk in chunk_utils.
-        kg_builder = SimpleKGPipeline(
-            llm=llm,
-            driver=driver,
-            embedder=embedder,
-            from_pdf=False, 
-            text_splitter=LangChainTextSplitterAdapter(RecursiveCharacterTextSplitter(
-                chunk_size=settings.chunk_size,
-                chunk_overlap=settings.chunk_overlap,
-                separators=["\n\n", "\n", ". ", " "]
-            )),
-            schema={
-                "node_types": NODE_TYPES,
-                "relationship_types": RELATIONSHIP_TYPES,
-                "patterns": PATTERNS,
-            },
-            neo4j_database=settings.database  # Using raw text input, not PDF
-        )
+        kg_builder = _build_kg_pipeline(llm=llm, embedder=pipeline_embedder, neo4j_driver=neo4j_driver, kg_writer=kg_writer)
 
-        total = len(documents) if documents is not None else 0
-        for i, d in enumerate(documents or [], start=1):
+        async def ingest(i: int, d) -> bool:
+            nonlocal done, failed
             src = None
             idx = None
             try:
@@ -87,90 +186,268 @@ async def run_kg_pipeline_over_documents(documents) -> None:
                 src = None
                 idx = None
 
-            chunk_text = _format_chunk_for_ingest(source=src, chunk_index=idx, text=d.page_content)
-            if i == 1 or i % 25 == 0:
-                log.info("Ingesting chunk %d/%d", i, total)
-            await kg_builder.run_async(text=chunk_text)
+            chunk_text = chunk_texts[i - 1]
+            content_hash = (d.metadata or {}).get("content_hash")
+            # Tag the per-chunk lexical Document node so incremental builds can find
+            # (and retract) everything this run wrote.
+            document_metadata = {
+                "ingest_source": str(src),
+                "ingest_chunk_index": str(idx),
+                "content_hash": str(content_hash),
+            } if src is not None and content_hash else None
+
+            if src is not None and idx is not None:
+                # Read by PreChunkedSplitter; scoped to this chunk's task.
+                chunk_provenance.set(ChunkProvenance(str(src), int(idx), str(content_hash) if content_hash else None))
+
+            def on_retry(attempt: int, e: BaseException, delay: float) -> None:
+                log.warning(
+                    "Chunk %d/%d failed (attempt %d), retrying in %0.1fs: %s",
+                    i, total, attempt, delay, e,
+                )
+
+            try:
+                await run_with_retry(
+                    limiter,
+                    lambda: kg_builder.run_async(text=chunk_text, document_metadata=document_metadata),
+                    max_attempts=settings.kg_max_attempts,
+                    backoff_base_s=settings.kg_backoff_base_s,
+                    backoff_max_s=settings.kg_backoff_max_s,
+                    stats=stats,
+                    on_retry=on_retry,
+                )
+            except Exception as e:
+                if src is not None and content_hash:
+                    failed.append(ChunkRef(src, int(idx), content_hash))
+                log.error("Giving up on chunk %d/%d (source=%s chunk_index=%s): %s", i, total, src, idx, e)
+                return False
+            done += 1
+            if src is not None and idx is not None:
+                ingested.append(ChunkRef(str(src), int(idx), str(content_hash or "")))
+            if done == 1 or done % 25 == 0:
+                log.info("Ingested chunk %d/%d (in flight limit %d)", done, total, limiter.limit)
+            return True
+
+        await asyncio.gather(*(ingest(i, d) for i, d in enumerate(documents, start=1)))
+
+        if resolve_entities and kg_writer is None and documents:
+            # Label + normalised-name blocking and fuzzy matching (entity_resolution.py).
+            resolution, _ = await asyncio.to_thread(
+                resolve_entities_pass, neo4j_driver, database=settings.database
+            )
+            log_report(log, resolution)
     except Exception as e:
         log.exception("Error occurred while processing chunks: %s", e)
     finally:
-        try:
-            embedder.client.close()
-        except Exception:
-            pass
-        await llm.async_client.close()
-
-
-def _backfill_chunk_provenance() -> int:
-    """Best-effort: parse SOURCE/CHUNK_INDEX headers into Chunk properties for citations."""
-    cypher = """
-    MATCH (c:Chunk)
-    WHERE c.source IS NULL AND c.text STARTS WITH 'SOURCE:'
-    WITH c, split(c.text, '\n') AS lines
-    WITH c,
-         lines[0] AS l0,
-         CASE WHEN size(lines) > 1 THEN lines[1] ELSE '' END AS l1
-    SET c.source = trim(replace(l0, 'SOURCE:', ''))
-    SET c.source_chunk_index = CASE
-        WHEN l1 STARTS WITH 'CHUNK_INDEX:' THEN toInteger(trim(replace(l1, 'CHUNK_INDEX:', '')))
-        ELSE c.source_chunk_index
-    END
-    SET c.index = coalesce(c.index, c.source_chunk_index)
-    RETURN count(c) AS updated
-    """
-
-    with driver.session(database=settings.database) as session:
-        rec = session.run(cypher).single()
-        return int(rec["updated"]) if rec and "updated" in rec else 0
+        if owns_embedder:
+            try:
+                embedder.close()
+            except Exception:
+                pass
+        if owns_llm:
+            await llm.async_client.close()
+
+    usage = counting_embedder.usage
+    cache_hits = cache_misses = 0
+    if embedding_cache is not None:
+        cache_after = embedding_cache.stats
+        cache_hits = cache_after.hits - cache_before.hits
+        cache_misses = cache_after.misses - cache_before.misses
+        if isinstance(pipeline_embedder, CachedEmbedder):
+            log_cache_stats(log, pipeline_embedder)
+        if owns_cache:
+            embedding_cache.close()
+    legacy_calls, legacy_tokens = _legacy_embedding_cost(chunk_texts)
+    return KGIngestReport(
+        chunks=total,
+        succeeded=done,
+        failed=total - done,
+        retries=stats.retries,
+        rate_limited=stats.rate_limited,
+        concurrency=concurrency,
+        peak_in_flight=limiter.peak_in_flight,
+        latency_s=time.perf_counter() - t0,
+        failed_chunks=tuple(failed),
+        ingested_chunks=tuple(ingested),
+        embedding_calls=usage.calls,
+        embedding_tokens=usage.tokens,
+        legacy_embedding_calls=legacy_calls,
+        legacy_embedding_tokens=legacy_tokens,
+        embedding_cache_hits=cache_hits,
+        embedding_cache_misses=cache_misses,
+    )
 
 
-def _link_chunks_to_documents_and_next() -> dict:
-    """Create :Document nodes and connect :Chunk nodes via :IN_DOC and :NEXT.
+def _link_chunks(refs: list[ChunkRef], batch_size: int = 500) -> dict:
+    """Connect the given chunks to their per-file :Document (:IN_DOC) and neighbours (:NEXT).
 
-    This improves navigability and lets GraphRAG pull structured context even when
-    entities are duplicated across chunks.
+    Only `refs` (chunks written or moved by this run) are touched, in batched
+    UNWIND transactions that look chunks up by (source, source_chunk_index).
+    Stale :NEXT edges are dropped first, for the affected files only.
     """
 
-    create_constraint = """
-    CREATE CONSTRAINT document_source_unique IF NOT EXISTS
-    FOR (d:Document)
-    REQUIRE d.source IS UNIQUE
+    unlink_stale_next = """
+    UNWIND $sources AS s
+    MATCH (a:Chunk {source: s})-[r:NEXT]->(b:Chunk)
+    WHERE b.source <> a.source OR b.source_chunk_index <> a.source_chunk_index + 1
+    DELETE r
+    RETURN count(r) AS removed
     """
 
-    link_in_doc = """
-    MATCH (c:Chunk)
-    WHERE c.source IS NOT NULL
-    MERGE (d:Document {source: c.source})
+    link = """
+    UNWIND $rows AS row
+    MATCH (c:Chunk {source: row.source, source_chunk_index: row.chunk_index})
+    MERGE (d:Document {source: row.source})
     MERGE (c)-[:IN_DOC]->(d)
-    RETURN count(*) AS linked
+    WITH c, row
+    OPTIONAL MATCH (p:Chunk {source: row.source, source_chunk_index: row.chunk_index - 1})
+    OPTIONAL MATCH (n:Chunk {source: row.source, source_chunk_index: row.chunk_index + 1})
+    FOREACH (_ IN CASE WHEN p IS NULL THEN [] ELSE [1] END | MERGE (p)-[:NEXT]->(c))
+    FOREACH (_ IN CASE WHEN n IS NULL THEN [] ELSE [1] END | MERGE (c)-[:NEXT]->(n))
+    RETURN count(c) AS linked, count(p) + count(n) AS neighbours
     """
 
-    link_next = """
-    MATCH (d:Document)<-[:IN_DOC]-(c:Chunk)
-    WITH d, c
-    ORDER BY coalesce(c.source_chunk_index, c.index, 0) ASC
-    WITH d, collect(c) AS chunks
-    WITH chunks, size(chunks) AS n
-    WHERE n >= 2
-    UNWIND range(0, n - 2) AS i
-    WITH chunks[i] AS c1, chunks[i + 1] AS c2
-    MERGE (c1)-[:NEXT]->(c2)
-    RETURN count(*) AS created
+    def _tx(tx, rows):
+        rec = tx.run(link, rows=rows).single()
+        return (int(rec["linked"]), int(rec["neighbours"])) if rec else (0, 0)
+
+    totals = {"in_doc": 0, "next": 0, "stale_next_removed": 0}
+    if not refs:
+        return totals
+    sources = sorted({r.source for r in refs})
+    with driver.session(database=settings.database) as session:
+        removed = session.execute_write(lambda tx: tx.run(unlink_stale_next, sources=sources).single())
+        totals["stale_next_removed"] = int(removed["removed"]) if removed else 0
+        for start in range(0, len(refs), batch_size):
+            rows = [{"source": r.source, "chunk_index": r.chunk_index} for r in refs[start:start + batch_size]]
+            linked, neighbours = session.execute_write(_tx, rows)
+            totals["in_doc"] += linked
+            totals["next"] += neighbours
+    return totals
+
+
+def _ensure_ingest_indexes() -> None:
+    # One managed transaction per schema statement (IF NOT EXISTS: safe to retry).
+    # Per-chunk lexical Document nodes are looked up by hash when retracting/reindexing.
+    write(driver, "CREATE INDEX document_content_hash IF NOT EXISTS FOR (d:Document) ON (d.content_hash)")
+    # _link_chunks: chunks by position, per-file Documents by source.
+    write(driver, "CREATE INDEX chunk_provenance IF NOT EXISTS FOR (c:Chunk) ON (c.source, c.source_chunk_index)")
+    write(driver, "CREATE CONSTRAINT document_source_unique IF NOT EXISTS FOR (d:Document) REQUIRE d.source IS UNIQUE")
+
+
+def _count_chunks() -> int:
+    records = read(driver, "MATCH (c:Chunk) RETURN count(c) AS c")
+    return int(records[0]["c"]) if records else 0
+
+
+def _retract_chunks(refs: list[ChunkRef], batch_size: int = 500) -> dict:
+    """Delete the Chunk nodes written for `refs` plus entities no other chunk mentions."""
+
+    delete_chunks = """
+    UNWIND $rows AS row
+    MATCH (pd:Document {ingest_source: row.source, ingest_chunk_index: row.chunk_index, content_hash: row.content_hash})
+    OPTIONAL MATCH (c:Chunk)-[:FROM_DOCUMENT]->(pd)
+    OPTIONAL MATCH (e:__Entity__)-[:FROM_CHUNK]->(c)
+    WITH pd, collect(DISTINCT c) AS chunks, collect(DISTINCT elementId(e)) AS entity_ids
+    FOREACH (c IN chunks | DETACH DELETE c)
+    DETACH DELETE pd
+    RETURN sum(size(chunks)) AS chunks, reduce(acc = [], ids IN collect(entity_ids) | acc + ids) AS entity_ids
     """
 
+    delete_orphans = """
+    UNWIND $entity_ids AS id
+    MATCH (e:__Entity__)
+    WHERE elementId(e) = id AND NOT (e)-[:FROM_CHUNK]->(:Chunk)
+    DETACH DELETE e
+    RETURN count(*) AS entities
+    """
+
+    def _tx(tx, rows):
+        rec = tx.run(delete_chunks, rows=rows).single()
+        chunks = int(rec["chunks"] or 0) if rec else 0
+        entity_ids = list(set(rec["entity_ids"] or [])) if rec else []
+        entities = 0
+        if entity_ids:
+            orphans = tx.run(delete_orphans, entity_ids=entity_ids).single()
+            entities = int(orphans["entities"]) if orphans else 0
+        return chunks, entities
+
+    totals = {"chunks": 0, "entities": 0}
     with driver.session(database=settings.database) as session:
-        session.run(create_constraint)
-        linked = session.run(link_in_doc).single()
-        created = session.run(link_next).single()
+        for start in range(0, len(refs), batch_size):
+            rows = [
+                {"source": r.source, "chunk_index": str(r.chunk_index), "content_hash": r.content_hash}
+                for r in refs[start:start + batch_size]
+            ]
+            chunks, entities = session.execute_write(_tx, rows)
+            totals["chunks"] += chunks
+            totals["entities"] += entities
+        # Per-file Document nodes that lost all their chunks (deleted files).
+        sources = sorted({r.source for r in refs})
+        session.execute_write(
+            lambda tx: tx.run(
+                """
+                UNWIND $sources AS s
+                MATCH (d:Document {source: s})
+                WHERE NOT (d)<-[:IN_DOC]-(:Chunk)
+                DETACH DELETE d
+                """,
+                sources=sources,
+            ).consume()
+        )
+    return totals
+
+
+def _reindex_moved_chunks(moved: list[tuple[ChunkRef, int]]) -> int:
+    """Update the position of chunks whose content is unchanged but moved within a file."""
+
+    # Two phases so swaps between identical-content chunks never collide.
+    stage = """
+    UNWIND $rows AS row
+    MATCH (pd:Document {ingest_source: row.source, ingest_chunk_index: row.old_index, content_hash: row.content_hash})
+    SET pd.ingest_chunk_index = 'moving:' + row.new_index
+    RETURN count(pd) AS staged
+    """
+    commit = """
+    MATCH (pd:Document)
+    WHERE pd.ingest_chunk_index STARTS WITH 'moving:'
+    SET pd.ingest_chunk_index = substring(pd.ingest_chunk_index, 7)
+    WITH pd
+    MATCH (c:Chunk)-[:FROM_DOCUMENT]->(pd)
+    SET c.source_chunk_index = toInteger(pd.ingest_chunk_index),
+        c.index = toInteger(pd.ingest_chunk_index)
+    RETURN count(DISTINCT pd) AS moved
+    """
+    rows = [
+        {"source": ref.source, "old_index": str(ref.chunk_index), "new_index": str(new_index), "content_hash": ref.content_hash}
+        for ref, new_index in moved
+    ]
 
-    return {
-        "in_doc": int(linked["linked"]) if linked and "linked" in linked else 0,
-        "next": int(created["created"]) if created and "created" in created else 0,
-    }
+    def _tx(tx):
+        tx.run(stage, rows=rows).consume()
+        rec = tx.run(commit).single()
+        return int(rec["moved"]) if rec else 0
+
+    with driver.session(database=settings.database) as session:
+        return session.execute_write(_tx)
 
 
 async def main() -> None:
     try:
+        parser = argparse.ArgumentParser(description="Build the knowledge graph from data/")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.kg_concurrency,
+            help="How many chunks to extract concurrently (default: KG_CONCURRENCY)",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only extract new/changed chunks and retract deleted ones (uses graph_rag/.build_manifest.json)",
+        )
+        args = parser.parse_args()
+
         ensure_openai_key()
 
         run_id = new_run_id()
@@ -189,19 +466,84 @@ async def main() -> None:
             documents = get_documents()
         log_ctx.info("Starting KG pipeline", files=len({d.metadata.get("source") for d in documents}), chunks=len(documents))
 
-        t0 = time.perf_counter()
-        with status("Building knowledge graph (GraphRAG)…"):
-            await run_kg_pipeline_over_documents(documents)
-        log_ctx.info("KG pipeline finished", latency_s=f"{time.perf_counter() - t0:0.2f}")
+        _ensure_ingest_indexes()
+
+        to_ingest = documents
+        moved_refs: list[ChunkRef] = []
+        if args.incremental:
+            diff = diff_manifest(load_manifest(), documents)
+            if diff.full_rebuild_reason:
+                existing = _count_chunks()
+                if existing:
+                    raise RuntimeError(
+                        f"Incremental build needs a full rebuild ({diff.full_rebuild_reason}) but the database "
+                        f"already holds {existing} Chunk node(s). Run: zsh rebuild-graph-rag.sh"
+                    )
+                log_ctx.info("Incremental build falls back to full build", reason=diff.full_rebuild_reason)
+            log_ctx.info(
+                "Incremental diff",
+                added=len(diff.added),
+                removed=len(diff.removed),
+                moved=len(diff.moved),
+                unchanged=diff.unchanged,
+                files=len(diff.changed_sources),
+            )
+            if diff.removed:
+                with status("Retracting deleted chunks…"):
+                    retracted = _retract_chunks(diff.removed)
+                log_ctx.info("Retracted chunks", **retracted)
+            if diff.moved:
+                with status("Reindexing moved chunks…"):
+                    moved = _reindex_moved_chunks(diff.moved)
+                log_ctx.info("Reindexed moved chunks", moved=moved)
+                moved_refs = [ChunkRef(ref.source, new_index, ref.content_hash) for ref, new_index in diff.moved]
+            to_ingest = diff.added
+            if diff.is_empty:
+                log_ctx.info("Graph is up to date; nothing to extract")
+                return
 
-        with status("Backfilling Chunk provenance…"):
-            updated = _backfill_chunk_provenance()
-        log_ctx.info("Chunk provenance backfilled", updated=updated)
+        with status("Building knowledge graph (GraphRAG)…"):
+            report = await run_kg_pipeline_over_documents(to_ingest, concurrency=args.concurrency)
+        log_ctx.info(
+            "KG pipeline finished",
+            latency_s=f"{report.latency_s:0.2f}",
+            chunks=report.chunks,
+            succeeded=report.succeeded,
+            failed=report.failed,
+            retries=report.retries,
+            rate_limited=report.rate_limited,
+            concurrency=report.concurrency,
+            peak_in_flight=report.peak_in_flight,
+        )
+        log_ctx.info(
+            "Embedding report: %d call(s) / %d token(s) spent (%d served from cache); re-split + re-embed path would spend %d / %d; saved %d call(s) / %d token(s)",
+            report.embedding_calls,
+            report.embedding_tokens,
+            report.embedding_cache_hits,
+            report.legacy_embedding_calls,
+            report.legacy_embedding_tokens,
+            report.legacy_embedding_calls - report.embedding_calls,
+            report.legacy_embedding_tokens - report.embedding_tokens,
+            embedding_calls=report.embedding_calls,
+            embedding_tokens=report.embedding_tokens,
+            legacy_embedding_calls=report.legacy_embedding_calls,
+            legacy_embedding_tokens=report.legacy_embedding_tokens,
+            calls_saved=report.legacy_embedding_calls - report.embedding_calls,
+            tokens_saved=report.legacy_embedding_tokens - report.embedding_tokens,
+            embedding_cache_hits=report.embedding_cache_hits,
+            embedding_cache_misses=report.embedding_cache_misses,
+        )
 
         with status("Linking chunks to documents…"):
-            links = _link_chunks_to_documents_and_next()
+            links = _link_chunks(list(report.ingested_chunks) + moved_refs)
         log_ctx.info("Chunk document linking complete", **links)
 
+        # Chunks that failed extraction stay out of the manifest so the next
+        # incremental build retries them.
+        save_manifest(manifest_from_documents(documents, exclude=report.failed_chunks))
+        log_ctx.info("Build manifest saved", failed=len(report.failed_chunks))
+        log_pool_metrics(log_ctx, driver)
+
         # for d in documents:
         #     log.info("Processing document chunk: %s", d.metadata.get("source"))
 
@@ -1,54 +1,80 @@
+"""Reset the GraphRAG database: delete all data, then drop constraints and indexes.
+
+Strategies (`--strategy`, or CLEANUP_STRATEGY; default `auto`):
+
+- `recreate`: `CREATE OR REPLACE DATABASE` on the system database. Data and
+  schema go in one step; needs admin rights (Enterprise edition).
+- `parallel`: relationships are deleted first, partitioned by type, then nodes,
+  partitioned by their first label, by CLEANUP_WORKERS sessions at a time.
+- `transactions`: one session, relationships first then nodes, each with
+  `CALL { ... } IN TRANSACTIONS OF <batch> ROWS` so the server batches a single
+  scan instead of the client re-running `MATCH (n) ... LIMIT` per batch.
+
+`auto` uses `recreate` when permitted, `parallel` from CLEANUP_PARALLEL_MIN
+nodes up (and more than one label), and `transactions` otherwise.
+"""
+import argparse
 import os
 import sys
 import time
-
-from neo4j import GraphDatabase
+from concurrent.futures import ThreadPoolExecutor
 
 if __name__ == "__main__":
-    # Ensure project root on sys.path when running as a script
-    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+	# Ensure project root on sys.path when running as a script
+	sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from config import settings
 from logger_factory import get_logger
+from manifest import delete_manifest
+from neo4j_connection import read, write
+from resources import neo4j_driver
 
 log = get_logger("graph_rag.cleanup")
-driver = GraphDatabase.driver(settings.uri, auth=(settings.user, settings.password))
+# Created on first use; `--help` neither imports the driver nor connects.
+driver = neo4j_driver()
+
+STRATEGIES = ("auto", "recreate", "parallel", "transactions")
 
 def _qname(name: str) -> str:
 	# Backtick-escape an identifier
 	return "`" + str(name).replace("`", "") + "`"
 
 
-def _drop_vector_index(session, name: str):
+def _drop_vector_index(name: str):
 	if not name:
 		return
 	# Check whether the specific vector index exists, then drop it
-	found = session.run(
-		"SHOW INDEXES YIELD name, type WHERE name=$name RETURN name, type",
-		name=name,
-	).single()
+	found = read(driver, "SHOW INDEXES YIELD name, type WHERE name=$name RETURN name, type", {"name": name})
 	if found:
-		session.run(f"DROP INDEX {_qname(name)} IF EXISTS")
+		write(driver, f"DROP INDEX {_qname(name)} IF EXISTS")
 		log.info(f"Dropped vector index: {name}")
 	else:
 		log.debug(f"Vector index not found: {name}")
 
 
-def _drop_all_constraints(session):
+def _drop_schema(statements: list[str]):
+	# Schema commands can share a transaction: one commit instead of one per drop.
+	def _tx(tx):
+		for stmt in statements:
+			tx.run(stmt).consume()
+	with driver.session(database=settings.database) as session:
+		session.execute_write(_tx)
+
+
+def _drop_all_constraints():
 	# Collect and drop all constraints by name
-	result = session.run("SHOW CONSTRAINTS YIELD name RETURN name")
-	names = [r["name"] for r in result]
+	names = [r["name"] for r in read(driver, "SHOW CONSTRAINTS YIELD name RETURN name")]
 	if not names:
 		log.info("No constraints to drop.")
 		return
 	log.info(f"Dropping {len(names)} constraint(s)...")
+	_drop_schema([f"DROP CONSTRAINT {_qname(n)} IF EXISTS" for n in names])
 	for n in names:
-		session.run(f"DROP CONSTRAINT {_qname(n)} IF EXISTS")
 		log.debug(f"  - Dropped constraint: {n}")
 
 
-def _drop_all_indexes(session):
+def _drop_all_indexes():
 	# Drop all indexes except system-managed LOOKUP indexes
-	result = session.run("SHOW INDEXES YIELD name, type RETURN name, type")
+	result = read(driver, "SHOW INDEXES YIELD name, type RETURN name, type")
 	to_drop = []
 	for r in result:
 		idx_name = r["name"]
@@ -60,68 +86,175 @@ def _drop_all_indexes(session):
 		log.info("No indexes to drop (excluding LOOKUP).")
 		return
 	log.info(f"Dropping {len(to_drop)} index(es) (excluding LOOKUP)...")
+	_drop_schema([f"DROP INDEX {_qname(n)} IF EXISTS" for n in to_drop])
 	for idx_name in to_drop:
-		session.run(f"DROP INDEX {_qname(idx_name)} IF EXISTS")
 		log.debug(f"  - Dropped index: {idx_name}")
 
 
-def _delete_all_data(session, batch_size: int = 10000, log_every: int = 5) -> int:
-	# Delete nodes in batches to avoid memory/timeouts on large graphs
-	total = 0
-	batches = 0
-	while True:
-		rec = session.run(
-			"""
-			MATCH (n)
-			WITH n LIMIT $batch
-			WITH collect(n) AS batch
-			FOREACH (n IN batch | DETACH DELETE n)
-			RETURN size(batch) AS c
-			""",
-			batch=batch_size,
-		).single()
-		count = rec["c"] if rec else 0
-		if count == 0:
-			break
-		total += count
-		batches += 1
-		if batches % max(1, log_every) == 0:
-			log.info(f"🗑️ Deleted {total:,} nodes so far ({batches} batch(es))...")
-	return total
-
-
-def cleanup():
+def _count_graph() -> tuple[int, int]:
+	# Both counts come from the count store.
+	nodes = read(driver, "MATCH (n) RETURN count(n) AS c")[0]["c"]
+	rels = read(driver, "MATCH ()-[r]->() RETURN count(r) AS c")[0]["c"]
+	return int(nodes), int(rels)
+
+
+def _can_recreate() -> bool:
+	# CREATE OR REPLACE DATABASE needs Enterprise edition and the admin role.
+	from neo4j.exceptions import Neo4jError
+
+	try:
+		editions = read(driver, "CALL dbms.components() YIELD edition RETURN edition", database="system")
+		if not editions or str(editions[0]["edition"]).lower() != "enterprise":
+			return False
+		users = read(driver, "SHOW CURRENT USER YIELD roles RETURN roles", database="system")
+		return bool(users) and "admin" in (users[0]["roles"] or [])
+	except Neo4jError as e:
+		log.debug(f"Cannot check admin rights: {e}")
+		return False
+
+
+def _recreate_database():
+	# Administration command with WAIT: auto-commit only.
+	with driver.session(database="system") as session:
+		session.run("CREATE OR REPLACE DATABASE $name WAIT", name=settings.database).consume()
+
+
+def _delete_in_transactions(session, match: str, *, var: str, batch_size: int, retries: int = 5, **params):
+	"""Delete every `var` matched by `match`, batched server-side.
+
+	The statement is idempotent (it only sees what is left), so a deadlock with a
+	concurrent partition is handled by running it again.
+	"""
+	from neo4j.exceptions import TransientError
+
+	delete = "DETACH DELETE" if var == "n" else "DELETE"
+	cypher = f"""
+	{match}
+	CALL {{ WITH {var} {delete} {var} }} IN TRANSACTIONS OF $batch ROWS
+	"""
+	for attempt in range(1, retries + 1):
+		try:
+			session.run(cypher, batch=batch_size, **params).consume()
+			return
+		except TransientError as e:
+			if attempt == retries:
+				raise
+			log.debug(f"Retrying delete after transient error ({attempt}/{retries}): {e}")
+			time.sleep(0.2 * attempt)
+
+
+def _delete_transactions(batch_size: int):
+	with driver.session(database=settings.database) as session:
+		# Relationships first: node deletes then no longer have to walk and lock them.
+		_delete_in_transactions(session, "MATCH ()-[r]->() WITH r", var="r", batch_size=batch_size)
+		_delete_in_transactions(session, "MATCH (n) WITH n", var="n", batch_size=batch_size)
+
+
+def _delete_parallel(batch_size: int, workers: int):
+	types = [r["relationshipType"] for r in read(driver, "CALL db.relationshipTypes()")]
+	labels = [r["label"] for r in read(driver, "CALL db.labels()")]
+
+	def _rels(rel_type: str):
+		with driver.session(database=settings.database) as s:
+			_delete_in_transactions(s, f"MATCH ()-[r:{_qname(rel_type)}]->() WITH r", var="r", batch_size=batch_size)
+
+	def _nodes(label: str):
+		# A node belongs to the partition of its first label only, so workers never share nodes.
+		with driver.session(database=settings.database) as s:
+			_delete_in_transactions(
+				s,
+				f"MATCH (n:{_qname(label)}) WHERE head(labels(n)) = $label WITH n",
+				var="n",
+				batch_size=batch_size,
+				label=label,
+			)
+
+	with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+		list(pool.map(_rels, types))
+		list(pool.map(_nodes, labels))
+	# Whatever is left: unlabelled nodes, or labels created while we ran.
+	with driver.session(database=settings.database) as session:
+		_delete_in_transactions(session, "MATCH (n) WITH n", var="n", batch_size=batch_size)
+
+
+def _choose_strategy(requested: str, *, nodes: int, labels: int, parallel_min: int) -> str:
+	if requested != "auto":
+		return requested
+	if _can_recreate():
+		return "recreate"
+	if nodes >= parallel_min and labels > 1:
+		return "parallel"
+	return "transactions"
+
+
+def cleanup(strategy: str | None = None, *, batch_size: int | None = None, workers: int | None = None):
 	start = time.perf_counter()
 	log.info(f"Starting cleanup on database '{settings.database}' @ {settings.uri}")
-	batch_size = int(os.getenv("DELETE_BATCH_SIZE", "10000"))
-	log_every = int(os.getenv("LOG_EVERY_N_BATCHES", "5"))
+	requested = (strategy or os.getenv("CLEANUP_STRATEGY", "auto")).strip().lower()
+	if requested not in STRATEGIES:
+		raise ValueError(f"CLEANUP_STRATEGY must be one of {', '.join(STRATEGIES)}, got {requested!r}")
+	batch_size = int(batch_size or os.getenv("DELETE_BATCH_SIZE", "10000"))
+	workers = int(workers or os.getenv("CLEANUP_WORKERS", "4"))
+	parallel_min = int(os.getenv("CLEANUP_PARALLEL_MIN", "200000"))
 
-	with driver.session(database=settings.database) as session:
-		# Delete data first for faster schema drops
-		t0 = time.perf_counter()
-		total = _delete_all_data(session, batch_size=batch_size, log_every=log_every)
-		log.info(f"Data deletion finished: {total:,} node(s) removed in {time.perf_counter() - t0:0.2f}s")
+	nodes, rels = _count_graph()
+	labels = len(read(driver, "CALL db.labels()"))
+	chosen = _choose_strategy(requested, nodes=nodes, labels=labels, parallel_min=parallel_min)
+	log.info(f"Reset strategy: {chosen} ({nodes:,} node(s), {rels:,} relationship(s), {labels} label(s))")
 
+	t0 = time.perf_counter()
+	if chosen == "recreate":
+		from neo4j.exceptions import ClientError
+
+		try:
+			_recreate_database()
+		except ClientError as e:
+			# Forbidden, Community edition, or the default database: delete instead.
+			log.warning(f"Cannot recreate database '{settings.database}' ({e.code}); deleting data instead")
+			chosen = "transactions"
+	if chosen == "parallel":
+		_delete_parallel(batch_size, workers)
+	elif chosen == "transactions":
+		_delete_transactions(batch_size)
+	elapsed = time.perf_counter() - t0
+	left, _ = _count_graph()
+	removed = nodes - left
+	rate = removed / elapsed if elapsed > 0 else 0.0
+	log.info(
+		f"Data deletion finished ({chosen}): {removed:,} node(s), {rels:,} relationship(s) "
+		f"removed in {elapsed:0.2f}s ({rate:,.0f} nodes/s)"
+	)
+
+	if chosen != "recreate":
+		# A recreated database starts without any schema.
 		t1 = time.perf_counter()
-		_drop_vector_index(session, settings.vector_index)
+		_drop_vector_index(settings.vector_index)
 		log.debug(f"Vector index check/drop completed in {time.perf_counter() - t1:0.2f}s")
 
 		t2 = time.perf_counter()
-		_drop_all_constraints(session)
+		_drop_all_constraints()
 		log.debug(f"Constraints drop completed in {time.perf_counter() - t2:0.2f}s")
 
 		t3 = time.perf_counter()
-		_drop_all_indexes(session)
+		_drop_all_indexes()
 		log.debug(f"Indexes drop completed in {time.perf_counter() - t3:0.2f}s")
 
+	# The incremental build manifest describes data that no longer exists.
+	if delete_manifest():
+		log.info("Removed incremental build manifest")
+
 	log.info(f"Cleanup completed in {time.perf_counter() - start:0.2f}s")
 
 
 if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Delete all GraphRAG data, constraints and indexes")
+	parser.add_argument("--strategy", choices=STRATEGIES, default=None, help="Reset strategy (default: CLEANUP_STRATEGY or auto)")
+	parser.add_argument("--batch-size", type=int, default=None, help="Rows per inner transaction (default: DELETE_BATCH_SIZE)")
+	parser.add_argument("--workers", type=int, default=None, help="Concurrent sessions for --strategy parallel (default: CLEANUP_WORKERS)")
+	args = parser.parse_args()
 	try:
-		cleanup()
+		cleanup(args.strategy, batch_size=args.batch_size, workers=args.workers)
 	except Exception as e:
 		log.exception("Error occurred during cleanup: %s", e)
 	finally:
 		driver.close()
-
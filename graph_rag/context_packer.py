@@ -0,0 +1,220 @@
+"""Token-budgeted prompt context for GraphRAG answers.
+
+`_record_to_context` renders every retrieved chunk on its own, with its own
+graph-facts list. With top_k=25 and overlapping chunks that repeats both text
+and facts. `pack_context` instead:
+
+1. drops hits below an adaptive score cutoff (mean - k * stddev of this query's
+   scores, always keeping the best `min_hits`)
+2. merges consecutive chunks of the same source, removing the overlapping text
+3. dedupes graph facts across all hits into one section
+4. packs passages (best first) and then facts into `token_budget` tokens,
+   counted with the local tokenizer (`token_utils`)
+
+`baseline_tokens` is what the per-record rendering would have cost, so callers
+can report the tokens saved per query.
+"""
+from __future__ import annotations
+
+import statistics
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from config import settings
+from token_utils import count_tokens
+
+# Shortest shared text treated as the overlap between adjacent chunks.
+MIN_MERGE_OVERLAP = 20
+
+
+@dataclass(frozen=True)
+class ContextHit:
+    id: Optional[str]
+    source: Optional[str]
+    chunk_index: Optional[int]
+    score: float
+    text: str
+    graph_facts: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class PackedContext:
+    text: str
+    tokens: int
+    baseline_tokens: int
+    hits_in: int
+    hits_kept: int
+    blocks: int
+    facts_in: int
+    facts_kept: int
+    truncated: bool
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.baseline_tokens - self.tokens)
+
+
+def hit_from_record(record: Any) -> ContextHit:
+    node = record.get("node") or {}
+    index = node.get("index")
+    return ContextHit(
+        id=record.get("id") or record.get("elementId"),
+        source=node.get("source"),
+        chunk_index=int(index) if index is not None else None,
+        score=float(record.get("score") or 0.0),
+        text=str(node.get("text") or ""),
+        graph_facts=tuple(f for f in (record.get("graph_facts") or []) if f),
+    )
+
+
+def merge_overlap_bounds() -> tuple[int, int]:
+    """(min_overlap, max_overlap) for `_merge_overlap`, from CHUNK_OVERLAP.
+
+    Chunks overlap by up to CHUNK_OVERLAP characters; allow some slack for
+    whitespace. The splitter cuts at whitespace, so a real overlap is rarely
+    much shorter than a quarter of that.
+    """
+    return max(MIN_MERGE_OVERLAP, settings.chunk_overlap // 4), settings.chunk_overlap * 2
+
+
+def _merge_overlap(a: str, b: str, *, max_overlap: int, min_overlap: int) -> str:
+    """Concatenate `a` and `b`, dropping the longest suffix of `a` that prefixes `b`.
+
+    The overlap must be at least `min_overlap` characters and end at a word
+    boundary in `b`; a shorter or mid-word match ("services" / "service mesh")
+    is a coincidence, not the splitter's overlap, so the texts are joined with a
+    newline instead.
+    """
+    limit = min(len(a), len(b), max_overlap)
+    for k in range(limit, max(min_overlap, 1) - 1, -1):
+        if a.endswith(b[:k]) and (k == len(b) or b[k - 1].isspace() or b[k].isspace()):
+            return a + b[k:]
+    return a + "\n" + b
+
+
+@dataclass
+class _Block:
+    source: Optional[str]
+    first: Optional[int]
+    last: Optional[int]
+    score: float
+    text: str
+
+    def render(self) -> str:
+        header = []
+        if self.source:
+            header.append(f"source={self.source}")
+        if self.first is not None:
+            header.append(f"chunks={self.first}" if self.first == self.last else f"chunks={self.first}-{self.last}")
+        header.append(f"score={self.score:0.3f}")
+        return "[" + " | ".join(header) + "]\n" + self.text.strip()
+
+
+def _score_cutoff(hits: list[ContextHit], *, stddevs: float, min_hits: int) -> list[ContextHit]:
+    if len(hits) <= min_hits:
+        return hits
+    scores = [h.score for h in hits]
+    cutoff = statistics.fmean(scores) - stddevs * statistics.pstdev(scores)
+    ranked = sorted(hits, key=lambda h: h.score, reverse=True)
+    return [h for i, h in enumerate(ranked) if i < min_hits or h.score >= cutoff]
+
+
+def _merge_adjacent(hits: list[ContextHit], *, max_overlap: int, min_overlap: int) -> list[_Block]:
+    by_source: dict[Optional[str], list[ContextHit]] = {}
+    for h in hits:
+        by_source.setdefault(h.source, []).append(h)
+
+    blocks: list[_Block] = []
+    for source, group in by_source.items():
+        group.sort(key=lambda h: (h.chunk_index is None, h.chunk_index or 0))
+        current: Optional[_Block] = None
+        for h in group:
+            if (
+                current is not None
+                and h.chunk_index is not None
+                and current.last is not None
+                and h.chunk_index == current.last + 1
+            ):
+                current.text = _merge_overlap(current.text, h.text, max_overlap=max_overlap, min_overlap=min_overlap)
+                current.last = h.chunk_index
+                current.score = max(current.score, h.score)
+                continue
+            if current is not None:
+                blocks.append(current)
+            current = _Block(source=source, first=h.chunk_index, last=h.chunk_index, score=h.score, text=h.text)
+        if current is not None:
+            blocks.append(current)
+    blocks.sort(key=lambda b: b.score, reverse=True)
+    return blocks
+
+
+def _dedupe_facts(hits: list[ContextHit]) -> list[str]:
+    seen: set[str] = set()
+    facts: list[str] = []
+    # Facts of the best hits first, so truncation drops the least relevant ones.
+    for h in sorted(hits, key=lambda h: h.score, reverse=True):
+        for f in h.graph_facts:
+            key = " ".join(f.lower().split())
+            if key not in seen:
+                seen.add(key)
+                facts.append(f)
+    return facts
+
+
+def pack_context(
+    hits: list[ContextHit],
+    *,
+    token_budget: Optional[int] = None,
+    baseline_tokens: Optional[int] = None,
+    score_stddevs: Optional[float] = None,
+    min_hits: Optional[int] = None,
+    facts_share: Optional[float] = None,
+) -> PackedContext:
+    """Build the prompt context for `hits` within `token_budget` tokens."""
+    budget = int(token_budget if token_budget is not None else settings.context_token_budget)
+    stddevs = float(score_stddevs if score_stddevs is not None else settings.context_score_stddevs)
+    keep_min = int(min_hits if min_hits is not None else settings.context_min_hits)
+    share = float(facts_share if facts_share is not None else settings.context_facts_share)
+
+    kept = _score_cutoff(hits, stddevs=stddevs, min_hits=keep_min)
+    min_overlap, max_overlap = merge_overlap_bounds()
+    blocks = _merge_adjacent(kept, max_overlap=max_overlap, min_overlap=min_overlap)
+    facts = _dedupe_facts(kept)
+
+    facts_tokens = [count_tokens(f"- {f}") for f in facts]
+    reserved_for_facts = min(sum(facts_tokens), int(budget * share))
+
+    parts: list[str] = []
+    used = 0
+    truncated = False
+    for block in blocks:
+        rendered = block.render()
+        cost = count_tokens(rendered)
+        if used + cost > budget - reserved_for_facts:
+            truncated = True
+            continue
+        parts.append(rendered)
+        used += cost
+
+    fact_lines: list[str] = []
+    for f, cost in zip(facts, facts_tokens):
+        if used + cost > budget:
+            truncated = True
+            break
+        fact_lines.append(f"- {f}")
+        used += cost
+    if fact_lines:
+        parts.append("Graph context:\n" + "\n".join(fact_lines))
+
+    text = "\n\n".join(parts)
+    return PackedContext(
+        text=text,
+        tokens=count_tokens(text),
+        baseline_tokens=int(baseline_tokens) if baseline_tokens is not None else 0,
+        hits_in=len(hits),
+        hits_kept=len(kept),
+        blocks=sum(1 for p in parts if p.startswith("[")),
+        facts_in=sum(len(h.graph_facts) for h in hits),
+        facts_kept=len(fact_lines),
+        truncated=truncated,
+    )
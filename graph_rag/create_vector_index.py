@@ -1,21 +1,49 @@
+import argparse
 import asyncio
 import os
 import sys
 
-from neo4j import GraphDatabase
-from neo4j_graphrag.indexes import create_vector_index
+from neo4j_graphrag.indexes import create_fulltext_index
 
 if __name__ == "__main__":
     # Ensure project root on sys.path when running as a script
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from config import settings
+from neo4j_connection import create_driver
 from logger_factory import bind, get_logger, new_run_id
 from ui import status
+from vector_compression import quantization
 
 log = get_logger("graph_rag.create_vector_index")
 
+
+def vector_index_query(*, name: str, dimensions: int, quantized: bool) -> str:
+    # Same statement as neo4j_graphrag.indexes.create_vector_index, plus Neo4j's
+    # int8 quantization switch (5.23+), which its helper doesn't expose.
+    return (
+        f"CREATE VECTOR INDEX `{name}` IF NOT EXISTS FOR (n:Chunk) ON n.embedding OPTIONS "
+        "{ indexConfig: { "
+        f"`vector.dimensions`: {int(dimensions)}, "
+        "`vector.similarity_function`: 'cosine', "
+        f"`vector.quantization.enabled`: {'true' if quantized else 'false'} "
+        "} }"
+    )
+
+
 async def main() -> None:
-    driver = GraphDatabase.driver(settings.uri, auth=(settings.user, settings.password))
+    parser = argparse.ArgumentParser(description="Create the Neo4j vector and full-text indexes over :Chunk nodes")
+    parser.add_argument(
+        "--recreate",
+        action="store_true",
+        help="Drop the indexes first (needed after changing EMBEDDING_DIMENSIONS or VECTOR_QUANTIZATION)",
+    )
+    args = parser.parse_args()
+
+    driver = create_driver()
+
+    kind = quantization()
+    if kind == "binary":
+        log.warning("Neo4j vector indexes have no binary quantization; using int8 in Neo4j (binary applies to the local index)")
 
     run_id = new_run_id()
     log_ctx = bind(
@@ -28,22 +56,38 @@ async def main() -> None:
         vector_index=settings.vector_index,
     )
     try:
-        log_ctx.info("Creating vector index")
+        log_ctx.info(
+            "Creating vector index (%d dims, quantization=%s)",
+            settings.embedding_dimensions,
+            "int8" if kind != "none" else "none",
+        )
         with status("Creating Neo4j vector index…"):
-            create_vector_index(
+            if args.recreate:
+                driver.execute_query(f"DROP INDEX `{settings.vector_index}` IF EXISTS", database_=settings.database)
+                driver.execute_query(f"DROP INDEX `{settings.fulltext_index}` IF EXISTS", database_=settings.database)
+            driver.execute_query(
+                vector_index_query(
+                    name=settings.vector_index,
+                    dimensions=settings.embedding_dimensions,
+                    quantized=kind != "none",
+                ),
+                database_=settings.database,
+            )
+        log_ctx.info("Vector index created")
+        # Exact-token matches (ADR ids, topic names, acronyms) for RETRIEVAL_MODE=hybrid.
+        with status("Creating Neo4j full-text index…"):
+            create_fulltext_index(
                 driver,
-                settings.vector_index,
+                settings.fulltext_index,
                 label="Chunk",
-                embedding_property="embedding",
-                dimensions=settings.embedding_dimensions,
-                similarity_fn="cosine", #"euclidean",
+                node_properties=["text"],
                 neo4j_database=settings.database,
             )
-        log_ctx.info("Vector index created")
+        log_ctx.info("Full-text index created", fulltext_index=settings.fulltext_index)
     except Exception as e:
         log.exception("Error occurred during vector index creation: %s", e)
     finally:
         driver.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,167 @@
+"""Batched, concurrent embedding stage.
+
+Texts are grouped into requests bounded by a token budget (and an input count),
+several requests are kept in flight on a thread pool, and each finished batch is
+handed to a sink (e.g. `upsert_vectors`) right away, so the full list of
+embeddings never has to sit in memory.
+"""
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+from config import settings
+from kg_concurrency import backoff_delay, is_rate_limited
+from logger_factory import get_logger
+from token_utils import count_tokens
+
+log = get_logger("graph_rag.embedding_batches")
+
+# OpenAI rejects a single input above 8192 tokens and more than 2048 inputs per request.
+MAX_INPUT_TOKENS = 8192
+MAX_INPUTS_PER_REQUEST = 2048
+
+
+@dataclass(frozen=True)
+class EmbeddingBatch:
+    ids: list[str]
+    texts: list[str]
+    tokens: int
+
+
+@dataclass
+class EmbeddingStats:
+    batches: int = 0
+    texts: int = 0
+    tokens: int = 0
+    retries: int = 0
+    latency_s: float = 0.0
+
+    @property
+    def texts_per_s(self) -> float:
+        return self.texts / self.latency_s if self.latency_s else 0.0
+
+
+def iter_token_batches(
+    items: Iterable[tuple[str, str]],
+    *,
+    max_tokens: int,
+    max_items: int,
+) -> Iterator[EmbeddingBatch]:
+    """Group (id, text) pairs into batches of at most `max_tokens` / `max_items`."""
+    max_items = max(1, min(int(max_items), MAX_INPUTS_PER_REQUEST))
+    ids: list[str] = []
+    texts: list[str] = []
+    tokens = 0
+    for item_id, text in items:
+        n = min(count_tokens(text), MAX_INPUT_TOKENS)
+        if ids and (tokens + n > max_tokens or len(ids) >= max_items):
+            yield EmbeddingBatch(ids=ids, texts=texts, tokens=tokens)
+            ids, texts, tokens = [], [], 0
+        ids.append(item_id)
+        texts.append(text)
+        tokens += n
+    if ids:
+        yield EmbeddingBatch(ids=ids, texts=texts, tokens=tokens)
+
+
+def embed_texts(embedder: Any, texts: Sequence[str]) -> list[list[float]]:
+    """Embed many texts in one request when the embedder supports it.
+
+    neo4j_graphrag's `OpenAIEmbeddings` only exposes `embed_query`, so for it we
+    go through its OpenAI client directly; anything else falls back to one call
+    per text.
+    """
+    batch_fn = getattr(embedder, "embed_documents", None)
+    if callable(batch_fn):
+        return batch_fn(list(texts))
+    client = getattr(embedder, "client", None)
+    model = getattr(embedder, "model", None)
+    if client is not None and model and hasattr(client, "embeddings"):
+        # e.g. `dimensions` for truncated vectors (vector_compression.TruncatedOpenAIEmbeddings)
+        params = getattr(embedder, "request_params", None) or {}
+        resp = client.embeddings.create(input=list(texts), model=model, **params)
+        return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+    return [embedder.embed_query(t) for t in texts]
+
+
+def _embed_with_retry(
+    embedder: Any,
+    batch: EmbeddingBatch,
+    *,
+    max_attempts: int,
+    backoff_base_s: float,
+    backoff_max_s: float,
+) -> tuple[list[list[float]], int]:
+    """Returns (vectors, retries)."""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return embed_texts(embedder, batch.texts), attempt - 1
+        except Exception as e:
+            if attempt >= max_attempts:
+                raise
+            delay = backoff_delay(attempt, base_s=backoff_base_s, max_s=backoff_max_s)
+            log.warning(
+                "Embedding batch of %d failed (attempt %d, rate_limited=%s), retrying in %0.1fs: %s",
+                len(batch.texts), attempt, is_rate_limited(e), delay, e,
+            )
+            time.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def run_embedding_stage(
+    embedder: Any,
+    items: Iterable[tuple[str, str]],
+    sink: Callable[[list[str], list[list[float]]], None],
+    *,
+    max_tokens: int,
+    max_items: int,
+    concurrency: int,
+    max_attempts: int | None = None,
+    backoff_base_s: float | None = None,
+    backoff_max_s: float | None = None,
+    on_progress: Callable[[int], None] | None = None,
+) -> EmbeddingStats:
+    """Embed `items` in token-bounded batches, `concurrency` requests at a time.
+
+    `sink(ids, vectors)` is called on the calling thread for each finished batch,
+    in completion order. Failed batches are retried with backoff; the limits
+    default to EMBED_MAX_ATTEMPTS / EMBED_BACKOFF_BASE_S / EMBED_BACKOFF_MAX_S.
+    """
+    retry = {
+        "max_attempts": max(1, int(max_attempts or settings.embed_max_attempts)),
+        "backoff_base_s": settings.embed_backoff_base_s if backoff_base_s is None else backoff_base_s,
+        "backoff_max_s": settings.embed_backoff_max_s if backoff_max_s is None else backoff_max_s,
+    }
+    stats = EmbeddingStats()
+    t0 = time.perf_counter()
+    batches = iter_token_batches(items, max_tokens=max_tokens, max_items=max_items)
+    in_flight: dict[Future, EmbeddingBatch] = {}
+
+    def drain(done: Iterable[Future]) -> None:
+        for fut in done:
+            batch = in_flight.pop(fut)
+            vectors, retries = fut.result()
+            sink(batch.ids, vectors)
+            stats.retries += retries
+            stats.batches += 1
+            stats.texts += len(batch.ids)
+            stats.tokens += batch.tokens
+            if on_progress is not None:
+                on_progress(len(batch.ids))
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="embed") as pool:
+        for batch in batches:
+            if len(in_flight) >= max(1, concurrency):
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                drain(done)
+            fut = pool.submit(_embed_with_retry, embedder, batch, **retry)
+            in_flight[fut] = batch
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            drain(done)
+
+    stats.latency_s = time.perf_counter() - t0
+    return stats
@@ -0,0 +1,404 @@
+"""Post-build entity resolution: collapse duplicate KG entities.
+
+SimpleKGPipeline extracts every chunk on its own, so one thing often ends up as
+several nodes ("Kafka", "Apache Kafka", "kafka"). Duplicates bloat the graph and
+fan out the `RETRIEVAL_QUERY` expansion. This pass:
+
+1. loads every `__Entity__` with a `schema.NODE_TYPES` label and its name
+   (`name`, or `adr_num` / `path` / `title` for labels without one)
+2. blocks candidates by label and normalised name token, so only entities that
+   share a label and a token are ever compared
+3. scores each candidate pair by string similarity of the normalised names
+   (names with different numbers never match: ADR-0001 vs ADR-0005); with
+   ENTITY_RESOLUTION_EMBEDDINGS=1 near misses are also accepted when their name
+   embeddings are close
+4. merges each cluster into its best-connected node with
+   `apoc.refactor.mergeNodes` (relationships merged, other names kept as
+   `aliases`), ENTITY_RESOLUTION_BATCH_SIZE clusters per transaction
+
+`builder.py` runs it after every build. Run it directly to see the clusters
+(`--dry-run`) or to measure the expansion query before and after:
+
+    python graph_rag/entity_resolution.py --dry-run
+    python graph_rag/entity_resolution.py --latency-samples 20
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+import unicodedata
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Any, Callable, Optional, Sequence
+
+if __name__ == "__main__":
+    # Ensure project root on sys.path when running as a script
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from config import settings
+from logger_factory import bind, get_logger, new_run_id
+from schema import NODE_TYPES
+
+log = get_logger("graph_rag.entity_resolution")
+
+ENTITY_LABELS: tuple[str, ...] = tuple(t["label"] for t in NODE_TYPES)
+# Per label, the first of these the schema defines names the entity.
+NAME_PROPERTIES = ("name", "adr_num", "path", "title")
+LABEL_NAME_PROPERTIES: dict[str, tuple[str, ...]] = {
+    t["label"]: tuple(p["name"] for p in t.get("properties", []) if p["name"] in NAME_PROPERTIES) for t in NODE_TYPES
+}
+# Vendor prefixes that do not change what is named ("Apache Kafka" is "Kafka").
+_VENDOR_PREFIXES = {"apache", "google", "gcp", "confluent", "the"}
+# Tokens shared by more entities than this are too common to block on.
+MAX_BLOCK_SIZE = 200
+# Pairs below this string score are not worth an embedding comparison.
+EMBED_FLOOR = 0.6
+
+ENTITIES_QUERY = """
+MATCH (e:__Entity__)
+WITH e, [l IN labels(e) WHERE l IN $labels] AS schema_labels
+WHERE size(schema_labels) > 0
+RETURN elementId(e) AS id, schema_labels[0] AS label,
+       e { .name, .adr_num, .path, .title } AS names,
+       COUNT { (e)--() } AS degree
+"""
+
+MERGE_QUERY = """
+UNWIND $clusters AS cluster
+MATCH (keep) WHERE elementId(keep) = cluster.keep
+SET keep.aliases = cluster.aliases
+WITH keep, cluster
+MATCH (dup) WHERE elementId(dup) IN cluster.merge
+WITH keep, collect(dup) AS dups
+CALL apoc.refactor.mergeNodes([keep] + dups, {properties: 'discard', mergeRels: true})
+YIELD node
+RETURN count(node) AS merged
+"""
+
+
+@dataclass(frozen=True)
+class Entity:
+    id: str
+    label: str
+    name: str
+    degree: int
+
+
+@dataclass(frozen=True)
+class ResolutionReport:
+    entities_before: int
+    entities_after: int
+    relationships_before: int
+    relationships_after: int
+    candidates: int
+    clusters: int
+    merged: int
+    embedding_matches: int
+    latency_s: float
+    # Expansion query p50 over the same sampled hits, when measured.
+    expansion_before_ms: Optional[float] = None
+    expansion_after_ms: Optional[float] = None
+
+    @property
+    def entities_removed(self) -> int:
+        return self.entities_before - self.entities_after
+
+    @property
+    def relationships_removed(self) -> int:
+        return self.relationships_before - self.relationships_after
+
+
+def normalize_name(name: str) -> tuple[str, ...]:
+    """Lower-case ASCII word tokens of `name`, without a leading vendor prefix."""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii").lower()
+    tokens = re.findall(r"[a-z0-9]+", text)
+    while len(tokens) > 1 and tokens[0] in _VENDOR_PREFIXES:
+        tokens = tokens[1:]
+    return tuple(tokens)
+
+
+def name_similarity(a: Sequence[str], b: Sequence[str]) -> float:
+    """0..1 similarity of two normalised names; 0 when they carry different numbers."""
+    if not a or not b:
+        return 0.0
+    if {t for t in a if t.isdigit()} != {t for t in b if t.isdigit()}:
+        return 0.0
+    compact_a, compact_b = "".join(a), "".join(b)
+    if compact_a == compact_b:
+        return 1.0
+    jaccard = len(set(a) & set(b)) / len(set(a) | set(b))
+    return max(SequenceMatcher(None, compact_a, compact_b).ratio(), jaccard)
+
+
+def _blocks(entities: Sequence[Entity], keys: Sequence[tuple[str, ...]]) -> dict[tuple[str, str], list[int]]:
+    # "=<compact name>" blocks exact matches; plain tokens block partial ones.
+    blocks: dict[tuple[str, str], list[int]] = {}
+    for i, (entity, tokens) in enumerate(zip(entities, keys)):
+        for block in {"=" + "".join(tokens), *tokens}:
+            if block != "=":
+                blocks.setdefault((entity.label, block), []).append(i)
+    return blocks
+
+
+def plan_merges(
+    entities: Sequence[Entity],
+    *,
+    threshold: float,
+    embed: Optional[Callable[[list[str]], list[list[float]]]] = None,
+    embed_threshold: float = 1.0,
+) -> tuple[list[list[Entity]], int, int]:
+    """Clusters of duplicates (best-connected entity first), candidate pairs scored, embedding matches."""
+    keys = [normalize_name(e.name) for e in entities]
+    candidates: set[tuple[int, int]] = set()
+    for (_, block), members in _blocks(entities, keys).items():
+        # Exact names always block; single tokens only while selective.
+        if len(members) > MAX_BLOCK_SIZE and not block.startswith("="):
+            continue
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                candidates.add((members[x], members[y]))
+
+    parent = list(range(len(entities)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    near: list[tuple[int, int]] = []
+    for i, j in candidates:
+        score = name_similarity(keys[i], keys[j])
+        if score >= threshold:
+            parent[find(i)] = find(j)
+        elif embed is not None and score >= EMBED_FLOOR:
+            near.append((i, j))
+
+    embedding_matches = 0
+    if near:
+        names = sorted({entities[i].name for pair in near for i in pair})
+        vectors = dict(zip(names, embed(names)))
+        for i, j in near:
+            a, b = vectors[entities[i].name], vectors[entities[j].name]
+            norm = (sum(x * x for x in a) * sum(y * y for y in b)) ** 0.5 or 1.0
+            if sum(x * y for x, y in zip(a, b)) / norm >= embed_threshold:
+                parent[find(i)] = find(j)
+                embedding_matches += 1
+
+    groups: dict[int, list[Entity]] = {}
+    for i, entity in enumerate(entities):
+        groups.setdefault(find(i), []).append(entity)
+    clusters = [
+        sorted(group, key=lambda e: (-e.degree, e.name, e.id)) for group in groups.values() if len(group) > 1
+    ]
+    clusters.sort(key=lambda group: (group[0].label, group[0].name))
+    return clusters, len(candidates), embedding_matches
+
+
+def load_entities(driver: Any, *, database: str) -> list[Entity]:
+    records, _, _ = driver.execute_query(ENTITIES_QUERY, {"labels": list(ENTITY_LABELS)}, database_=database)
+    entities = []
+    for r in records:
+        names = r["names"] or {}
+        name = next((names.get(p) for p in LABEL_NAME_PROPERTIES.get(r["label"], NAME_PROPERTIES) if names.get(p)), None)
+        if name:
+            entities.append(Entity(id=r["id"], label=r["label"], name=str(name), degree=int(r["degree"] or 0)))
+    return entities
+
+
+def merge_clusters(driver: Any, clusters: Sequence[Sequence[Entity]], *, database: str, batch_size: int) -> int:
+    rows = [
+        {
+            "keep": group[0].id,
+            "merge": [e.id for e in group[1:]],
+            "aliases": sorted({e.name for e in group[1:]} - {group[0].name}),
+        }
+        for group in clusters
+    ]
+    merged = 0
+    with driver.session(database=database) as session:
+        for start in range(0, len(rows), max(1, batch_size)):
+            batch = rows[start:start + batch_size]
+            rec = session.execute_write(lambda tx: tx.run(MERGE_QUERY, clusters=batch).single())
+            merged += int(rec["merged"]) if rec else 0
+    return merged
+
+
+def _graph_counts(driver: Any, *, database: str) -> tuple[int, int]:
+    records, _, _ = driver.execute_query(
+        "MATCH (e:__Entity__) RETURN count(e) AS c", database_=database
+    )
+    entities = int(records[0]["c"]) if records else 0
+    records, _, _ = driver.execute_query("MATCH ()-[r]->() RETURN count(r) AS c", database_=database)
+    return entities, int(records[0]["c"]) if records else 0
+
+
+def sample_hits(driver: Any, *, database: str, samples: int, top_k: int, seed: int = 7) -> list[list[dict]]:
+    """`samples` lists of `top_k` Chunk hits, as the vector lookup would return them."""
+    records, _, _ = driver.execute_query("MATCH (c:Chunk) RETURN elementId(c) AS id", database_=database)
+    ids = sorted(r["id"] for r in records)
+    if not ids:
+        return []
+    rng = random.Random(seed)
+    return [
+        [{"id": i, "score": 1.0} for i in rng.sample(ids, min(top_k, len(ids)))]
+        for _ in range(samples)
+    ]
+
+
+def measure_expansion(driver: Any, hit_lists: list[list[dict]], *, database: str) -> Optional[float]:
+    """p50 milliseconds of the `RETRIEVAL_QUERY` expansion over `hit_lists`."""
+    from expansion import ExpansionConfig, build_retrieval_query
+    from retrieval import expand_hits
+
+    if not hit_lists:
+        return None
+    retrieval_query = build_retrieval_query(ExpansionConfig.from_settings())
+    expand_hits(driver, hit_lists[0], retrieval_query=retrieval_query, database=database)  # warm the plan cache
+    latencies = []
+    for hits in hit_lists:
+        t0 = time.perf_counter()
+        expand_hits(driver, hits, retrieval_query=retrieval_query, database=database)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    return round(statistics.median(latencies), 2)
+
+
+def _name_embedder() -> tuple[Callable[[list[str]], list[list[float]]], Callable[[], None]]:
+    from embedding_batches import embed_texts
+    from embedding_cache import cached_embedder, close_cache
+    from vector_compression import make_embedder
+
+    inner = make_embedder()
+    embedder = cached_embedder(inner)
+
+    def close() -> None:
+        inner.close()
+        close_cache(embedder)
+
+    return (lambda names: embed_texts(embedder, names)), close
+
+
+def resolve_entities(
+    driver: Any,
+    *,
+    database: str,
+    threshold: Optional[float] = None,
+    use_embeddings: Optional[bool] = None,
+    embed_threshold: Optional[float] = None,
+    batch_size: Optional[int] = None,
+    dry_run: bool = False,
+    latency_samples: int = 0,
+) -> tuple[ResolutionReport, list[list[Entity]]]:
+    """Find and (unless `dry_run`) merge duplicate entities; returns the report and the clusters."""
+    threshold = float(threshold if threshold is not None else settings.entity_resolution_threshold)
+    use_embeddings = settings.entity_resolution_embeddings if use_embeddings is None else use_embeddings
+    embed_threshold = float(embed_threshold if embed_threshold is not None else settings.entity_resolution_embed_threshold)
+    batch_size = int(batch_size or settings.entity_resolution_batch_size)
+
+    t0 = time.perf_counter()
+    entities_before, rels_before = _graph_counts(driver, database=database)
+    hit_lists = sample_hits(driver, database=database, samples=latency_samples, top_k=settings.retrieval_top_k) if latency_samples else []
+    expansion_before = measure_expansion(driver, hit_lists, database=database) if hit_lists else None
+
+    entities = load_entities(driver, database=database)
+    embed, close = _name_embedder() if use_embeddings else (None, None)
+    try:
+        clusters, candidates, embedding_matches = plan_merges(
+            entities, threshold=threshold, embed=embed, embed_threshold=embed_threshold
+        )
+    finally:
+        if close is not None:
+            close()
+
+    merged = 0
+    if clusters and not dry_run:
+        merged = merge_clusters(driver, clusters, database=database, batch_size=batch_size)
+    entities_after, rels_after = (entities_before, rels_before) if dry_run else _graph_counts(driver, database=database)
+    expansion_after = measure_expansion(driver, hit_lists, database=database) if hit_lists and not dry_run else None
+
+    report = ResolutionReport(
+        entities_before=entities_before,
+        entities_after=entities_after,
+        relationships_before=rels_before,
+        relationships_after=rels_after,
+        candidates=candidates,
+        clusters=len(clusters),
+        merged=merged,
+        embedding_matches=embedding_matches,
+        latency_s=time.perf_counter() - t0,
+        expansion_before_ms=expansion_before,
+        expansion_after_ms=expansion_after,
+    )
+    return report, clusters
+
+
+def log_report(logger: Any, report: ResolutionReport) -> None:
+    logger.info(
+        "Entity resolution: %d cluster(s) from %d candidate pair(s) (%d by embedding); "
+        "entities %d -> %d (-%d), relationships %d -> %d (-%d) in %0.2fs",
+        report.clusters,
+        report.candidates,
+        report.embedding_matches,
+        report.entities_before,
+        report.entities_after,
+        report.entities_removed,
+        report.relationships_before,
+        report.relationships_after,
+        report.relationships_removed,
+        report.latency_s,
+    )
+    if report.expansion_before_ms is not None and report.expansion_after_ms is not None:
+        logger.info(
+            "Expansion query p50: %0.2fms -> %0.2fms",
+            report.expansion_before_ms,
+            report.expansion_after_ms,
+        )
+
+
+def main() -> None:
+    from resources import neo4j_driver
+    from ui import status
+
+    parser = argparse.ArgumentParser(description="Merge duplicate KG entities")
+    parser.add_argument("--dry-run", action="store_true", help="Print the clusters without merging")
+    parser.add_argument("--threshold", type=float, default=None, help="Name similarity to merge at (default: ENTITY_RESOLUTION_THRESHOLD)")
+    parser.add_argument(
+        "--embeddings",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Also compare near-miss names by embedding (default: ENTITY_RESOLUTION_EMBEDDINGS)",
+    )
+    parser.add_argument(
+        "--latency-samples",
+        type=int,
+        default=20,
+        help="Expansion queries (RETRIEVAL_TOP_K random chunks each) timed before and after merging; 0 to skip",
+    )
+    args = parser.parse_args()
+
+    log_ctx = bind(log, run_id=new_run_id(), source="graph_rag", op="entity_resolution", neo4j_db=settings.database)
+    driver = neo4j_driver()
+    try:
+        with status("Resolving entities…"):
+            report, clusters = resolve_entities(
+                driver,
+                database=settings.database,
+                threshold=args.threshold,
+                use_embeddings=args.embeddings,
+                dry_run=args.dry_run,
+                latency_samples=args.latency_samples,
+            )
+        if args.dry_run:
+            for group in clusters:
+                print(f"{group[0].label}: {group[0].name!r} <- " + ", ".join(repr(e.name) for e in group[1:]))
+        log_report(log_ctx, report)
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Bounded, schema-aware graph expansion for GraphRAG retrieval.
+
+Builds the `RETRIEVAL_QUERY` fragment that runs after the vector lookup (it
+starts with `WITH node, score`). Instead of collecting every neighbour of a hit
+chunk and slicing afterwards, it walks:
+
+- hop 1: chunk <-[:FROM_CHUNK]- entity, for entities with a schema label,
+  at most `max_entities` per chunk (least connected first)
+- hop 2 (optional): entity -[rel]- entity, only for relationship types and
+  directions listed in `schema.PATTERNS`, at most `max_relations` per entity
+
+Entities whose degree exceeds `hub_degree` are reported but never expanded, so a
+hub (say, a Technology every ADR uses) can't flood the prompt. Degrees come from
+the count store, and every cap is a LIMIT inside the subquery, so the caps bound
+how much of the graph is read, not just what is returned.
+
+The generated Cypher needs Neo4j 5 (`COUNT {}`, `CALL {}` subqueries). Check
+that the configured database compiles it, for one and two hops:
+
+    python graph_rag/expansion.py --explain
+
+If Neo4j rejects it at query time anyway, `graph_rag/query.py` logs the error
+and switches to `LEGACY_RETRIEVAL_QUERY`.
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import os
+import sys
+from dataclasses import dataclass
+
+if __name__ == "__main__":
+    # Ensure project root on sys.path when running as a script
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from config import settings
+from schema import NODE_TYPES, PATTERNS
+
+ENTITY_LABELS: tuple[str, ...] = tuple(t["label"] for t in NODE_TYPES)
+
+
+@dataclass(frozen=True)
+class ExpansionConfig:
+    hops: int = 2
+    max_entities: int = 15
+    max_relations: int = 8
+    hub_degree: int = 50
+    max_facts: int = 40
+    entity_labels: tuple[str, ...] = ENTITY_LABELS
+    patterns: tuple[tuple[str, str, str], ...] = tuple(PATTERNS)
+
+    @classmethod
+    def from_settings(cls) -> "ExpansionConfig":
+        return cls(
+            hops=settings.graph_expansion_hops,
+            max_entities=settings.graph_expansion_max_entities,
+            max_relations=settings.graph_expansion_max_relations,
+            hub_degree=settings.graph_expansion_hub_degree,
+            max_facts=settings.graph_expansion_max_facts,
+        )
+
+    @property
+    def relationship_types(self) -> tuple[str, ...]:
+        return tuple(dict.fromkeys(t for _, t, _ in self.patterns))
+
+
+# The expansion used before GRAPH_EXPANSION_*: every neighbour of the chunk, capped
+# only on output. Kept as the fallback for a database that rejects the generated query.
+LEGACY_RETRIEVAL_QUERY = """
+WITH node, score
+OPTIONAL MATCH (node)-[r]-(e)
+WITH node, score,
+     collect(DISTINCT type(r) + ' -> ' + head(labels(e)) + ':' +
+       coalesce(e.name, e.title, e.path, e.adr_num, e.file, e.url, ''))[..40] AS graph_facts
+RETURN node { .text, .source, .index } AS node,
+       labels(node) AS nodeLabels,
+       elementId(node) AS elementId,
+       elementId(node) AS id,
+       score,
+       graph_facts AS graph_facts,
+       0 AS entity_count,
+       0 AS hub_count
+"""
+
+
+def _literal(values: list[str]) -> str:
+    # Schema names only; a JSON array of strings is also a valid Cypher list.
+    return json.dumps(values)
+
+
+def _pattern_literal(patterns: tuple[tuple[str, str, str], ...]) -> str:
+    return "[" + ", ".join(
+        f"{{src: {json.dumps(s)}, type: {json.dumps(t)}, dst: {json.dumps(d)}}}" for s, t, d in patterns
+    ) + "]"
+
+
+def _display_name(var: str) -> str:
+    return f"coalesce({var}.name, {var}.title, {var}.path, {var}.adr_num, {var}.file, {var}.url, '')"
+
+
+def _display_label(var: str, labels: str) -> str:
+    return f"head([l IN labels({var}) WHERE l IN {labels}])"
+
+
+def build_retrieval_query(config: ExpansionConfig) -> str:
+    """Cypher fragment for `VectorCypherRetriever` / `retrieval.expand_hits`.
+
+    Everything is inlined as literals (no query parameters), so the text alone
+    identifies the expansion and can be used as a cache key.
+    """
+    labels = _literal(list(config.entity_labels))
+    patterns = _pattern_literal(config.patterns)
+    rel_types = "|".join(config.relationship_types)
+    if config.hops >= 2 and rel_types:
+        hop2 = f"""
+CALL {{
+  WITH entities
+  UNWIND entities AS ent
+  WITH ent WHERE ent.degree <= {config.hub_degree}
+  CALL {{
+    WITH ent
+    WITH ent.e AS e
+    MATCH (e)-[r:{rel_types}]-(x:__Entity__)
+    WHERE any(p IN {patterns} WHERE p.type = type(r)
+              AND p.src IN labels(startNode(r)) AND p.dst IN labels(endNode(r)))
+    RETURN r, x
+    LIMIT {config.max_relations}
+  }}
+  WITH startNode(r) AS s, r, endNode(r) AS t
+  RETURN collect(DISTINCT {_display_label('s', labels)} + ':' + {_display_name('s')} + ' -' + type(r) + '-> ' +
+                 {_display_label('t', labels)} + ':' + {_display_name('t')}) AS rel_facts
+}}"""
+    else:
+        hop2 = "\nWITH node, score, entities, [] AS rel_facts"
+
+    return f"""
+WITH node, score
+CALL {{
+  WITH node
+  MATCH (node)<-[:FROM_CHUNK]-(e:__Entity__)
+  WHERE any(l IN labels(e) WHERE l IN {labels})
+  WITH e, COUNT {{ (e)--() }} AS degree
+  ORDER BY degree ASC
+  LIMIT {config.max_entities}
+  RETURN collect({{e: e, degree: degree}}) AS entities
+}}{hop2}
+WITH node, score, entities, rel_facts,
+     [ent IN entities | 'MENTIONS -> ' + {_display_label('ent.e', labels)} + ':' + {_display_name('ent.e')} +
+        CASE WHEN ent.degree > {config.hub_degree} THEN ' (hub)' ELSE '' END] AS entity_facts
+RETURN node {{ .text, .source, .index }} AS node,
+       labels(node) AS nodeLabels,
+       elementId(node) AS elementId,
+       elementId(node) AS id,
+       score,
+       (entity_facts + rel_facts)[..{config.max_facts}] AS graph_facts,
+       size(entities) AS entity_count,
+       size([ent IN entities WHERE ent.degree > {config.hub_degree}]) AS hub_count
+"""
+
+
+def main() -> None:
+    from neo4j_connection import create_driver
+    from retrieval import explain_expansion, is_rejected_statement
+
+    parser = argparse.ArgumentParser(description="Print or EXPLAIN the GraphRAG expansion query (GRAPH_EXPANSION_*)")
+    parser.add_argument("--explain", action="store_true", help="Compile it on NEO4J_URI for hops=1 and hops=2")
+    args = parser.parse_args()
+
+    config = ExpansionConfig.from_settings()
+    if not args.explain:
+        print(build_retrieval_query(config))
+        return
+
+    failed = False
+    driver = create_driver()
+    try:
+        for hops in (1, 2):
+            query = build_retrieval_query(dataclasses.replace(config, hops=hops))
+            try:
+                operators = explain_expansion(driver, retrieval_query=query, database=settings.database)
+            except Exception as e:
+                if not is_rejected_statement(e):
+                    raise
+                failed = True
+                print(f"hops={hops}: REJECTED {getattr(e, 'code', '')}: {getattr(e, 'message', e)}")
+                continue
+            print(f"hops={hops}: ok ({len(operators)} plan operators: {', '.join(dict.fromkeys(operators))})")
+    finally:
+        driver.close()
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
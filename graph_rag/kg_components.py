@@ -0,0 +1,87 @@
+"""Pipeline components for a single-pass GraphRAG build.
+
+`chunk_utils` already splits every file, so the KG pipeline gets a splitter that
+passes each pre-made chunk through untouched. It also attaches the chunk's
+provenance (`chunk_provenance`), which the lexical graph builder writes as Chunk
+properties. `CountingEmbedder` wraps the pipeline's embedder so the build can
+report how many embedding calls (and tokens) it actually spent.
+"""
+from __future__ import annotations
+
+import contextvars
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from neo4j_graphrag.embeddings.base import Embedder
+from neo4j_graphrag.experimental.components.text_splitters.base import TextSplitter
+from neo4j_graphrag.experimental.components.types import TextChunk, TextChunks
+from neo4j_graphrag.utils.rate_limit import NoOpRateLimitHandler
+
+from token_utils import count_tokens
+
+
+@dataclass(frozen=True)
+class ChunkProvenance:
+    source: str
+    chunk_index: int
+    content_hash: Optional[str] = None
+
+    def properties(self) -> dict[str, object]:
+        props: dict[str, object] = {"source": self.source, "source_chunk_index": self.chunk_index}
+        if self.content_hash:
+            props["content_hash"] = self.content_hash
+        return props
+
+
+# Set by the builder around each `pipeline.run_async` call. Every chunk is ingested
+# in its own asyncio task, so concurrent runs each see their own value.
+chunk_provenance: contextvars.ContextVar[Optional[ChunkProvenance]] = contextvars.ContextVar(
+    "chunk_provenance", default=None
+)
+
+
+class PreChunkedSplitter(TextSplitter):
+    """Treat the pipeline input as exactly one chunk (it was split by chunk_utils).
+
+    The chunk keeps its position in the source file as `index`, and its
+    provenance as metadata, so Chunk nodes are created with `source`,
+    `source_chunk_index` and `content_hash` already set.
+    """
+
+    async def run(self, text: str) -> TextChunks:
+        prov = chunk_provenance.get()
+        if prov is None:
+            return TextChunks(chunks=[TextChunk(text=text, index=0)])
+        return TextChunks(chunks=[TextChunk(text=text, index=prov.chunk_index, metadata=prov.properties())])
+
+
+@dataclass(frozen=True)
+class EmbeddingUsage:
+    calls: int
+    tokens: int
+
+
+class CountingEmbedder(Embedder):
+    """Delegating embedder that counts calls and (locally tokenized) input tokens."""
+
+    def __init__(self, inner: Embedder):
+        # Retries stay with the wrapped embedder.
+        super().__init__(rate_limit_handler=NoOpRateLimitHandler())
+        self.inner = inner
+        self._calls = 0
+        self._tokens = 0
+        self._lock = threading.Lock()
+
+    def embed_query(self, text: str) -> list[float]:
+        vector = self.inner.embed_query(text)
+        tokens = count_tokens(text)
+        with self._lock:
+            self._calls += 1
+            self._tokens += tokens
+        return vector
+
+    @property
+    def usage(self) -> EmbeddingUsage:
+        with self._lock:
+            return EmbeddingUsage(calls=self._calls, tokens=self._tokens)
@@ -0,0 +1,140 @@
+"""Bounded-concurrency helpers for running per-chunk KG extraction.
+
+`AdaptiveLimiter` gates how many chunks are in flight at once. When a call hits a
+provider rate limit the limit is halved and every worker pauses for a cooldown;
+after a run of successes it creeps back up to the configured maximum (AIMD).
+`run_with_retry` wraps one chunk's work with per-chunk retries on top of it.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, TypeVar
+
+from neo4j_graphrag.exceptions import RateLimitError
+from neo4j_graphrag.utils.rate_limit import is_rate_limit_error
+
+T = TypeVar("T")
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """True if `exc` (or anything in its cause/context chain) is a provider rate limit."""
+    seen: set[int] = set()
+    cur: BaseException | None = exc
+    while cur is not None and id(cur) not in seen:
+        seen.add(id(cur))
+        if isinstance(cur, RateLimitError):
+            return True
+        if type(cur).__name__ == "RateLimitError":  # openai.RateLimitError
+            return True
+        if isinstance(cur, Exception) and is_rate_limit_error(cur):
+            return True
+        cur = cur.__cause__ or cur.__context__
+    return False
+
+
+def backoff_delay(attempt: int, *, base_s: float, max_s: float) -> float:
+    """Exponential backoff with +/-50% jitter; `attempt` starts at 1."""
+    delay = min(max_s, base_s * (2 ** max(0, attempt - 1)))
+    return delay * (0.5 + random.random() / 2)
+
+
+class AdaptiveLimiter:
+    """Async concurrency gate that shrinks on rate limits and recovers on success."""
+
+    def __init__(self, max_concurrency: int, *, min_concurrency: int = 1, recover_after: int = 8):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.min_concurrency = max(1, min(int(min_concurrency), self.max_concurrency))
+        self.recover_after = max(1, int(recover_after))
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._successes = 0
+        self._cooldown_until = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            while True:
+                wait_s = self._cooldown_until - time.monotonic()
+                if wait_s <= 0 and self.in_flight < self.limit:
+                    break
+                if wait_s > 0:
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=wait_s)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await self._cond.wait()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    async def release(self, *, ok: bool, rate_limited: bool = False, cooldown_s: float = 0.0) -> None:
+        # Bookkeeping first, with no await before it: the slot is returned even if
+        # this task is cancelled while waiting for the lock to notify the others.
+        self.in_flight -= 1
+        if rate_limited:
+            self.limit = max(self.min_concurrency, self.limit // 2)
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + cooldown_s)
+            self._successes = 0
+        elif ok:
+            self._successes += 1
+            if self._successes >= self.recover_after and self.limit < self.max_concurrency:
+                self.limit += 1
+                self._successes = 0
+        async with self._cond:
+            self._cond.notify_all()
+
+
+@dataclass
+class RetryStats:
+    retries: int = 0
+    rate_limited: int = 0
+
+
+async def run_with_retry(
+    limiter: AdaptiveLimiter,
+    fn: Callable[[], Awaitable[T]],
+    *,
+    max_attempts: int,
+    backoff_base_s: float,
+    backoff_max_s: float,
+    stats: RetryStats | None = None,
+    on_retry: Callable[[int, BaseException, float], None] | None = None,
+) -> T:
+    """Run `fn` under `limiter`, retrying up to `max_attempts` times.
+
+    Rate-limit failures trigger a shared cooldown (all workers back off);
+    other failures only delay the chunk that failed. The limiter slot is always
+    released, also when `fn` is cancelled (`CancelledError` is not retried).
+    """
+    attempts = max(1, int(max_attempts))
+    for attempt in range(1, attempts + 1):
+        await limiter.acquire()
+        ok = rate_limited = False
+        delay = 0.0
+        error: Exception | None = None
+        try:
+            result = await fn()
+            ok = True
+        except Exception as e:
+            error = e
+            rate_limited = is_rate_limited(e)
+            delay = backoff_delay(attempt, base_s=backoff_base_s, max_s=backoff_max_s)
+        finally:
+            await limiter.release(ok=ok, rate_limited=rate_limited, cooldown_s=delay)
+        if ok:
+            return result
+        if attempt >= attempts:
+            raise error
+        if stats is not None:
+            stats.retries += 1
+            stats.rate_limited += int(rate_limited)
+        if on_retry is not None:
+            on_retry(attempt, error, delay)
+        if not rate_limited:
+            # Rate limits already pause every worker via the limiter cooldown.
+            await asyncio.sleep(delay)
+    raise AssertionError("unreachable")
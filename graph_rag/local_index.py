@@ -0,0 +1,346 @@
+"""In-process vector index over the Chunk embeddings, as an alternative to Neo4j's.
+
+The Chunk embeddings only change when the graph is rebuilt, so instead of a
+`db.index.vector.queryNodes` round trip per question they can be exported once
+and searched locally:
+
+- `vectors.f32`: float32 matrix (one L2-normalised row per chunk), memory-mapped
+  read-only at query time
+- `meta.json`: element ids (row order), model, dimensions and the build manifest
+  state at export time
+- `hnsw.bin`: HNSW graph (`hnswlib`, optional) for corpora of at least
+  LOCAL_INDEX_HNSW_MIN chunks; smaller corpora use an exact vectorised top-k
+- `vectors.bin`: binary codes when VECTOR_QUANTIZATION=binary (see
+  `vector_compression.py`); exact search then scans the codes and re-scores
+  the best candidates from `vectors.f32`. VECTOR_QUANTIZATION=int8 applies to
+  the Neo4j index only; the local index then searches `vectors.f32`
+
+Scores use Neo4j's cosine convention, (1 + cos) / 2, so both backends rank and
+threshold the same way. Only the vector lookup moves in-process; the graph
+expansion still runs in Neo4j over the returned element ids.
+
+    python graph_rag/local_index.py             # export from Neo4j
+    RETRIEVAL_BACKEND=local python graph_rag/query.py --question "..."
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+if __name__ == "__main__":
+    # Ensure project root on sys.path when running as a script
+    sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from config import settings
+from logger_factory import bind, get_logger, new_run_id
+from manifest import MANIFEST_PATH
+from neo4j_connection import read
+from vector_compression import binary_scores, local_quantization, normalise, quantization, quantize_binary
+
+log = get_logger("graph_rag.local_index")
+
+VECTORS_FILE = "vectors.f32"
+META_FILE = "meta.json"
+HNSW_FILE = "hnsw.bin"
+# int8 codes written by exports from before int8 became Neo4j-only; removed on re-export.
+INT8_FILE = "vectors.i8"
+SCALES_FILE = "scales.f32"
+BINARY_FILE = "vectors.bin"
+LOCAL_INDEX_FILES = (VECTORS_FILE, META_FILE, HNSW_FILE, INT8_FILE, SCALES_FILE, BINARY_FILE)
+LOCAL_INDEX_VERSION = 2
+
+
+def manifest_state(path: str = MANIFEST_PATH) -> Optional[list[int]]:
+    """(mtime_ns, size) of the build manifest, or None if there is none."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+@dataclass(frozen=True)
+class ExportStats:
+    count: int
+    dimensions: int
+    size_bytes: int
+    hnsw: bool
+    quantization: str
+    latency_s: float
+
+
+def export_local_index(
+    driver: Any,
+    *,
+    database: str,
+    path: str,
+    dimensions: int,
+    hnsw_min: int,
+    quantize: str = "none",
+    fetch_size: int = 1000,
+) -> ExportStats:
+    """Stream every `Chunk.embedding` from Neo4j into a memory-mapped matrix at `path`."""
+    quantize = local_quantization(quantize)
+    t0 = time.perf_counter()
+    os.makedirs(path, exist_ok=True)
+    count = read(driver, "MATCH (n:Chunk) WHERE n.embedding IS NOT NULL RETURN count(n) AS c", database=database)[0]["c"]
+    # The embeddings stream through one auto-commit result instead of being
+    # collected into a managed transaction's record list.
+    with driver.session(database=database, fetch_size=fetch_size) as session:
+        tmp_vectors = os.path.join(path, VECTORS_FILE + ".tmp")
+        ids: list[str] = []
+        matrix = np.memmap(tmp_vectors, dtype=np.float32, mode="w+", shape=(max(1, count), dimensions))
+        result = session.run("MATCH (n:Chunk) WHERE n.embedding IS NOT NULL RETURN elementId(n) AS id, n.embedding AS embedding")
+        for record in result:
+            if len(ids) >= count:
+                break  # chunks added while exporting; the next export picks them up
+            vector = record["embedding"]
+            if len(vector) != dimensions:
+                raise ValueError(
+                    f"Chunk {record['id']} has a {len(vector)}-dim embedding, expected {dimensions} (EMBEDDING_DIMENSIONS)"
+                )
+            matrix[len(ids)] = normalise(np.asarray(vector, dtype=np.float32))
+            ids.append(record["id"])
+        # Fewer rows than `count` if chunks were deleted meanwhile; readers only map `len(ids)` rows.
+        matrix.flush()
+        del matrix
+
+    hnsw_path = os.path.join(path, HNSW_FILE)
+    built_hnsw = False
+    if len(ids) >= hnsw_min:
+        try:
+            import hnswlib
+        except ImportError:
+            log.warning("%d chunks but hnswlib is not installed; the local index will use exact search", len(ids))
+        else:
+            vectors = np.memmap(tmp_vectors, dtype=np.float32, mode="r", shape=(len(ids), dimensions))
+            graph = hnswlib.Index(space="ip", dim=dimensions)
+            graph.init_index(max_elements=len(ids), ef_construction=200, M=16)
+            graph.add_items(vectors, np.arange(len(ids)))
+            graph.save_index(hnsw_path + ".tmp")
+            os.replace(hnsw_path + ".tmp", hnsw_path)
+            built_hnsw = True
+    if not built_hnsw and os.path.exists(hnsw_path):
+        os.remove(hnsw_path)
+
+    _write_codes(path, tmp_vectors, count=len(ids), dimensions=dimensions, kind=quantize)
+
+    os.replace(tmp_vectors, os.path.join(path, VECTORS_FILE))
+    meta = {
+        "version": LOCAL_INDEX_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "embedding_model": settings.embedding_model,
+        "dimensions": dimensions,
+        "count": len(ids),
+        "quantization": quantize,
+        "neo4j_uri": settings.uri,
+        "neo4j_db": database,
+        "manifest": manifest_state(),
+        "ids": ids,
+    }
+    tmp_meta = os.path.join(path, META_FILE + ".tmp")
+    with open(tmp_meta, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, os.path.join(path, META_FILE))
+
+    size = sum(os.path.getsize(os.path.join(path, name)) for name in LOCAL_INDEX_FILES if os.path.exists(os.path.join(path, name)))
+    return ExportStats(
+        count=len(ids),
+        dimensions=dimensions,
+        size_bytes=size,
+        hnsw=built_hnsw,
+        quantization=quantize,
+        latency_s=time.perf_counter() - t0,
+    )
+
+
+def _write_codes(path: str, vectors_path: str, *, count: int, dimensions: int, kind: str, block: int = 4096) -> None:
+    """Quantized copies of the rows in `vectors_path`, written block by block."""
+    for name in (INT8_FILE, SCALES_FILE, BINARY_FILE):
+        if os.path.exists(os.path.join(path, name)):
+            os.remove(os.path.join(path, name))
+    if kind == "none" or count == 0:
+        return
+    vectors = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(count, dimensions))
+    if kind == "binary":
+        with open(os.path.join(path, BINARY_FILE), "wb") as f:
+            for start in range(0, count, block):
+                quantize_binary(vectors[start : start + block]).tofile(f)
+    else:
+        raise ValueError(f"unknown quantization {kind!r}")
+
+
+class LocalVectorIndex:
+    """Read-only view of an exported index; `search` matches `retrieval.vector_lookup`."""
+
+    def __init__(self, path: str, *, hnsw_ef: int = 64):
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            self.meta: dict[str, Any] = json.load(f)
+        if self.meta.get("version") != LOCAL_INDEX_VERSION:
+            raise ValueError(f"Unsupported local index version {self.meta.get('version')!r} in {path}")
+        self.path = path
+        self.ids: list[str] = list(self.meta["ids"])
+        self.dimensions = int(self.meta["dimensions"])
+        self.vectors = np.memmap(
+            os.path.join(path, VECTORS_FILE), dtype=np.float32, mode="r", shape=(max(1, len(self.ids)), self.dimensions)
+        )[: len(self.ids)]
+        # An older int8 export is searched at full precision, like a new one.
+        self.quantization = local_quantization(str(self.meta.get("quantization") or "none"))
+        self.codes: Optional[np.ndarray] = None
+        n = len(self.ids)
+        if self.quantization == "binary" and n:
+            self.codes = np.memmap(
+                os.path.join(path, BINARY_FILE), dtype=np.uint8, mode="r", shape=(n, (self.dimensions + 7) // 8)
+            )
+        self.hnsw: Any = None
+        hnsw_path = os.path.join(path, HNSW_FILE)
+        if os.path.exists(hnsw_path):
+            try:
+                import hnswlib
+            except ImportError:
+                log.warning("Local index has an HNSW graph but hnswlib is not installed; using exact search")
+            else:
+                self.hnsw = hnswlib.Index(space="ip", dim=self.dimensions)
+                self.hnsw.load_index(hnsw_path, max_elements=len(self.ids))
+                self.hnsw.set_ef(max(hnsw_ef, 1))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def kind(self) -> str:
+        if self.hnsw is not None:
+            return "hnsw"
+        return "exact" if self.codes is None else f"{self.quantization}+rescore"
+
+    def is_stale(self, manifest_path: str = MANIFEST_PATH) -> bool:
+        """True when the graph was rebuilt after this index was exported."""
+        return self.meta.get("manifest") != manifest_state(manifest_path)
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        top_k: int,
+        *,
+        exact: bool = False,
+        rescore_factor: Optional[int] = None,
+    ) -> list[dict[str, Any]]:
+        """[{"id": elementId, "score": float}, ...] best first.
+
+        `exact=True` scans the full-precision vectors (ground truth for recall checks).
+        """
+        if not self.ids or top_k <= 0:
+            return []
+        q = normalise(np.asarray(query_vector, dtype=np.float32))
+        if q.shape[-1] != self.dimensions:
+            raise ValueError(f"query vector has {q.shape[-1]} dims, local index has {self.dimensions}")
+        k = min(int(top_k), len(self.ids))
+        if self.hnsw is not None and not exact:
+            self.hnsw.set_ef(max(self.hnsw.ef, k))
+            labels, distances = self.hnsw.knn_query(q, k=k)
+            rows = labels[0]
+            cosines = 1.0 - distances[0]  # hnswlib "ip" distance is 1 - dot
+        elif self.codes is not None and not exact:
+            factor = settings.vector_rescore_factor if rescore_factor is None else rescore_factor
+            approx = binary_scores(self.codes, q)
+            candidates = _top_rows(approx, min(len(self.ids), k * max(1, factor)))
+            # Full-precision re-scoring touches only the candidate rows of the memmap.
+            candidates = np.sort(candidates)
+            sims = np.asarray(self.vectors[candidates]) @ q
+            best = _top_rows(sims, k)
+            rows, cosines = candidates[best], sims[best]
+        else:
+            sims = self.vectors @ q
+            rows = _top_rows(sims, k)
+            cosines = sims[rows]
+        return [{"id": self.ids[int(r)], "score": float((1.0 + c) / 2.0)} for r, c in zip(rows, cosines)]
+
+
+def _top_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` highest scores, best first."""
+    rows = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    return rows[np.argsort(-scores[rows], kind="stable")]
+
+
+def open_local_index(path: Optional[str] = None) -> Optional[LocalVectorIndex]:
+    """The exported index at `path` (default LOCAL_INDEX_PATH), or None if missing, unreadable or stale."""
+    path = path or settings.local_index_path
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        log.warning("No local vector index at %s; run: python graph_rag/local_index.py", path)
+        return None
+    try:
+        index = LocalVectorIndex(path, hnsw_ef=settings.local_index_hnsw_ef)
+    except (OSError, ValueError, KeyError) as e:
+        log.warning("Could not open local vector index at %s: %s", path, e)
+        return None
+    if index.is_stale():
+        log.warning("Local vector index at %s predates the last graph build; re-export it", path)
+        return None
+    if index.meta.get("embedding_model") != settings.embedding_model or index.dimensions != settings.embedding_dimensions:
+        log.warning(
+            "Local vector index was built for %s/%d, settings say %s/%d; re-export it",
+            index.meta.get("embedding_model"),
+            index.dimensions,
+            settings.embedding_model,
+            settings.embedding_dimensions,
+        )
+        return None
+    if index.quantization != local_quantization(quantization()):
+        log.warning(
+            "Local vector index was exported with quantization=%s, VECTOR_QUANTIZATION=%s; using the export as-is",
+            index.quantization,
+            quantization(),
+        )
+    log.info("Local vector index loaded: %d chunks, %d dims, %s search", len(index), index.dimensions, index.kind)
+    return index
+
+
+def main() -> None:
+    from neo4j_connection import create_driver
+
+    from ui import status
+
+    parser = argparse.ArgumentParser(description="Export Chunk embeddings from Neo4j into a local vector index")
+    parser.add_argument("--path", default=settings.local_index_path, help="Output directory")
+    parser.add_argument(
+        "--hnsw-min",
+        type=int,
+        default=settings.local_index_hnsw_min,
+        help="Build an HNSW graph (needs hnswlib) from this many chunks up",
+    )
+    args = parser.parse_args()
+
+    log_ctx = bind(log, run_id=new_run_id(), source="graph_rag", op="export_local_index", neo4j_db=settings.database)
+    driver = create_driver()
+    try:
+        with status("Exporting Chunk embeddings…"):
+            stats = export_local_index(
+                driver,
+                database=settings.database,
+                path=args.path,
+                dimensions=settings.embedding_dimensions,
+                hnsw_min=args.hnsw_min,
+                quantize=quantization(),
+            )
+        log_ctx.info(
+            "Local vector index exported: %d chunk(s), %d dims, %0.1f MiB, %s search in %0.2fs",
+            stats.count,
+            stats.dimensions,
+            stats.size_bytes / (1024 * 1024),
+            "hnsw" if stats.hnsw else f"exact, quantization={stats.quantization}",
+            stats.latency_s,
+            path=args.path,
+        )
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
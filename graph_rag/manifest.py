@@ -0,0 +1,174 @@
+"""Build manifest for incremental GraphRAG rebuilds.
+
+The manifest records, per source file, the file hash and the content hash of
+every chunk that made it into Neo4j (see `chunk_utils.get_documents` metadata).
+Diffing it against freshly chunked documents tells the builder which chunks are
+new, which disappeared and which only moved to a different position.
+"""
+from __future__ import annotations
+
+import json
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+from config import settings
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+MANIFEST_PATH = os.path.join(os.path.dirname(__file__), ".build_manifest.json")
+# 2: provenance lives in Chunk properties instead of SOURCE/CHUNK_INDEX text headers.
+MANIFEST_VERSION = 2
+
+
+@dataclass(frozen=True)
+class ChunkRef:
+    source: str
+    chunk_index: int
+    content_hash: str
+
+
+@dataclass
+class ManifestDiff:
+    # Chunks that need extraction + embedding.
+    added: list[Document] = field(default_factory=list)
+    # Chunks whose Chunk/entity subgraph must be retracted.
+    removed: list[ChunkRef] = field(default_factory=list)
+    # Unchanged content at a new position: (previous ref, new chunk_index).
+    moved: list[tuple[ChunkRef, int]] = field(default_factory=list)
+    unchanged: int = 0
+    changed_sources: set[str] = field(default_factory=set)
+    # Set when the manifest cannot be trusted and everything must be rebuilt.
+    full_rebuild_reason: Optional[str] = None
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.moved)
+
+
+def build_fingerprint() -> dict[str, Any]:
+    """Settings that, when changed, invalidate every chunk in the manifest."""
+    return {
+        "neo4j_uri": settings.uri,
+        "neo4j_db": settings.database,
+        "chunk_size": settings.chunk_size,
+        "chunk_overlap": settings.chunk_overlap,
+        "chat_model": settings.chat_model,
+        "embedding_model": settings.embedding_model,
+        "embedding_dimensions": settings.embedding_dimensions,
+    }
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> Optional[dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict[str, Any], path: str = MANIFEST_PATH) -> None:
+    # Write-then-rename so an interrupted build never leaves a truncated manifest.
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def delete_manifest(path: str = MANIFEST_PATH) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def manifest_from_documents(documents: Iterable[Document], *, exclude: Iterable[ChunkRef] = ()) -> dict[str, Any]:
+    """Manifest describing `documents`, minus chunks in `exclude` (e.g. failed extractions)."""
+    skip = set(exclude)
+    files: dict[str, dict[str, Any]] = {}
+    for d in documents:
+        md = d.metadata or {}
+        source = md["source"]
+        entry = files.setdefault(source, {"file_hash": md.get("file_hash"), "chunks": []})
+        ref = ChunkRef(source, int(md["chunk_index"]), md["content_hash"])
+        if ref in skip:
+            # A partially built file must not look unchanged next time.
+            entry["file_hash"] = None
+            continue
+        entry["chunks"].append({"chunk_index": ref.chunk_index, "content_hash": ref.content_hash})
+    return {
+        "version": MANIFEST_VERSION,
+        "updated_at": datetime.now(timezone.utc).astimezone().isoformat(timespec="seconds"),
+        "fingerprint": build_fingerprint(),
+        "files": files,
+    }
+
+
+def diff_manifest(old: Optional[dict[str, Any]], documents: list[Document]) -> ManifestDiff:
+    """Compare the stored manifest with freshly chunked documents.
+
+    Chunks are matched within a file by content hash, so inserting a paragraph
+    only re-extracts the chunks whose text actually changed; the rest are
+    reported as `moved` (position update only).
+    """
+    diff = ManifestDiff()
+    if old is None:
+        diff.full_rebuild_reason = "no manifest"
+    elif old.get("version") != MANIFEST_VERSION:
+        diff.full_rebuild_reason = f"manifest version {old.get('version')} != {MANIFEST_VERSION}"
+    elif old.get("fingerprint") != build_fingerprint():
+        diff.full_rebuild_reason = "build settings changed"
+    if diff.full_rebuild_reason:
+        diff.added = list(documents)
+        diff.changed_sources = {(d.metadata or {}).get("source") for d in documents}
+        return diff
+
+    old_files: dict[str, Any] = old.get("files") or {}
+    new_by_source: dict[str, list[Document]] = defaultdict(list)
+    for d in documents:
+        new_by_source[d.metadata["source"]].append(d)
+
+    for source, docs in new_by_source.items():
+        prev = old_files.get(source)
+        file_hash = docs[0].metadata.get("file_hash")
+        if prev and file_hash and prev.get("file_hash") == file_hash:
+            diff.unchanged += len(docs)
+            continue
+
+        before = (len(diff.added), len(diff.removed), len(diff.moved))
+        # hash -> previous chunk indexes still available for matching
+        available: dict[str, list[int]] = defaultdict(list)
+        for c in (prev or {}).get("chunks", []):
+            available[c["content_hash"]].append(int(c["chunk_index"]))
+
+        for d in docs:
+            h = d.metadata["content_hash"]
+            idx = int(d.metadata["chunk_index"])
+            candidates = available.get(h)
+            if not candidates:
+                diff.added.append(d)
+                continue
+            old_idx = idx if idx in candidates else candidates[0]
+            candidates.remove(old_idx)
+            if old_idx == idx:
+                diff.unchanged += 1
+            else:
+                diff.moved.append((ChunkRef(source, old_idx, h), idx))
+
+        for h, indexes in available.items():
+            diff.removed.extend(ChunkRef(source, i, h) for i in indexes)
+        if (len(diff.added), len(diff.removed), len(diff.moved)) != before:
+            diff.changed_sources.add(source)
+
+    for source, prev in old_files.items():
+        if source in new_by_source:
+            continue
+        diff.removed.extend(
+            ChunkRef(source, int(c["chunk_index"]), c["content_hash"]) for c in prev.get("chunks", [])
+        )
+        diff.changed_sources.add(source)
+
+    return diff
@@ -1,10 +1,8 @@
+import argparse
 import asyncio
 import os
 import sys
-import time
 
-from neo4j import GraphDatabase
-from neo4j_graphrag.embeddings import OpenAIEmbeddings
 from neo4j_graphrag.indexes import upsert_vectors
 from neo4j_graphrag.types import EntityType
 
@@ -12,14 +10,57 @@ if __name__ == "__main__":
     # Ensure project root on sys.path when running as a script
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from config import settings
+from neo4j_connection import create_driver, log_pool_metrics, read
+from embedding_batches import embed_texts, run_embedding_stage
+from embedding_cache import cached_embedder, close_cache, log_cache_stats
+from local_index import export_local_index
 from logger_factory import bind, get_logger, new_run_id
 from ui import progress_task, status
+from vector_compression import make_embedder, quantization
 
 log = get_logger("graph_rag.populate_vector_index")
 
+
+def _export_local(driver, log_ctx) -> None:
+    with status("Exporting local vector index…"):
+        stats = export_local_index(
+            driver,
+            database=settings.database,
+            path=settings.local_index_path,
+            dimensions=settings.embedding_dimensions,
+            hnsw_min=settings.local_index_hnsw_min,
+            quantize=quantization(),
+        )
+    log_ctx.info(
+        "Local vector index exported: %d chunk(s), %0.1f MiB, %s search",
+        stats.count,
+        stats.size_bytes / (1024 * 1024),
+        "hnsw" if stats.hnsw else "exact",
+        path=settings.local_index_path,
+    )
+
+
 async def main() -> None:
-    driver = GraphDatabase.driver(settings.uri, auth=(settings.user, settings.password))
-    embedder = OpenAIEmbeddings(model=settings.embedding_model)
+    parser = argparse.ArgumentParser(description="Embed :Chunk nodes and upsert the vectors")
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Re-embed every chunk (by default only chunks the KG build left without an embedding)",
+    )
+    parser.add_argument("--batch-tokens", type=int, default=settings.embed_batch_tokens, help="Token budget per embedding request")
+    parser.add_argument("--batch-size", type=int, default=settings.embed_batch_size, help="Max texts per embedding request")
+    parser.add_argument("--concurrency", type=int, default=settings.embed_concurrency, help="Embedding requests in flight")
+    parser.add_argument(
+        "--export-local",
+        action="store_true",
+        help="Afterwards, export all Chunk embeddings to the local vector index (RETRIEVAL_BACKEND=local)",
+    )
+    args = parser.parse_args()
+
+    driver = create_driver()
+    embedder = make_embedder()
+    # Unchanged chunk texts are served from the local cache; only misses are sent, batched.
+    cached = cached_embedder(embedder, batch_fn=lambda batch: embed_texts(embedder, batch))
 
     run_id = new_run_id()
     log_ctx = bind(
@@ -38,46 +79,60 @@ async def main() -> None:
         ids = []
         texts = []
         with status("Fetching Chunk nodes from Neo4j…"):
-            with driver.session(database=settings.database) as session:
-                results = session.run(
-                    "MATCH (n:Chunk) RETURN elementId(n) as id, n.text as text, n.embedding as embedding;"
-                )
-                for record in results:
-                    ids.append(str(record["id"]))
-                    texts.append(record["text"])
+            # builder.py embeds chunks as it writes them; only fill the gaps.
+            where = "" if args.all else "WHERE n.embedding IS NULL "
+            for record in read(driver, f"MATCH (n:Chunk) {where}RETURN elementId(n) as id, n.text as text;"):
+                ids.append(str(record["id"]))
+                texts.append(record["text"])
 
         log_ctx.info("Fetched nodes", count=len(ids))
         if not texts:
-            log_ctx.warning("No texts found to embed; skipping upsert")
+            log_ctx.info("No chunks need embedding; skipping upsert")
+            if args.export_local:
+                _export_local(driver, log_ctx)
             return
 
-        # Embed all texts
-        embeddings = []
-        with progress_task(description="Embedding Chunk texts…", total=len(texts)) as (progress, task_id):
-            for i, t in enumerate(texts, start=1):
-                t0 = time.perf_counter()
-                emb = embedder.embed_query(t)
-                embeddings.append(emb)
-                progress.update(task_id, advance=1)
-                if i == 1 or i % 25 == 0:
-                    log_ctx.debug("Embedded", at=i, latency_s=f"{time.perf_counter() - t0:0.2f}")
-
-        # Upsert vectors with real IDs
-        with status("Upserting vectors into Neo4j index…"):
+        def upsert(batch_ids: list[str], vectors: list[list[float]]) -> None:
+            # Each finished batch goes straight to Neo4j; nothing accumulates here.
             upsert_vectors(
                 driver,
-                ids=ids,
+                ids=batch_ids,
                 embedding_property="embedding",
-                embeddings=embeddings,
+                embeddings=vectors,
                 neo4j_database=settings.database,
                 entity_type=EntityType.NODE,
             )
-        log_ctx.info("Vector upsert completed", count=len(ids))
+            log_ctx.debug("Upserted batch", count=len(batch_ids))
+
+        # Embed in token-bounded batches with several requests in flight
+        with progress_task(description="Embedding Chunk texts…", total=len(texts)) as (progress, task_id):
+            stats = run_embedding_stage(
+                cached,
+                zip(ids, texts),
+                upsert,
+                max_tokens=args.batch_tokens,
+                max_items=args.batch_size,
+                concurrency=args.concurrency,
+                on_progress=lambda n: progress.update(task_id, advance=n),
+            )
+        log_ctx.info(
+            "Vector upsert completed: %d chunk(s) in %d batch(es), %0.1f chunks/s",
+            stats.texts,
+            stats.batches,
+            stats.texts_per_s,
+            count=stats.texts,
+            latency_s=f"{stats.latency_s:0.2f}",
+        )
+        log_cache_stats(log_ctx, cached)
+        log_pool_metrics(log_ctx, driver)
+        if args.export_local:
+            _export_local(driver, log_ctx)
     except Exception as e:
         log.exception("Error occurred during vector index creation: %s", e)
     finally:
         driver.close()
-        embedder.client.close()
+        embedder.close()
+        close_cache(cached)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
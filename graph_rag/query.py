@@ -1,26 +1,70 @@
+from __future__ import annotations
+
 import argparse
 import asyncio
+import functools
 import os
 import sys
 import time
-
-from neo4j import GraphDatabase
-from neo4j_graphrag.embeddings import OpenAIEmbeddings
-from neo4j_graphrag.generation import GraphRAG
-from neo4j_graphrag.llm import OpenAILLM
-from neo4j_graphrag.retrievers import VectorCypherRetriever
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Generator, Iterator
 
 if __name__ == "__main__":
     # Ensure project root on sys.path when running as a script
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from config import settings, ensure_openai_key
+from context_packer import ContextHit, hit_from_record, pack_context
+from expansion import LEGACY_RETRIEVAL_QUERY, ExpansionConfig, build_retrieval_query
 from logger_factory import bind, get_logger, new_run_id
+from query_cache import QueryCache, default_query_cache
+from query_timing import QueryAnswer, format_timings
+from resources import Lazy, neo4j_async_driver, neo4j_driver, unwrap
+from retrieval import (
+    aexpand_hits,
+    afulltext_lookup,
+    avector_lookup,
+    expand_hits,
+    fulltext_lookup,
+    fuse_rankings,
+    is_rejected_statement,
+    vector_lookup,
+)
+from token_utils import count_tokens
+from tracing import Trace
 from run_result_writer import write_run_result
-from ui import print_qa_block, status, wait_for_enter
+from ui import print_qa_block, status, stream_qa_block, wait_for_enter
+
+if TYPE_CHECKING:
+    from local_index import LocalVectorIndex
 
 log = get_logger("graph_rag.query")
-driver = GraphDatabase.driver(settings.uri, auth=(settings.user, settings.password))
-embeddings = OpenAIEmbeddings(model=settings.embedding_model)
+# Drivers and clients are created on first use (see resources.py), so importing
+# this module, or running it with --help, connects to nothing.
+driver = neo4j_driver()
+# The async path (`aquery`, `aanswer_question`) has its own driver, bound to the running loop.
+async_driver = neo4j_async_driver()
+
+
+def _make_openai_embeddings():
+    from vector_compression import make_embedder
+
+    return make_embedder()
+
+
+def _make_embeddings():
+    # Repeated questions reuse their query embedding from the local cache.
+    from embedding_cache import cached_embedder
+
+    return cached_embedder(openai_embeddings.get())
+
+
+def _close_embeddings(embedder) -> None:
+    from embedding_cache import close_cache
+
+    close_cache(embedder)
+
+
+openai_embeddings = Lazy(_make_openai_embeddings, name="graph_rag.embedder", close_fn=lambda e: e.close())
+embeddings = Lazy(_make_embeddings, name="graph_rag.embeddings", close_fn=_close_embeddings)
 
 
 def _record_to_context(record):
@@ -66,45 +110,465 @@ def _record_to_context(record):
 
 
 # Graph-augmented retrieval: vector search gets the best :Chunk nodes, then we
-# expand around each chunk in the graph to pull connected entities/relations.
-RETRIEVAL_QUERY = """
-WITH node, score
-OPTIONAL MATCH (node)-[r]-(e)
-WITH node, score,
-     collect(DISTINCT type(r) + ' -> ' + head(labels(e)) + ':' +
-       coalesce(e.name, e.title, e.path, e.adr_num, e.file, e.url, ''))[..40] AS graph_facts
-RETURN node { .text, .source, .index } AS node,
-       labels(node) AS nodeLabels,
-       elementId(node) AS elementId,
-       elementId(node) AS id,
-       score,
-       graph_facts AS graph_facts
-"""
-
-
-def _result_formatter(record):
-    # neo4j-graphrag expects RetrieverResultItem(content=..., metadata=...)
-    from neo4j_graphrag.types import RetrieverResultItem
-
-    formatted = _record_to_context(record)
-    return RetrieverResultItem(content=formatted["content"], metadata=formatted["metadata"])
-
-
-retriever = VectorCypherRetriever(
-    driver,
-    settings.vector_index,
-    RETRIEVAL_QUERY,
-    embeddings,
-    result_formatter=_result_formatter,
-    neo4j_database=settings.database,
-)
+# expand around each chunk along schema relationships only, with per-chunk and
+# per-entity caps and hub detection (see expansion.py / GRAPH_EXPANSION_*).
+EXPANSION = ExpansionConfig.from_settings()
+RETRIEVAL_QUERY = build_retrieval_query(EXPANSION)
 
-llm = OpenAILLM(model_name=settings.chat_model, model_params={"top_p": 1.0})
-rag = GraphRAG(retriever=retriever, llm=llm)
 
-def query(question: str) -> str:
-    run_id = new_run_id()
-    log_ctx = bind(
+def _hit_to_record(hit: ContextHit) -> dict:
+    return {
+        "node": {"text": hit.text, "source": hit.source, "index": hit.chunk_index},
+        "score": hit.score,
+        "graph_facts": list(hit.graph_facts),
+        "id": hit.id,
+    }
+
+
+@functools.cache
+def _rescore_factor() -> int:
+    # Quantized indexes only pick candidates; exact cosine re-ranks top_k * factor of them.
+    from vector_compression import quantization
+
+    return settings.vector_rescore_factor if quantization() != "none" else 1
+
+
+# RETRIEVAL_MODE=hybrid: full-text ranking fused with the vector ranking (RRF).
+HYBRID = settings.retrieval_mode.strip().lower() == "hybrid"
+
+
+def _open_local_index() -> LocalVectorIndex | None:
+    if settings.retrieval_backend.strip().lower() != "local":
+        return None
+    from local_index import open_local_index
+
+    index = open_local_index()
+    if index is None:
+        log.warning("Falling back to the Neo4j vector index")
+    return index
+
+
+# RETRIEVAL_BACKEND=local: vector lookup against the exported in-process index,
+# opened (numpy, hnswlib, the memory-mapped files) on the first question.
+local_index = Lazy(_open_local_index, name="graph_rag.local_index", close_fn=lambda index: None)
+
+
+
+def _make_llm():
+    from neo4j_graphrag.llm import OpenAILLM
+
+    return OpenAILLM(model_name=settings.chat_model, model_params={"top_p": 1.0})
+
+
+def _make_prompt_template():
+    # neo4j_graphrag.generation pulls in the whole GraphRAG/OpenAI type tree; only load it to answer.
+    from neo4j_graphrag.generation import RagTemplate
+
+    return RagTemplate()
+
+
+llm = Lazy(_make_llm, name="graph_rag.llm", close_fn=lambda l: l.client.close())
+# The retrieval steps run in `retrieve`; GraphRAG's prompt is all that is reused.
+prompt_template = Lazy(_make_prompt_template, name="graph_rag.prompt_template")
+# Repeated questions skip the embedding call and the retrieval Cypher entirely.
+query_cache: QueryCache | None = default_query_cache()
+
+def warm_up() -> None:
+    """Create the lazy driver, embedder, LLM and prompt now instead of on the first question."""
+    for resource in (driver, openai_embeddings, embeddings, llm, prompt_template):
+        unwrap(resource)
+
+
+def _stream_completion(prompt: str) -> Iterator[str]:
+    """`llm.invoke`, but yielding the answer text as the model produces it."""
+    try:
+        stream = llm.client.chat.completions.create(
+            messages=llm.get_messages(prompt, system_instruction=prompt_template.system_instructions),
+            model=llm.model_name,
+            stream=True,
+            **llm.model_params,
+        )
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+    except llm.openai.OpenAIError as e:
+        from neo4j_graphrag.exceptions import LLMGenerationError
+
+        raise LLMGenerationError(e)
+
+
+async def _astream_completion(prompt: str) -> AsyncIterator[str]:
+    """`_stream_completion` through the LLM's `openai.AsyncOpenAI` client."""
+    try:
+        stream = await llm.async_client.chat.completions.create(
+            messages=llm.get_messages(prompt, system_instruction=prompt_template.system_instructions),
+            model=llm.model_name,
+            stream=True,
+            **llm.model_params,
+        )
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        finally:
+            # Cancelled or timed out mid-answer: drop the response instead of reading it to the end.
+            await stream.close()
+    except llm.openai.OpenAIError as e:
+        from neo4j_graphrag.exceptions import LLMGenerationError
+
+        raise LLMGenerationError(e)
+
+
+def _cached_query_vector(question: str, span) -> list[float] | None:
+    query_vector = query_cache.embeddings.get(question) if query_cache is not None else None
+    span.set(cached=query_vector is not None)
+    return query_vector
+
+
+def _cache_query_vector(question: str, query_vector: list[float]) -> None:
+    if query_cache is not None:
+        query_cache.embeddings.put(question, query_vector)
+
+
+def _usable_local_index(span) -> LocalVectorIndex | None:
+    # A graph rebuilt since the export invalidates the local index's element ids.
+    opened = unwrap(local_index)
+    index = opened if opened is not None and not opened.is_stale() else None
+    if opened is not None and index is None:
+        span.set(local_index_stale=True)
+    return index
+
+
+def _cached_hits(query_vector, index: LocalVectorIndex | None, *, top_k: int, question: str, span):
+    """(retrieval cache key or None, cached hits or None)."""
+    key = hits = None
+    if query_cache is not None:
+        key = QueryCache.retrieval_key(
+            query_vector,
+            index_name=index.path if index is not None else settings.vector_index,
+            top_k=top_k,
+            retrieval_query=RETRIEVAL_QUERY,
+            query_text=question if HYBRID else None,
+        )
+        hits = query_cache.retrievals.get(key)
+    span.set(cached=hits is not None)
+    return key, hits
+
+
+def _lookup_k(top_k: int) -> int:
+    # Hybrid: a deeper candidate list from each ranking, cut to top_k by the fusion.
+    return max(top_k, settings.hybrid_candidates) if HYBRID else top_k
+
+
+def _fuse(vector_hits: list[dict], text_hits: list[dict], *, top_k: int, trace: Trace) -> list[dict]:
+    with trace.span("fuse") as span:
+        vector_ids = {h["id"] for h in vector_hits[:top_k]}
+        fused = fuse_rankings([vector_hits, text_hits], top_k=top_k, k=settings.rrf_k)
+        # Hits the vector ranking alone would have missed at this top_k.
+        span.set(hits=len(fused), from_fulltext=sum(1 for h in fused if h["id"] not in vector_ids))
+    return fused
+
+
+def _fall_back_to_legacy_expansion(exc: BaseException) -> bool:
+    """Switch to `LEGACY_RETRIEVAL_QUERY` if Neo4j refused to compile the generated expansion."""
+    global RETRIEVAL_QUERY
+    if RETRIEVAL_QUERY == LEGACY_RETRIEVAL_QUERY or not is_rejected_statement(exc):
+        return False
+    log.error(
+        "Neo4j rejected the GRAPH_EXPANSION_* retrieval query; using the legacy expansion "
+        "(check with `python graph_rag/expansion.py --explain`): %s",
+        exc,
+    )
+    RETRIEVAL_QUERY = LEGACY_RETRIEVAL_QUERY
+    return True
+
+
+def _expansion_attributes(records) -> dict:
+    return {
+        "records": len(records),
+        "graph_facts": sum(len(r.get("graph_facts") or []) for r in records),
+        "entities": sum(r.get("entity_count") or 0 for r in records),
+        "hubs": sum(r.get("hub_count") or 0 for r in records),
+        "hops": EXPANSION.hops,
+    }
+
+
+def _assemble(records, key, *, trace: Trace) -> list[ContextHit]:
+    with trace.span("assemble") as span:
+        hits = [hit_from_record(r) for r in records]
+        span.set(hits=len(hits))
+    if key is not None:
+        query_cache.retrievals.put(key, hits)
+    return hits
+
+
+def _retrieval_steps(
+    question: str, *, top_k: int, trace: Trace
+) -> Generator[tuple[str, dict], Any, list[ContextHit]]:
+    """The retrieval pipeline without its I/O, shared by `retrieve` and `aretrieve`.
+
+    Yields each I/O step as `(name, kwargs)` (a key of `_SYNC_STEPS` /
+    `_ASYNC_STEPS`) and expects its result sent back, or its exception thrown
+    in; returns the hits. Spans, caching, fusion and the expansion fallback all
+    live here, so both paths trace and behave the same.
+    """
+    if query_cache is not None:
+        query_cache.check_manifest()
+    with trace.span("embed", question_tokens=count_tokens(question)) as span:
+        query_vector = _cached_query_vector(question, span)
+        if query_vector is None:
+            query_vector = yield "embed", {"text": question}
+            _cache_query_vector(question, query_vector)
+    with trace.span("retrieve") as retrieve_span:
+        index = _usable_local_index(retrieve_span)
+        key, hits = _cached_hits(query_vector, index, top_k=top_k, question=question, span=retrieve_span)
+        if hits is not None:
+            return hits
+        lookup_k = _lookup_k(top_k)
+        with trace.span("vector_lookup") as span:
+            if index is not None:
+                vector_hits = yield "local_search", {"index": index, "query_vector": query_vector, "top_k": lookup_k}
+                span.set(backend=f"local:{index.kind}")
+            else:
+                vector_hits = yield "vector_lookup", {
+                    "index_name": settings.vector_index,
+                    "query_vector": query_vector,
+                    "top_k": lookup_k,
+                    "database": settings.database,
+                    "rescore_factor": _rescore_factor(),
+                }
+                span.set(backend="neo4j")
+            span.set(hits=len(vector_hits))
+        if HYBRID:
+            with trace.span("fulltext_lookup") as span:
+                text_hits = yield "fulltext_lookup", {
+                    "index_name": settings.fulltext_index,
+                    "query_text": question,
+                    "top_k": lookup_k,
+                    "database": settings.database,
+                }
+                span.set(hits=len(text_hits))
+            vector_hits = _fuse(vector_hits, text_hits, top_k=top_k, trace=trace)
+        with trace.span("expand") as span:
+            try:
+                records = yield "expand", _expand_kwargs(vector_hits)
+            except Exception as e:
+                if not _fall_back_to_legacy_expansion(e):
+                    raise
+                span.set(expansion="legacy")
+                records = yield "expand", _expand_kwargs(vector_hits)
+            span.set(**_expansion_attributes(records))
+        return _assemble(records, key, trace=trace)
+
+
+def _expand_kwargs(hits: list[dict]) -> dict:
+    # RETRIEVAL_QUERY is read per call: `_fall_back_to_legacy_expansion` may replace it.
+    return {"hits": hits, "retrieval_query": RETRIEVAL_QUERY, "database": settings.database}
+
+
+async def _aembed(text: str) -> list[float]:
+    from embedding_cache import aembed_query
+
+    return await aembed_query(embeddings, text)
+
+
+# The I/O of `_retrieval_steps`: blocking clients, and their event-loop counterparts.
+_SYNC_STEPS: dict[str, Callable[..., Any]] = {
+    "embed": lambda text: embeddings.embed_query(text),
+    "local_search": lambda index, query_vector, top_k: index.search(query_vector, top_k),
+    "vector_lookup": lambda **kwargs: vector_lookup(driver, **kwargs),
+    "fulltext_lookup": lambda **kwargs: fulltext_lookup(driver, **kwargs),
+    "expand": lambda **kwargs: expand_hits(driver, **kwargs),
+}
+_ASYNC_STEPS: dict[str, Callable[..., Awaitable[Any]]] = {
+    "embed": _aembed,
+    # numpy / hnswlib scan: off the loop so other questions keep moving.
+    "local_search": lambda index, query_vector, top_k: asyncio.to_thread(index.search, query_vector, top_k),
+    "vector_lookup": lambda **kwargs: avector_lookup(async_driver, **kwargs),
+    "fulltext_lookup": lambda **kwargs: afulltext_lookup(async_driver, **kwargs),
+    "expand": lambda **kwargs: aexpand_hits(async_driver, **kwargs),
+}
+
+
+def retrieve(question: str, *, top_k: int, trace: Trace) -> list[ContextHit]:
+    """Context hits for `question`, best first: the `embed` and `retrieve` spans of `answer_question`.
+
+    Question embedding, vector index lookup (plus full-text lookup and rank
+    fusion in hybrid mode), graph expansion (`RETRIEVAL_QUERY`) and conversion
+    to `ContextHit`s, each cached in `query_cache` when enabled.
+    """
+    steps = _retrieval_steps(question, top_k=top_k, trace=trace)
+    result: Any = None
+    error: BaseException | None = None
+    while True:
+        try:
+            name, kwargs = steps.send(result) if error is None else steps.throw(error)
+        except StopIteration as done:
+            return done.value
+        try:
+            result, error = _SYNC_STEPS[name](**kwargs), None
+        except BaseException as e:  # cancellation too, so the spans see it
+            result, error = None, e
+
+
+async def aretrieve(question: str, *, top_k: int, trace: Trace) -> list[ContextHit]:
+    """`retrieve` on the event loop: `async_driver` for Neo4j, `aembed_query` for the question."""
+    steps = _retrieval_steps(question, top_k=top_k, trace=trace)
+    result: Any = None
+    error: BaseException | None = None
+    while True:
+        try:
+            name, kwargs = steps.send(result) if error is None else steps.throw(error)
+        except StopIteration as done:
+            return done.value
+        try:
+            result, error = await _ASYNC_STEPS[name](**kwargs), None
+        except BaseException as e:  # cancellation too, so the spans see it
+            result, error = None, e
+
+
+def build_prompt(question: str, hits: list[ContextHit], *, trace: Trace) -> str:
+    """The LLM prompt for `question` over `hits` (the `prompt` span of `answer_question`)."""
+    with trace.span("prompt") as span:
+        # What rendering every record separately (the `GraphRAG.search` path) would cost.
+        legacy_context = "\n".join(_record_to_context(_hit_to_record(h))["content"] for h in hits)
+        if settings.context_packing:
+            packed = pack_context(hits, baseline_tokens=count_tokens(legacy_context))
+            context = packed.text
+            span.set(
+                hits_kept=packed.hits_kept,
+                blocks=packed.blocks,
+                facts_in=packed.facts_in,
+                facts_kept=packed.facts_kept,
+                baseline_tokens=packed.baseline_tokens,
+                tokens_saved=packed.tokens_saved,
+                truncated=packed.truncated,
+            )
+        else:
+            context = legacy_context
+        prompt = prompt_template.format(query_text=question, context=context, examples="")
+        span.set(
+            context_chars=len(context),
+            context_tokens=count_tokens(context),
+            prompt_tokens=count_tokens(prompt),
+        )
+    return prompt
+
+
+class _AnswerStream:
+    """Collects the streamed answer inside the `generate` span; the first piece marks `ttft`."""
+
+    def __init__(self, trace: Trace, span, on_token: Callable[[str], None] | None):
+        self.trace = trace
+        self.span = span
+        self.on_token = on_token
+        self.parts: list[str] = []
+        self.t0 = time.perf_counter()
+
+    def add(self, delta: str) -> None:
+        if not self.parts:
+            self.trace.mark("ttft")
+            self.span.set(first_token_s=round(time.perf_counter() - self.t0, 4))
+        self.parts.append(delta)
+        if self.on_token is not None:
+            self.on_token(delta)
+
+    def text(self) -> str:
+        answer = "".join(self.parts)
+        self.span.set(answer_tokens=count_tokens(answer), deltas=len(self.parts))
+        return answer
+
+
+def _query_answer(question: str, answer: str, hits: list[ContextHit], trace: Trace) -> QueryAnswer:
+    return QueryAnswer(
+        question=question,
+        answer=answer,
+        source="graph_rag",
+        timings=trace.timings(),
+        metrics=trace.attributes(),
+        sources=tuple(dict.fromkeys(f"{h.source}#{h.chunk_index}" for h in hits)),
+    )
+
+
+def _new_trace(top_k: int, run_id: str | None) -> Trace:
+    return Trace("graph_rag.query", trace_id=run_id, top_k=top_k, mode="hybrid" if HYBRID else "vector")
+
+
+def answer_question(
+    question: str,
+    *,
+    top_k: int | None = None,
+    run_id: str | None = None,
+    on_token: Callable[[str], None] | None = None,
+) -> QueryAnswer:
+    """Run the GraphRAG pipeline for `question`, tracing each stage.
+
+    Same steps as `GraphRAG.search`, split into spans: question embedding, vector
+    index lookup (plus full-text lookup and rank fusion in hybrid mode), graph
+    expansion (`RETRIEVAL_QUERY`), context assembly, prompt formatting and LLM
+    generation. `top_k` defaults to RETRIEVAL_TOP_K.
+
+    The answer is always streamed from the model, so `timings["ttft"]` (question
+    to first answer token) and `timings["generate"]` (whole generation) are both
+    recorded; `on_token` receives each piece of text as it arrives.
+    """
+    top_k = int(top_k or settings.retrieval_top_k)
+    trace = _new_trace(top_k, run_id)
+    try:
+        hits = retrieve(question, top_k=top_k, trace=trace)
+        prompt = build_prompt(question, hits, trace=trace)
+        with trace.span("generate") as span:
+            stream = _AnswerStream(trace, span, on_token)
+            for delta in _stream_completion(prompt):
+                stream.add(delta)
+            answer = stream.text()
+    finally:
+        trace.finish()
+    return _query_answer(question, answer, hits, trace)
+
+
+async def _aanswer(question: str, *, top_k: int, run_id: str | None, on_token: Callable[[str], None] | None) -> QueryAnswer:
+    trace = _new_trace(top_k, run_id)
+    try:
+        hits = await aretrieve(question, top_k=top_k, trace=trace)
+        prompt = build_prompt(question, hits, trace=trace)
+        with trace.span("generate") as span:
+            stream = _AnswerStream(trace, span, on_token)
+            async for delta in _astream_completion(prompt):
+                stream.add(delta)
+            answer = stream.text()
+    finally:
+        trace.finish()
+    return _query_answer(question, answer, hits, trace)
+
+
+async def aanswer_question(
+    question: str,
+    *,
+    top_k: int | None = None,
+    run_id: str | None = None,
+    on_token: Callable[[str], None] | None = None,
+    timeout: float | None = None,
+) -> QueryAnswer:
+    """`answer_question` without blocking the event loop, so many questions can share one.
+
+    Neo4j goes through `async_driver`, the question embedding and the answer
+    stream through the async OpenAI clients. `timeout` (default QUERY_TIMEOUT_S,
+    0 for none) bounds the whole question. When it expires, or the calling task
+    is cancelled, the Neo4j query or answer stream in flight is cancelled too;
+    a timeout raises `asyncio.TimeoutError`.
+    """
+    timeout = settings.query_timeout_s if timeout is None else timeout
+    answer = _aanswer(question, top_k=int(top_k or settings.retrieval_top_k), run_id=run_id, on_token=on_token)
+    if timeout and timeout > 0:
+        return await asyncio.wait_for(answer, timeout)
+    return await answer
+
+
+def _query_log(run_id: str):
+    return bind(
         log,
         run_id=run_id,
         source="graph_rag",
@@ -116,33 +580,101 @@ def query(question: str) -> str:
         vector_index=settings.vector_index,
     )
 
+
+def _record_answer(result: QueryAnswer, log_ctx, *, stream: bool) -> None:
+    log_ctx.info(
+        "Search completed (%s)",
+        format_timings(result.timings),
+        latency_s=f"{result.timings['total']:0.2f}",
+    )
+
+    if not stream:
+        print_qa_block(question=result.question, answer=result.answer, title="GRAPH_RAG")
+
+    written = write_run_result(
+        question=result.question,
+        answer=result.answer,
+        source="graph_rag",
+        timings=result.timings,
+        metrics=result.metrics,
+        sources=result.sources,
+    )
+    log_ctx.info("Saved run result", path=written.path)
+
+
+def query(question: str, *, stream: bool | None = None) -> str:
+    stream = settings.stream_answers if stream is None else stream
+    run_id = new_run_id()
+    log_ctx = _query_log(run_id)
+
+    log_ctx.info("Starting query", question=question)
+    if stream:
+        with stream_qa_block(question=question, title="GRAPH_RAG") as write:
+            result = answer_question(question, run_id=run_id, on_token=write)
+    else:
+        with status("Running GraphRAG search…"):
+            result = answer_question(question, run_id=run_id)
+    _record_answer(result, log_ctx, stream=stream)
+    return result.answer
+
+
+async def aquery(question: str, *, stream: bool | None = None, timeout: float | None = None) -> str:
+    """`query` on the async path (`aanswer_question`); `timeout` as there."""
+    stream = settings.stream_answers if stream is None else stream
+    run_id = new_run_id()
+    log_ctx = _query_log(run_id)
+
     log_ctx.info("Starting query", question=question)
-    t0 = time.perf_counter()
-    with status("Running GraphRAG search…"):
-        response = rag.search(query_text=question, retriever_config={"top_k": 25})
-    log_ctx.info("Search completed", latency_s=f"{time.perf_counter() - t0:0.2f}")
-    # response = rag.search(query_text=question)
+    try:
+        if stream:
+            with stream_qa_block(question=question, title="GRAPH_RAG") as write:
+                result = await aanswer_question(question, run_id=run_id, on_token=write, timeout=timeout)
+        else:
+            with status("Running GraphRAG search…"):
+                result = await aanswer_question(question, run_id=run_id, timeout=timeout)
+    except asyncio.TimeoutError:
+        log_ctx.error("Query timed out after %0.1fs", settings.query_timeout_s if timeout is None else timeout)
+        raise
+    _record_answer(result, log_ctx, stream=stream)
+    return result.answer
+
 
-    print_qa_block(question=question, answer=response.answer, title="GRAPH_RAG")
+async def aclose() -> None:
+    """Close what `query` / `aquery` created; the async clients need the running loop."""
+    if llm.created:
+        await llm.async_client.close()
+    if openai_embeddings.created:
+        # Both OpenAI clients; the `close()` below is then a no-op for this one.
+        await openai_embeddings.get().aclose()
+    await async_driver.aclose()
+    for resource in (driver, embeddings, openai_embeddings, llm):
+        resource.close()
 
-    result = write_run_result(question=question, answer=response.answer, source="graph_rag")
-    log_ctx.info("Saved run result", path=result.path)
-    return response.answer
 
 async def main() -> None:
     try:
         parser = argparse.ArgumentParser(description="Query the using the knowledge graph")
         parser.add_argument("--question", required=True, help="User question")
+        parser.add_argument(
+            "--stream",
+            action=argparse.BooleanOptionalAction,
+            default=settings.stream_answers,
+            help="Render the answer as it is generated (default: STREAM_ANSWERS)",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=settings.query_timeout_s,
+            help="Seconds allowed for the question, 0 for no limit (default: QUERY_TIMEOUT_S)",
+        )
         args = parser.parse_args()
 
         ensure_openai_key()
-        query(args.question)
+        await aquery(args.question, stream=args.stream, timeout=args.timeout)
         wait_for_enter()
     finally:
-        driver.close()
-        embeddings.client.close()
-        llm.client.close()
+        await aclose()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+"""In-process caches for the GraphRAG query path.
+
+Two levels, both TTL + LRU bounded:
+
+- question text -> query embedding (in front of the on-disk `embedding_cache`)
+- (embedding hash, index name, top_k, retrieval query hash[, question hash]) -> retrieved hits
+
+Everything is dropped as soon as the build manifest (`manifest.MANIFEST_PATH`)
+changes, i.e. after any full, incremental or cleanup run, so answers never come
+from a graph that no longer exists.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Generic, Hashable, Optional, Sequence, TypeVar
+
+from config import settings
+from logger_factory import get_logger
+from manifest import MANIFEST_PATH
+
+log = get_logger("graph_rag.query_cache")
+
+V = TypeVar("V")
+
+
+@dataclass(frozen=True)
+class CacheCounters:
+    hits: int
+    misses: int
+    size: int
+
+
+class TTLCache(Generic[V]):
+    """Thread-safe LRU map whose entries expire `ttl_s` seconds after insertion."""
+
+    def __init__(self, *, max_entries: int, ttl_s: float):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self._data: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (self.ttl_s > 0 and now - entry[0] > self.ttl_s):
+                if entry is not None:
+                    del self._data[key]
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: V) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    @property
+    def counters(self) -> CacheCounters:
+        with self._lock:
+            return CacheCounters(hits=self._hits, misses=self._misses, size=len(self._data))
+
+
+def vector_hash(vector: Sequence[float]) -> str:
+    return hashlib.sha256(array("d", vector).tobytes()).hexdigest()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _manifest_token(path: str) -> Optional[tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class QueryCache:
+    """Question -> embedding and retrieval-key -> items caches, tied to the build manifest."""
+
+    def __init__(self, *, max_entries: int, ttl_s: float, manifest_path: str = MANIFEST_PATH):
+        self.embeddings: TTLCache[list[float]] = TTLCache(max_entries=max_entries, ttl_s=ttl_s)
+        self.retrievals: TTLCache[Any] = TTLCache(max_entries=max_entries, ttl_s=ttl_s)
+        self.manifest_path = manifest_path
+        self._token = _manifest_token(manifest_path)
+        self._lock = threading.Lock()
+
+    def check_manifest(self) -> None:
+        """Drop everything if the graph was rebuilt since the cache was filled."""
+        token = _manifest_token(self.manifest_path)
+        with self._lock:
+            if token == self._token:
+                return
+            self._token = token
+        self.embeddings.clear()
+        self.retrievals.clear()
+        log.info("Build manifest changed; query cache cleared")
+
+    @staticmethod
+    def retrieval_key(
+        query_vector: Sequence[float],
+        *,
+        index_name: str,
+        top_k: int,
+        retrieval_query: str,
+        query_text: Optional[str] = None,
+    ) -> tuple:
+        """`query_text` is part of the key when retrieval also searches the text (hybrid mode)."""
+        return (
+            vector_hash(query_vector),
+            index_name,
+            int(top_k),
+            text_hash(retrieval_query),
+            text_hash(query_text) if query_text is not None else None,
+        )
+
+
+def default_query_cache() -> Optional[QueryCache]:
+    """The cache configured in settings, or None when QUERY_CACHE is disabled."""
+    if not settings.query_cache_enabled:
+        return None
+    return QueryCache(max_entries=settings.query_cache_max_entries, ttl_s=settings.query_cache_ttl_s)
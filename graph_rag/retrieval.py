@@ -0,0 +1,252 @@
+"""Two-phase GraphRAG retrieval: vector index lookup, then graph expansion.
+
+`VectorCypherRetriever` runs both in one Cypher statement, so their costs can't
+be told apart. Here the vector lookup returns only element ids and scores, and
+the expansion query (the same `RETRIEVAL_QUERY` fragment, starting with
+`WITH node, score`) runs over those hits in a second round trip.
+
+In hybrid mode a full-text lookup over `Chunk.text` runs next to the vector
+lookup, and the two rankings are merged with reciprocal rank fusion
+(`fuse_rankings`) before the expansion.
+
+`avector_lookup`, `afulltext_lookup` and `aexpand_hits` run the same statements
+on a `neo4j.AsyncDriver`.
+"""
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, Any, Sequence
+
+if TYPE_CHECKING:
+    import neo4j
+
+# `neo4j.RoutingControl.READ` is the str "r"; spelled out so importing this
+# module doesn't import the driver package.
+READ = "r"
+
+VECTOR_LOOKUP_QUERY = """
+CALL db.index.vector.queryNodes($index_name, $top_k, $query_vector)
+YIELD node, score
+RETURN elementId(node) AS id, score
+"""
+
+# Neo4j's int8-quantized index ranks approximately; re-score a wider candidate set
+# with the stored full-precision vectors (same (1 + cos) / 2 scale as the index).
+VECTOR_LOOKUP_RESCORE_QUERY = """
+CALL db.index.vector.queryNodes($index_name, $candidates, $query_vector)
+YIELD node
+WITH node, vector.similarity.cosine(node.embedding, $query_vector) AS score
+ORDER BY score DESC
+LIMIT $top_k
+RETURN elementId(node) AS id, score
+"""
+
+FULLTEXT_LOOKUP_QUERY = """
+CALL db.index.fulltext.queryNodes($index_name, $query_text, {limit: $top_k})
+YIELD node, score
+RETURN elementId(node) AS id, score
+"""
+
+# Lucene query syntax characters; escaped so a question is searched as plain terms.
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/]|&&|\|\|)')
+_LUCENE_OPERATORS = {"AND", "OR", "NOT", "TO"}
+
+_EXPAND_PREFIX = """
+UNWIND $hits AS hit
+MATCH (node) WHERE elementId(node) = hit.id
+WITH node, hit.score AS score
+"""
+
+# Neo4j error codes for a statement it refuses to compile (as opposed to failing while running it).
+_REJECTED_STATEMENT_CODES = frozenset({
+    "Neo.ClientError.Statement.SyntaxError",
+    "Neo.ClientError.Statement.SemanticError",
+    "Neo.ClientError.Statement.TypeError",
+})
+
+
+def is_rejected_statement(exc: BaseException) -> bool:
+    """True if `exc` is Neo4j refusing to compile a statement (syntax, semantic or type error)."""
+    return getattr(exc, "code", None) in _REJECTED_STATEMENT_CODES
+
+
+def explain_expansion(driver: neo4j.Driver, *, retrieval_query: str, database: str) -> list[str]:
+    """Compile the `expand_hits` statement with EXPLAIN (reads nothing); the plan's operators, root first.
+
+    Raises the driver's error (`is_rejected_statement`) if Neo4j cannot compile it.
+    """
+    _, summary, _ = driver.execute_query(
+        "EXPLAIN " + _EXPAND_PREFIX + retrieval_query,
+        {"hits": []},
+        database_=database,
+        routing_=READ,
+    )
+    operators: list[str] = []
+    pending = [summary.plan] if summary.plan else []
+    while pending:
+        step = pending.pop(0)
+        operators.append(str(step.get("operatorType", "?")).split("@")[0])
+        pending.extend(step.get("children") or [])
+    return operators
+
+
+def _vector_statement(
+    index_name: str, query_vector: Sequence[float], top_k: int, rescore_factor: int
+) -> tuple[str, dict[str, Any]]:
+    params = {"index_name": index_name, "top_k": int(top_k), "query_vector": list(query_vector)}
+    if rescore_factor > 1:
+        params["candidates"] = int(top_k) * int(rescore_factor)
+        return VECTOR_LOOKUP_RESCORE_QUERY, params
+    return VECTOR_LOOKUP_QUERY, params
+
+
+def _scored_ids(records: Sequence[Any]) -> list[dict[str, Any]]:
+    return [{"id": r["id"], "score": float(r["score"])} for r in records]
+
+
+def vector_lookup(
+    driver: neo4j.Driver,
+    *,
+    index_name: str,
+    query_vector: Sequence[float],
+    top_k: int,
+    database: str,
+    rescore_factor: int = 1,
+) -> list[dict[str, Any]]:
+    """[{"id": elementId, "score": float}, ...] best first.
+
+    With `rescore_factor` > 1 the index returns `top_k * rescore_factor`
+    candidates, which are re-ranked by exact cosine similarity.
+    """
+    query, params = _vector_statement(index_name, query_vector, top_k, rescore_factor)
+    records, _, _ = driver.execute_query(
+        query,
+        params,
+        database_=database,
+        routing_=READ,
+    )
+    return _scored_ids(records)
+
+
+async def avector_lookup(
+    driver: neo4j.AsyncDriver,
+    *,
+    index_name: str,
+    query_vector: Sequence[float],
+    top_k: int,
+    database: str,
+    rescore_factor: int = 1,
+) -> list[dict[str, Any]]:
+    """`vector_lookup` on an async driver."""
+    query, params = _vector_statement(index_name, query_vector, top_k, rescore_factor)
+    records, _, _ = await driver.execute_query(query, params, database_=database, routing_=READ)
+    return _scored_ids(records)
+
+
+def lucene_query(text: str) -> str:
+    """`text` as a plain-terms Lucene query (OR of its terms, operators neutralised)."""
+    words = []
+    for word in _LUCENE_SPECIAL.sub(r"\\\1", text).split():
+        words.append(word.lower() if word in _LUCENE_OPERATORS else word)
+    return " ".join(words)
+
+
+def fulltext_lookup(
+    driver: neo4j.Driver,
+    *,
+    index_name: str,
+    query_text: str,
+    top_k: int,
+    database: str,
+) -> list[dict[str, Any]]:
+    """[{"id": elementId, "score": float}, ...] best first (Lucene scores)."""
+    text = lucene_query(query_text)
+    if not text:
+        return []
+    records, _, _ = driver.execute_query(
+        FULLTEXT_LOOKUP_QUERY,
+        {"index_name": index_name, "query_text": text, "top_k": int(top_k)},
+        database_=database,
+        routing_=READ,
+    )
+    return _scored_ids(records)
+
+
+async def afulltext_lookup(
+    driver: neo4j.AsyncDriver,
+    *,
+    index_name: str,
+    query_text: str,
+    top_k: int,
+    database: str,
+) -> list[dict[str, Any]]:
+    """`fulltext_lookup` on an async driver."""
+    text = lucene_query(query_text)
+    if not text:
+        return []
+    records, _, _ = await driver.execute_query(
+        FULLTEXT_LOOKUP_QUERY,
+        {"index_name": index_name, "query_text": text, "top_k": int(top_k)},
+        database_=database,
+        routing_=READ,
+    )
+    return _scored_ids(records)
+
+
+def fuse_rankings(rankings: Sequence[list[dict[str, Any]]], *, top_k: int, k: int = 60) -> list[dict[str, Any]]:
+    """Reciprocal rank fusion: score(d) = sum over rankings of 1 / (k + rank(d)).
+
+    Only ranks matter, so cosine similarities and Lucene scores can be combined
+    without calibrating one against the other.
+    """
+    fused: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            fused[hit["id"]] = fused.get(hit["id"], 0.0) + 1.0 / (k + rank)
+    best = sorted(fused.items(), key=lambda item: item[1], reverse=True)[: int(top_k)]
+    return [{"id": node_id, "score": score} for node_id, score in best]
+
+
+def expand_hits(
+    driver: neo4j.Driver,
+    hits: list[dict[str, Any]],
+    *,
+    retrieval_query: str,
+    database: str,
+    params: dict[str, Any] | None = None,
+) -> list[neo4j.Record]:
+    """Run `retrieval_query` over `hits`; records come back best score first."""
+    if not hits:
+        return []
+    records, _, _ = driver.execute_query(
+        _EXPAND_PREFIX + retrieval_query,
+        {**(params or {}), "hits": hits},
+        database_=database,
+        routing_=READ,
+    )
+    return _best_first(records)
+
+
+async def aexpand_hits(
+    driver: neo4j.AsyncDriver,
+    hits: list[dict[str, Any]],
+    *,
+    retrieval_query: str,
+    database: str,
+    params: dict[str, Any] | None = None,
+) -> list[neo4j.Record]:
+    """`expand_hits` on an async driver."""
+    if not hits:
+        return []
+    records, _, _ = await driver.execute_query(
+        _EXPAND_PREFIX + retrieval_query,
+        {**(params or {}), "hits": hits},
+        database_=database,
+        routing_=READ,
+    )
+    return _best_first(records)
+
+
+def _best_first(records: Sequence[Any]) -> list[Any]:
+    # Aggregations in the expansion query don't preserve the UNWIND order.
+    return sorted(records, key=lambda r: r.get("score") or 0.0, reverse=True)
@@ -1,7 +1,13 @@
-from neo4j_graphrag.experimental.pipeline.types.schema import (
-    EntityInputType,
-    RelationInputType,
-)
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # Annotations only; the package import is heavy and not needed to build the lists.
+    from neo4j_graphrag.experimental.pipeline.types.schema import (
+        EntityInputType,
+        RelationInputType,
+    )
 
 NODE_TYPES: list[EntityInputType] = [
     {
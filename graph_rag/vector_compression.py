@@ -0,0 +1,147 @@
+"""Smaller Chunk vectors: Matryoshka truncation and int8 / binary quantization.
+
+`text-embedding-3-*` vectors are trained so that a prefix of the dimensions is
+itself a usable embedding. Asking the API for `dimensions=N` (EMBEDDING_DIMENSIONS
+below the model's native size) returns that prefix, re-normalised, so Neo4j
+stores, indexes and ships N floats per chunk instead of 3072.
+
+On top of that, VECTOR_QUANTIZATION compresses what is searched:
+
+- `int8`: Neo4j's own `vector.quantization.enabled` index option. Neo4j index
+  only: numpy has no fast int8 dot product, so scanning int8 codes in the local
+  index (`local_index.py`) was slower than scanning the float32 matrix, and the
+  float32 matrix is needed for re-scoring anyway. The local index searches
+  float32 instead (`local_quantization`).
+- `binary`: one bit per dimension (sign), compared by Hamming distance. Local
+  index only; Neo4j falls back to int8.
+
+Quantized scores only pick candidates: the best `top_k * VECTOR_RESCORE_FACTOR`
+are re-scored against the full-precision vectors, which is where most of the
+recall lost to quantization comes back.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+from neo4j_graphrag.embeddings import OpenAIEmbeddings
+from neo4j_graphrag.exceptions import EmbeddingsGenerationError
+
+from config import settings
+
+# Output size of each model without a `dimensions` request parameter.
+NATIVE_DIMENSIONS = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+    "text-embedding-ada-002": 1536,
+}
+# Models that accept `dimensions` (Matryoshka-trained).
+TRUNCATABLE_MODELS = {"text-embedding-3-large", "text-embedding-3-small"}
+QUANTIZATIONS = ("none", "int8", "binary")
+# What the local index can search; see the module docstring for int8.
+LOCAL_QUANTIZATIONS = ("none", "binary")
+
+
+def quantization() -> str:
+    kind = settings.vector_quantization.strip().lower()
+    if kind not in QUANTIZATIONS:
+        raise ValueError(f"VECTOR_QUANTIZATION must be one of {', '.join(QUANTIZATIONS)}, got {kind!r}")
+    return kind
+
+
+def local_quantization(kind: str) -> str:
+    """The local index's representation for VECTOR_QUANTIZATION `kind` (int8 is Neo4j-only)."""
+    return kind if kind in LOCAL_QUANTIZATIONS else "none"
+
+
+def embedding_request_params(model: str, dimensions: int) -> dict[str, Any]:
+    """Extra `embeddings.create` arguments for storing `dimensions`-dim vectors of `model`."""
+    native = NATIVE_DIMENSIONS.get(model)
+    if native is None or dimensions == native:
+        return {}
+    if model not in TRUNCATABLE_MODELS or dimensions > native:
+        raise ValueError(f"{model} produces {native}-dim vectors and cannot be truncated to {dimensions}")
+    return {"dimensions": int(dimensions)}
+
+
+class TruncatedOpenAIEmbeddings(OpenAIEmbeddings):
+    """`OpenAIEmbeddings` that requests EMBEDDING_DIMENSIONS-dim vectors.
+
+    `aembed_query` does the same through an `openai.AsyncOpenAI` (`async_client`),
+    created on first use. `close()` closes the blocking client; once the async
+    one has been used, close both with `await embedder.aclose()` instead.
+    """
+
+    def __init__(self, model: str = "text-embedding-3-large", *, dimensions: int | None = None, **kwargs: Any):
+        super().__init__(model=model, **kwargs)
+        self._client_kwargs = kwargs
+        self._async_client: Any = None
+        self.dimensions = int(dimensions or settings.embedding_dimensions)
+        self.request_params = embedding_request_params(model, self.dimensions)
+
+    @property
+    def async_client(self) -> Any:
+        if self._async_client is None:
+            self._async_client = self.openai.AsyncOpenAI(**self._client_kwargs)
+        return self._async_client
+
+    def close(self) -> None:
+        self.client.close()
+
+    async def aclose(self) -> None:
+        async_client, self._async_client = self._async_client, None
+        if async_client is not None:
+            await async_client.close()
+        self.close()
+
+    def embed_query(self, text: str, **kwargs: Any) -> list[float]:
+        return super().embed_query(text, **{**self.request_params, **kwargs})
+
+    async def aembed_query(self, text: str, **kwargs: Any) -> list[float]:
+        try:
+            response = await self.async_client.embeddings.create(
+                input=text, model=self.model, **{**self.request_params, **kwargs}
+            )
+        except Exception as e:
+            raise EmbeddingsGenerationError(f"Failed to generate embedding with OpenAI: {e}") from e
+        return response.data[0].embedding
+
+
+def make_embedder(**kwargs: Any) -> TruncatedOpenAIEmbeddings:
+    """The OpenAI embedder for Chunk and question vectors, per EMBEDDING_MODEL / EMBEDDING_DIMENSIONS."""
+    return TruncatedOpenAIEmbeddings(model=settings.embedding_model, dimensions=settings.embedding_dimensions, **kwargs)
+
+
+def normalise(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def truncate(matrix: np.ndarray, dimensions: int) -> np.ndarray:
+    """Matryoshka truncation: keep the first `dimensions` and re-normalise."""
+    return normalise(np.asarray(matrix, dtype=np.float32)[..., :dimensions])
+
+
+def quantize_binary(matrix: np.ndarray) -> np.ndarray:
+    """Sign bits, packed 8 per byte."""
+    return np.packbits(np.asarray(matrix) > 0, axis=-1)
+
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def binary_scores(packed: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Negated Hamming distance of the packed rows to the query's sign bits (higher is closer)."""
+    q = quantize_binary(np.asarray(query)[None, :])[0]
+    diff = np.bitwise_xor(packed, q)
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return -np.bitwise_count(diff).sum(axis=-1, dtype=np.int32)
+    return -_POPCOUNT[diff].sum(axis=-1, dtype=np.int32)
+
+
+def quantized_size(count: int, dimensions: int, kind: str) -> int:
+    """Bytes needed for the local index's searched representation of `count` vectors."""
+    if kind == "binary":
+        return count * ((dimensions + 7) // 8)
+    return count * dimensions * 4
@@ -1,11 +1,11 @@
 import argparse
 import asyncio
 import os
+import statistics
 import sys
+import time
 from typing import Any, Optional
 
-from neo4j import GraphDatabase
-from neo4j_graphrag.embeddings import OpenAIEmbeddings
 from neo4j_graphrag.retrievers import VectorRetriever
 
 if __name__ == "__main__":
@@ -13,45 +13,59 @@ if __name__ == "__main__":
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from config import ensure_openai_key, settings
+from embedding_cache import cached_embedder, close_cache
+from local_index import META_FILE, LocalVectorIndex
 from logger_factory import bind, get_logger, new_run_id
+from neo4j_connection import create_driver, read
 from ui import status
+from vector_compression import make_embedder
 
 log = get_logger("graph_rag.verify_vector_index")
 
 
-def _get_index_info(session, index_name: str) -> Optional[dict[str, Any]]:
-    rec = session.run(
-        """
-        SHOW INDEXES YIELD name, type, entityType, labelsOrTypes, properties, state, populationPercent, options
-        WHERE name = $name
-        RETURN name, type, entityType, labelsOrTypes, properties, state, populationPercent, options
-        """,
-        name=index_name,
-    ).single()
-    return dict(rec) if rec else None
+def _single(records: list) -> Optional[dict[str, Any]]:
+    return dict(records[0]) if records else None
 
 
-def _get_embedding_stats(session) -> dict[str, int]:
-    rec = session.run(
-        """
-        MATCH (n:Chunk)
-        RETURN
-          count(n) AS chunks,
-          count(n.embedding) AS with_embedding
-        """
-    ).single()
-    stats = dict(rec) if rec else {"chunks": 0, "with_embedding": 0}
+def _get_index_info(driver, index_name: str) -> Optional[dict[str, Any]]:
+    return _single(
+        read(
+            driver,
+            """
+            SHOW INDEXES YIELD name, type, entityType, labelsOrTypes, properties, state, populationPercent, options
+            WHERE name = $name
+            RETURN name, type, entityType, labelsOrTypes, properties, state, populationPercent, options
+            """,
+            {"name": index_name},
+        )
+    )
+
+
+def _get_embedding_stats(driver) -> dict[str, int]:
+    rec = _single(
+        read(
+            driver,
+            """
+            MATCH (n:Chunk)
+            RETURN
+              count(n) AS chunks,
+              count(n.embedding) AS with_embedding
+            """,
+        )
+    )
+    stats = rec or {"chunks": 0, "with_embedding": 0}
 
     # Try to compute dimension distribution if embeddings exist
     if stats.get("with_embedding", 0) > 0:
-        dim_rec = session.run(
+        dim_rec = read(
+            driver,
             """
             MATCH (n:Chunk)
             WHERE n.embedding IS NOT NULL
             RETURN size(n.embedding) AS dim, count(*) AS c
             ORDER BY c DESC
             LIMIT 5
-            """
+            """,
         )
         # store as dim_<N>: count
         for r in dim_rec:
@@ -63,10 +77,11 @@ def _get_embedding_stats(session) -> dict[str, int]:
     return stats
 
 
-def _vector_query_nodes(session, index_name: str, query_vector: list[float], top_k: int) -> list[dict[str, Any]]:
+def _vector_query_nodes(driver, index_name: str, query_vector: list[float], top_k: int) -> list[dict[str, Any]]:
     # Neo4j vector index query gives explicit `score` and `node`.
     # This is the most reliable way to confirm the index is functioning.
-    rows = session.run(
+    rows = read(
+        driver,
         """
         CALL db.index.vector.queryNodes($index_name, $k, $vector)
         YIELD node, score
@@ -76,23 +91,80 @@ def _vector_query_nodes(session, index_name: str, query_vector: list[float], top
                node.index AS chunk_index
         ORDER BY score DESC
         """,
-        index_name=index_name,
-        k=top_k,
-        vector=query_vector,
+        {"index_name": index_name, "k": top_k, "vector": query_vector},
     )
     return [dict(r) for r in rows]
 
 
-def _get_any_embedding(session) -> Optional[dict[str, Any]]:
-    rec = session.run(
+def _get_any_embedding(driver) -> Optional[dict[str, Any]]:
+    return _single(
+        read(
+            driver,
+            """
+            MATCH (n:Chunk)
+            WHERE n.embedding IS NOT NULL
+            RETURN elementId(n) AS id, n.embedding AS embedding, n.text AS text
+            LIMIT 1
+            """,
+        )
+    )
+
+
+def _sample_embeddings(driver, n: int) -> list[list[float]]:
+    rows = read(
+        driver,
         """
         MATCH (n:Chunk)
         WHERE n.embedding IS NOT NULL
-        RETURN elementId(n) AS id, n.embedding AS embedding, n.text AS text
-        LIMIT 1
-        """
-    ).single()
-    return dict(rec) if rec else None
+        WITH n, rand() AS r
+        ORDER BY r
+        LIMIT $n
+        RETURN n.embedding AS embedding
+        """,
+        {"n": n},
+    )
+    return [list(r["embedding"]) for r in rows]
+
+
+def _recall(found: list[dict[str, Any]], truth: list[dict[str, Any]]) -> float:
+    expected = {h["id"] for h in truth}
+    if not expected:
+        return 1.0
+    return len(expected & {h["id"] for h in found}) / len(expected)
+
+
+def compare_local_index(driver, query_vectors: list[list[float]], *, index_name: str, top_k: int) -> None:
+    """Recall@k and latency of the Neo4j index and the local index, against exact local search."""
+    local = LocalVectorIndex(settings.local_index_path, hnsw_ef=settings.local_index_hnsw_ef)
+    print(f"\nLocal index: {settings.local_index_path} ({len(local)} chunks, {local.dimensions} dims, {local.kind} search)")
+    if local.is_stale():
+        print("WARNING: the local index predates the last graph build; re-export it (python graph_rag/local_index.py)")
+
+    neo4j_ms: list[float] = []
+    local_ms: list[float] = []
+    neo4j_recall: list[float] = []
+    local_recall: list[float] = []
+    for vector in query_vectors:
+        truth = local.search(vector, top_k, exact=True)
+
+        t0 = time.perf_counter()
+        remote = _vector_query_nodes(driver, index_name, vector, top_k)
+        neo4j_ms.append((time.perf_counter() - t0) * 1000.0)
+
+        t0 = time.perf_counter()
+        found = local.search(vector, top_k)
+        local_ms.append((time.perf_counter() - t0) * 1000.0)
+
+        neo4j_recall.append(_recall(remote, truth))
+        local_recall.append(_recall(found, truth))
+
+    def p95(values: list[float]) -> float:
+        return sorted(values)[max(0, int(round(0.95 * len(values))) - 1)]
+
+    print(f"Compared on {len(query_vectors)} query vector(s), top_k={top_k} (truth = exact search over the export):")
+    print(f"{'backend':<14}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, recall, ms in (("neo4j", neo4j_recall, neo4j_ms), (f"local:{local.kind}", local_recall, local_ms)):
+        print(f"{name:<14}{statistics.fmean(recall):>10.3f}{statistics.median(ms):>10.2f}{p95(ms):>10.2f}")
 
 
 async def main() -> None:
@@ -108,13 +180,22 @@ async def main() -> None:
         action="store_true",
         help="Do not call OpenAI; use an existing stored embedding as the query vector",
     )
+    parser.add_argument(
+        "--compare-local",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Also compare recall@k and latency against the local vector index, using N stored embeddings as queries",
+    )
     args = parser.parse_args()
 
-    driver = GraphDatabase.driver(settings.uri, auth=(settings.user, settings.password))
+    driver = create_driver()
+    openai_embedder = None
     embedder = None
     if not args.offline:
         ensure_openai_key()
-        embedder = OpenAIEmbeddings(model=settings.embedding_model)
+        openai_embedder = make_embedder()
+        embedder = cached_embedder(openai_embedder)
     retriever = VectorRetriever(driver, settings.vector_index, embedder, neo4j_database=settings.database)
 
     run_id = new_run_id()
@@ -131,93 +212,100 @@ async def main() -> None:
     )
 
     try:
-        with driver.session(database=settings.database) as session:
-            with status("Checking vector index metadata…"):
-                idx = _get_index_info(session, settings.vector_index)
+        with status("Checking vector index metadata…"):
+            idx = _get_index_info(driver, settings.vector_index)
 
-            if not idx:
-                log_ctx.error("Vector index not found in database", index=settings.vector_index)
-                print(
-                    f"Vector index '{settings.vector_index}' was not found in database '{settings.database}'.\n"
-                    f"Run: python graph_rag/create_vector_index.py"
-                )
-                return
-
-            log_ctx.info(
-                "Index found",
-                type=str(idx.get("type")),
-                state=str(idx.get("state")),
-                populationPercent=idx.get("populationPercent"),
-                labelsOrTypes=idx.get("labelsOrTypes"),
-                properties=idx.get("properties"),
+        if not idx:
+            log_ctx.error("Vector index not found in database", index=settings.vector_index)
+            print(
+                f"Vector index '{settings.vector_index}' was not found in database '{settings.database}'.\n"
+                f"Run: python graph_rag/create_vector_index.py"
             )
+            return
 
-            print("Index status:")
-            print(f"- name: {idx.get('name')}")
-            print(f"- type: {idx.get('type')}")
-            print(f"- state: {idx.get('state')}")
-            print(f"- populationPercent: {idx.get('populationPercent')}")
-
-            options = idx.get("options") or {}
-            index_config = options.get("indexConfig") or {}
-            idx_dims = index_config.get("vector.dimensions")
-            idx_sim = index_config.get("vector.similarity_function")
-
-            if idx_dims is not None and int(idx_dims) != int(settings.embedding_dimensions):
-                log_ctx.warning(
-                    "Index dimensions mismatch",
-                    index_dims=idx_dims,
-                    settings_dims=settings.embedding_dimensions,
-                )
-                print(
-                    f"WARNING: index dimensions = {idx_dims}, but settings.embedding_dimensions = {settings.embedding_dimensions}.\n"
-                    f"This will break retrieval/upserts or degrade results. Recreate the index with matching dimensions."
-                )
+        log_ctx.info(
+            "Index found",
+            type=str(idx.get("type")),
+            state=str(idx.get("state")),
+            populationPercent=idx.get("populationPercent"),
+            labelsOrTypes=idx.get("labelsOrTypes"),
+            properties=idx.get("properties"),
+        )
 
-            with status("Checking Chunk embedding coverage…"):
-                stats = _get_embedding_stats(session)
-            log_ctx.info("Chunk stats", **stats)
-
-            chunks = int(stats.get("chunks", 0) or 0)
-            with_embedding = int(stats.get("with_embedding", 0) or 0)
-            pct = (100.0 * with_embedding / chunks) if chunks else 0.0
-            print("Chunk embedding coverage:")
-            print(f"- chunks: {chunks}")
-            print(f"- with_embedding: {with_embedding} ({pct:0.1f}%)")
-
-            # Direct Cypher vector query (shows real score + elementId)
-            with status("Running direct Cypher vector query…"):
-                qvec: Optional[list[float]] = None
-                if embedder is not None:
-                    try:
-                        qvec = embedder.embed_query(args.question)
-                    except Exception as e:
-                        log_ctx.warning("OpenAI embedding call failed; falling back to stored embedding", error=str(e))
-
-                if qvec is None:
-                    fallback = _get_any_embedding(session)
-                    if not fallback or not fallback.get("embedding"):
-                        raise RuntimeError(
-                            "Cannot build a query vector: OpenAI is unavailable and no stored Chunk.embedding was found."
-                        )
-                    qvec = list(fallback["embedding"])
-                    fb_id = fallback.get("id")
-                    print(
-                        "NOTE: OpenAI embedding generation failed/unavailable; using an existing Chunk.embedding as the query vector.\n"
-                        f"- chunk_id: {fb_id}"
-                    )
+        print("Index status:")
+        print(f"- name: {idx.get('name')}")
+        print(f"- type: {idx.get('type')}")
+        print(f"- state: {idx.get('state')}")
+        print(f"- populationPercent: {idx.get('populationPercent')}")
+
+        options = idx.get("options") or {}
+        index_config = options.get("indexConfig") or {}
+        idx_dims = index_config.get("vector.dimensions")
+        idx_sim = index_config.get("vector.similarity_function")
+
+        if idx_dims is not None and int(idx_dims) != int(settings.embedding_dimensions):
+            log_ctx.warning(
+                "Index dimensions mismatch",
+                index_dims=idx_dims,
+                settings_dims=settings.embedding_dimensions,
+            )
+            print(
+                f"WARNING: index dimensions = {idx_dims}, but settings.embedding_dimensions = {settings.embedding_dimensions}.\n"
+                f"This will break retrieval/upserts or degrade results. Recreate the index with matching dimensions."
+            )
 
-                rows = _vector_query_nodes(session, settings.vector_index, qvec, args.top_k)
+        with status("Checking Chunk embedding coverage…"):
+            stats = _get_embedding_stats(driver)
+        log_ctx.info("Chunk stats", **stats)
 
-            if not rows:
-                print("Direct Cypher vector query returned 0 results.")
+        chunks = int(stats.get("chunks", 0) or 0)
+        with_embedding = int(stats.get("with_embedding", 0) or 0)
+        pct = (100.0 * with_embedding / chunks) if chunks else 0.0
+        print("Chunk embedding coverage:")
+        print(f"- chunks: {chunks}")
+        print(f"- with_embedding: {with_embedding} ({pct:0.1f}%)")
+
+        # Direct Cypher vector query (shows real score + elementId)
+        with status("Running direct Cypher vector query…"):
+            qvec: Optional[list[float]] = None
+            if embedder is not None:
+                try:
+                    qvec = embedder.embed_query(args.question)
+                except Exception as e:
+                    log_ctx.warning("OpenAI embedding call failed; falling back to stored embedding", error=str(e))
+
+            if qvec is None:
+                fallback = _get_any_embedding(driver)
+                if not fallback or not fallback.get("embedding"):
+                    raise RuntimeError(
+                        "Cannot build a query vector: OpenAI is unavailable and no stored Chunk.embedding was found."
+                    )
+                qvec = list(fallback["embedding"])
+                fb_id = fallback.get("id")
+                print(
+                    "NOTE: OpenAI embedding generation failed/unavailable; using an existing Chunk.embedding as the query vector.\n"
+                    f"- chunk_id: {fb_id}"
+                )
+
+            rows = _vector_query_nodes(driver, settings.vector_index, qvec, args.top_k)
+
+        if not rows:
+            print("Direct Cypher vector query returned 0 results.")
+        else:
+            print("\nDirect Cypher vector query results:")
+            for i, r in enumerate(rows, start=1):
+                snippet = (r.get("text") or "").replace("\n", " ").strip()
+                if len(snippet) > 180:
+                    snippet = snippet[:177] + "..."
+                print(f"{i}. score={r.get('score'):0.4f} id={r.get('id')} chunk_index={r.get('chunk_index')} text={snippet}")
+
+        if args.compare_local:
+            if not os.path.exists(os.path.join(settings.local_index_path, META_FILE)):
+                print(f"\nNo local vector index at {settings.local_index_path}. Run: python graph_rag/local_index.py")
             else:
-                print("\nDirect Cypher vector query results:")
-                for i, r in enumerate(rows, start=1):
-                    snippet = (r.get("text") or "").replace("\n", " ").strip()
-                    if len(snippet) > 180:
-                        snippet = snippet[:177] + "..."
-                    print(f"{i}. score={r.get('score'):0.4f} id={r.get('id')} chunk_index={r.get('chunk_index')} text={snippet}")
+                with status("Comparing Neo4j and local vector indexes…"):
+                    query_vectors = [qvec] + _sample_embeddings(driver, args.compare_local)
+                compare_local_index(driver, query_vectors, index_name=settings.vector_index, top_k=args.top_k)
 
         with status("Running a sample vector retrieval…"):
             # Prefer query_vector to avoid OpenAI dependency when offline/fallback.
@@ -226,17 +314,15 @@ async def main() -> None:
                     result = retriever.search(query_text=args.question, top_k=args.top_k)
                 except Exception as e:
                     log_ctx.warning("Retriever text search failed; retrying with query_vector", error=str(e))
-                    with driver.session(database=settings.database) as session:
-                        fb = _get_any_embedding(session)
-                        if not fb or not fb.get("embedding"):
-                            raise
-                        result = retriever.search(query_vector=list(fb["embedding"]), top_k=args.top_k)
-            else:
-                with driver.session(database=settings.database) as session:
-                    fb = _get_any_embedding(session)
+                    fb = _get_any_embedding(driver)
                     if not fb or not fb.get("embedding"):
-                        raise RuntimeError("Offline mode requires at least one stored Chunk.embedding")
+                        raise
                     result = retriever.search(query_vector=list(fb["embedding"]), top_k=args.top_k)
+            else:
+                fb = _get_any_embedding(driver)
+                if not fb or not fb.get("embedding"):
+                    raise RuntimeError("Offline mode requires at least one stored Chunk.embedding")
+                result = retriever.search(query_vector=list(fb["embedding"]), top_k=args.top_k)
 
         items = getattr(result, "items", None)
         if not items:
@@ -272,8 +358,9 @@ async def main() -> None:
 
     finally:
         driver.close()
-        if embedder is not None:
-            embedder.client.close()
+        if openai_embedder is not None:
+            openai_embedder.close()
+            close_cache(embedder)
 
 
 if __name__ == "__main__":
@@ -1,18 +1,33 @@
+import atexit
+import copy
+import json
 import os
+import queue
+import re
 import sys
 import logging
+import logging.handlers
 
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Mapping, MutableMapping
+from typing import Any, Mapping, MutableMapping, Optional
 
 from color_formatter import ColorFormatter
 
+# Record attribute carrying the adapter's context; formatted only if a handler emits the record.
+CONTEXT_ATTR = "log_context"
+
 
 class ContextLoggerAdapter(logging.LoggerAdapter):
 	"""Logger adapter that appends context as key=value pairs.
 
 	This keeps logs readable in the terminal and preserves context when using
 	plain formatters or RichHandler.
+
+	`LoggerAdapter.log` only calls `process` for enabled levels, and `process`
+	only collects the context onto the record; filtering and formatting it is
+	left to the handlers' formatters (`ContextFormatter`, `JsonFormatter`), so a
+	record no handler emits costs no string formatting.
 	"""
 
 	def process(self, msg: str, kwargs: MutableMapping[str, Any]):
@@ -25,23 +40,23 @@ class ContextLoggerAdapter(logging.LoggerAdapter):
 		extra = kwargs.pop("extra", None)
 		if isinstance(extra, Mapping):
 			ctx.update(extra)
+			# An adapter wrapping another adapter: flatten the inner context.
+			nested = ctx.pop(CONTEXT_ATTR, None)
+			if isinstance(nested, Mapping):
+				ctx.update(nested)
 
-		reserved = {"exc_info", "stack_info", "stacklevel"}
 		for k in list(kwargs.keys()):
-			if k in reserved:
+			if k in _RESERVED_KWARGS:
 				continue
 			ctx[k] = kwargs.pop(k)
 
 		# Prevent stdlib logging from trying to interpret our context as record attrs.
-		kwargs["extra"] = {}
-
-		ctx = _filter_context(ctx)
-		if ctx:
-			suffix = " ".join(f"{k}={_format_ctx_value(k, ctx[k])}" for k in sorted(ctx.keys()))
-			msg = f"{msg} | {suffix}"
+		kwargs["extra"] = {CONTEXT_ATTR: ctx} if ctx else {}
 		return msg, kwargs
 
 
+_RESERVED_KWARGS = frozenset({"exc_info", "stack_info", "stacklevel"})
+
 _DEFAULT_CONTEXT_KEYS_MINIMAL = (
 	"run_id",
 	"source",
@@ -60,14 +75,6 @@ _DEFAULT_CONTEXT_KEYS_MINIMAL = (
 )
 
 
-def _context_mode() -> str:
-	# Options:
-	# - none: don't append any context
-	# - minimal: append a small allow-list (default)
-	# - all: append everything captured by the adapter
-	return os.getenv("LOG_CONTEXT", "minimal").strip().lower()
-
-
 def _parse_keys_env(var_name: str) -> set[str]:
 	raw = os.getenv(var_name, "")
 	if not raw.strip():
@@ -77,33 +84,56 @@ def _parse_keys_env(var_name: str) -> set[str]:
 	return {p for p in parts if p}
 
 
-def _filter_context(ctx: Mapping[str, Any]) -> dict[str, Any]:
-	mode = _context_mode()
-	if mode in {"0", "off", "false", "none"}:
-		return {}
+@dataclass(frozen=True)
+class LogConfig:
+	"""LOG_CONTEXT* settings, read from the environment once (see `reload_log_config`)."""
+
+	# - none: don't append any context
+	# - minimal: append a small allow-list (default)
+	# - all: append everything captured by the adapter
+	mode: str
+	allow: Optional[frozenset[str]]
+	exclude: frozenset[str]
+	value_maxlen: int
+
+	@classmethod
+	def from_env(cls) -> "LogConfig":
+		mode = os.getenv("LOG_CONTEXT", "minimal").strip().lower()
+		if mode in {"0", "off", "false", "none"}:
+			mode = "none"
+		allow = None
+		if mode not in {"all", "full", "none"}:
+			allow = frozenset(_parse_keys_env("LOG_CONTEXT_KEYS") or _DEFAULT_CONTEXT_KEYS_MINIMAL)
+		try:
+			max_len = int(os.getenv("LOG_CONTEXT_VALUE_MAXLEN", "120").strip())
+		except ValueError:
+			max_len = 120
+		return cls(mode=mode, allow=allow, exclude=frozenset(_parse_keys_env("LOG_CONTEXT_EXCLUDE_KEYS")), value_maxlen=max_len)
+
 
-	filtered = dict(ctx)
+_config: Optional[LogConfig] = None
 
-	if mode not in {"all", "full"}:
-		allow = _parse_keys_env("LOG_CONTEXT_KEYS") or set(_DEFAULT_CONTEXT_KEYS_MINIMAL)
-		filtered = {k: v for k, v in filtered.items() if k in allow}
 
-	exclude = _parse_keys_env("LOG_CONTEXT_EXCLUDE_KEYS")
-	for k in exclude:
-		filtered.pop(k, None)
+def log_config() -> LogConfig:
+	global _config
+	if _config is None:
+		_config = LogConfig.from_env()
+	return _config
 
-	return filtered
 
+def reload_log_config() -> LogConfig:
+	"""Re-read LOG_CONTEXT* after changing them at runtime."""
+	global _config
+	_config = LogConfig.from_env()
+	return _config
 
-def _format_ctx_value(key: str, value: Any) -> str:
-	# Keep log lines compact and readable.
-	max_len_str = os.getenv("LOG_CONTEXT_VALUE_MAXLEN", "120").strip()
-	try:
-		max_len = int(max_len_str)
-	except ValueError:
-		max_len = 120
 
-	text = str(value)
+_WHITESPACE = re.compile(r"\s")
+
+
+def _format_ctx_value(key: str, value: Any, max_len: int = 120) -> str:
+	# Keep log lines compact and readable.
+	text = value if isinstance(value, str) else str(value)
 	# For paths, show only the basename by default.
 	if key in {"path", "run_dir"} and ("/" in text or "\\" in text):
 		text = os.path.basename(text)
@@ -112,11 +142,69 @@ def _format_ctx_value(key: str, value: Any) -> str:
 		text = text[: max_len - 1] + "…"
 
 	# Quote values with spaces to keep key=value parsing readable.
-	if any(ch.isspace() for ch in text):
+	if _WHITESPACE.search(text):
 		return f'"{text}"'
 	return text
 
 
+def format_context(ctx: Optional[Mapping[str, Any]]) -> str:
+	"""The ` | k=v ...` suffix for `ctx` under the current LOG_CONTEXT settings ('' if none)."""
+	if not ctx:
+		return ""
+	cfg = log_config()
+	if cfg.mode == "none":
+		return ""
+	keys = sorted(k for k in ctx if (cfg.allow is None or k in cfg.allow) and k not in cfg.exclude)
+	if not keys:
+		return ""
+	return " | " + " ".join(f"{k}={_format_ctx_value(k, ctx[k], cfg.value_maxlen)}" for k in keys)
+
+
+class _ContextMixin:
+	def formatMessage(self, record: logging.LogRecord) -> str:
+		suffix = format_context(getattr(record, CONTEXT_ATTR, None))
+		if not suffix:
+			return super().formatMessage(record)
+		message = record.message
+		record.message = message + suffix
+		try:
+			return super().formatMessage(record)
+		finally:
+			record.message = message
+
+
+class ContextFormatter(_ContextMixin, logging.Formatter):
+	"""`logging.Formatter` that appends the record's adapter context to the message."""
+
+
+class ContextColorFormatter(_ContextMixin, ColorFormatter):
+	"""`ColorFormatter` that appends the record's adapter context to the message."""
+
+
+class JsonFormatter(logging.Formatter):
+	"""One JSON object per line: ts, level, logger, msg, the full context, and exc if any.
+
+	LOG_CONTEXT_EXCLUDE_KEYS applies; the terminal allow-list does not.
+	"""
+
+	def format(self, record: logging.LogRecord) -> str:
+		out: dict[str, Any] = {
+			"ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+			"level": record.levelname,
+			"logger": record.name,
+			"msg": record.getMessage(),
+		}
+		exclude = log_config().exclude
+		for k, v in (getattr(record, CONTEXT_ATTR, None) or {}).items():
+			if k not in exclude and k not in out:
+				out[k] = v
+		if record.exc_info:
+			out["exc"] = self.formatException(record.exc_info)
+		elif record.exc_text:
+			out["exc"] = record.exc_text
+		return json.dumps(out, default=str, ensure_ascii=False)
+
+
 def bind(logger: logging.Logger, **context: Any) -> ContextLoggerAdapter:
 	return ContextLoggerAdapter(logger, context)
 
@@ -126,28 +214,76 @@ def new_run_id() -> str:
 	return os.getenv("RUN_ID") or datetime.now(timezone.utc).astimezone().isoformat(timespec="seconds")
 
 
+class _BackgroundQueueHandler(logging.handlers.QueueHandler):
+	"""QueueHandler that leaves context formatting to the listener thread."""
+
+	def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+		# Only what can't safely cross threads is resolved here: args and the traceback.
+		record = copy.copy(record)
+		record.msg = record.getMessage()
+		record.args = None
+		if record.exc_info:
+			record.exc_text = logging.Formatter().formatException(record.exc_info)
+			record.exc_info = None
+		return record
+
+
+# LOG_FILE -> its queue handler; one listener thread per file, shared by all loggers.
+_file_handlers: dict[str, logging.Handler] = {}
+_listeners: list[logging.handlers.QueueListener] = []
+
+
+def _stop_listeners() -> None:
+	while _listeners:
+		_listeners.pop().stop()
+
+
+def _file_handler(log_file: str) -> logging.Handler:
+	handler = _file_handlers.get(log_file)
+	if handler is not None:
+		return handler
+	file_handler = logging.FileHandler(log_file, encoding="utf-8")
+	if os.getenv("LOG_FILE_FORMAT", "text").strip().lower() == "json":
+		file_handler.setFormatter(JsonFormatter())
+	else:
+		file_handler.setFormatter(
+			ContextFormatter(
+				"[%(asctime)s] %(levelname)s %(name)s: %(message)s",
+				"%Y-%m-%dT%H:%M:%S%z",
+			)
+		)
+	# File writes happen on a background thread, never on the logging one.
+	records: queue.SimpleQueue = queue.SimpleQueue()
+	listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+	listener.start()
+	if not _listeners:
+		atexit.register(_stop_listeners)
+	_listeners.append(listener)
+	handler = _BackgroundQueueHandler(records)
+	_file_handlers[log_file] = handler
+	return handler
+
+
 def _maybe_add_file_handler(logger: logging.Logger) -> None:
 	log_file = os.getenv("LOG_FILE")
 	if not log_file:
 		return
-	if any(getattr(h, "baseFilename", None) == log_file for h in logger.handlers):
+	handler = _file_handler(log_file)
+	if handler in logger.handlers:
 		return
-	file_handler = logging.FileHandler(log_file, encoding="utf-8")
-	file_handler.setLevel(logger.level)
-	file_handler.setFormatter(
-		logging.Formatter(
-			"[%(asctime)s] %(levelname)s %(name)s: %(message)s",
-			"%Y-%m-%dT%H:%M:%S%z",
-		)
-	)
-	logger.addHandler(file_handler)
+	handler.setLevel(logger.level)
+	logger.addHandler(handler)
 
 
 def _build_console_handler(*, use_color: bool) -> logging.Handler:
 	fmt = os.getenv("LOG_FORMAT", "rich").lower()
 	if fmt == "plain":
 		h = logging.StreamHandler(stream=sys.stdout)
-		h.setFormatter(ColorFormatter(use_color=use_color))
+		h.setFormatter(ContextColorFormatter(use_color=use_color))
+		return h
+	if fmt == "json":
+		h = logging.StreamHandler(stream=sys.stdout)
+		h.setFormatter(JsonFormatter())
 		return h
 
 	# Default: rich
@@ -160,12 +296,12 @@ def _build_console_handler(*, use_color: bool) -> logging.Handler:
 			show_level=True,
 			show_path=False,
 		)
-		h.setFormatter(logging.Formatter("%(message)s"))
+		h.setFormatter(ContextFormatter("%(message)s"))
 		return h
 	except Exception:
 		# Fall back to the existing color formatter.
 		h = logging.StreamHandler(stream=sys.stdout)
-		h.setFormatter(ColorFormatter(use_color=use_color))
+		h.setFormatter(ContextColorFormatter(use_color=use_color))
 		return h
 
 def get_logger(name: str) -> logging.Logger:
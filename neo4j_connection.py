@@ -0,0 +1,232 @@
+"""Neo4j drivers for every entry point: pool tuning, managed transactions and pool metrics.
+
+`create_driver()` / `create_async_driver()` build drivers from the NEO4J_*
+settings. They set the pool size, the connection acquisition and connect
+timeouts, the connection lifetime, the fetch size and the managed-transaction
+retry window, and they time every connection acquisition.
+
+`read` / `write` (and `aread` / `awrite`) run one statement in a managed
+transaction (`execute_read` / `execute_write`). The driver retries those on
+transient errors and lost connections for up to NEO4J_TX_RETRY_S. Reads can go
+to any cluster member.
+
+    driver = create_driver()
+    rows = read(driver, "MATCH (c:Chunk) RETURN count(c) AS c")
+    log_pool_metrics(log, driver)      # acquisitions, wait p50/p95/max, in use / idle
+
+`pool_metrics(driver)` is meant for sizing NEO4J_MAX_POOL_SIZE under concurrent
+query load. Waits that approach NEO4J_ACQUISITION_TIMEOUT_S, or in-use
+connections stuck at the pool size, mean the pool is too small. It reads the
+driver's pool internals; if a driver version changes those, the counters stay
+at zero and nothing else breaks.
+"""
+from __future__ import annotations
+
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional
+
+from config import settings
+
+if TYPE_CHECKING:
+    import neo4j
+
+# Acquisition waits kept for the percentiles.
+_WAIT_SAMPLES = 4096
+
+
+def driver_config(**overrides: Any) -> dict[str, Any]:
+    """Keyword arguments for `GraphDatabase.driver` / `AsyncGraphDatabase.driver` from NEO4J_* settings."""
+    config = {
+        "max_connection_pool_size": settings.neo4j_max_pool_size,
+        "connection_acquisition_timeout": settings.neo4j_acquisition_timeout_s,
+        "connection_timeout": settings.neo4j_connection_timeout_s,
+        "max_connection_lifetime": settings.neo4j_max_connection_lifetime_s,
+        "fetch_size": settings.neo4j_fetch_size,
+        "max_transaction_retry_time": settings.neo4j_tx_retry_s,
+    }
+    config.update(overrides)
+    return config
+
+
+@dataclass(frozen=True)
+class PoolMetrics:
+    max_size: int
+    in_use: int
+    idle: int
+    acquisitions: int
+    failed: int
+    wait_p50_ms: float
+    wait_p95_ms: float
+    wait_max_ms: float
+
+
+class _AcquireStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+        self.acquisitions = 0
+        self.failed = 0
+        self.wait_max_s = 0.0
+
+    def record(self, wait_s: float, *, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.acquisitions += 1
+                self._waits.append(wait_s)
+            else:
+                self.failed += 1
+            self.wait_max_s = max(self.wait_max_s, wait_s)
+
+    def waits(self) -> list[float]:
+        with self._lock:
+            return sorted(self._waits)
+
+
+# driver -> its acquisition stats; entries go away with the driver.
+_stats: "weakref.WeakKeyDictionary[Any, _AcquireStats]" = weakref.WeakKeyDictionary()
+
+
+def _instrument(driver: Any, *, is_async: bool) -> None:
+    pool = getattr(driver, "_pool", None)
+    acquire = getattr(pool, "acquire", None)
+    if acquire is None:
+        return
+    stats = _stats[driver] = _AcquireStats()
+
+    if is_async:
+
+        async def timed_acquire(*args: Any, **kwargs: Any) -> Any:
+            t0 = time.perf_counter()
+            try:
+                connection = await acquire(*args, **kwargs)
+            except BaseException:
+                stats.record(time.perf_counter() - t0, ok=False)
+                raise
+            stats.record(time.perf_counter() - t0, ok=True)
+            return connection
+
+    else:
+
+        def timed_acquire(*args: Any, **kwargs: Any) -> Any:
+            t0 = time.perf_counter()
+            try:
+                connection = acquire(*args, **kwargs)
+            except BaseException:
+                stats.record(time.perf_counter() - t0, ok=False)
+                raise
+            stats.record(time.perf_counter() - t0, ok=True)
+            return connection
+
+    # The instance attribute shadows the pool's method for this driver only.
+    pool.acquire = timed_acquire
+
+
+def create_driver(uri: Optional[str] = None, **overrides: Any) -> "neo4j.Driver":
+    """A tuned, instrumented `neo4j.Driver` for NEO4J_URI (or `uri`); `overrides` win over settings."""
+    from neo4j import GraphDatabase
+
+    auth = overrides.pop("auth", (settings.user, settings.password))
+    driver = GraphDatabase.driver(uri or settings.uri, auth=auth, **driver_config(**overrides))
+    _instrument(driver, is_async=False)
+    return driver
+
+
+def create_async_driver(uri: Optional[str] = None, **overrides: Any) -> "neo4j.AsyncDriver":
+    """`create_driver` for asyncio: an `AsyncDriver` with the same pool settings."""
+    from neo4j import AsyncGraphDatabase
+
+    auth = overrides.pop("auth", (settings.user, settings.password))
+    driver = AsyncGraphDatabase.driver(uri or settings.uri, auth=auth, **driver_config(**overrides))
+    _instrument(driver, is_async=True)
+    return driver
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * pct / 100.0)))]
+
+
+def pool_metrics(driver: Any) -> PoolMetrics:
+    """Connection counts and acquisition waits for a driver from `create_driver` / `create_async_driver`."""
+    from resources import unwrap
+
+    driver = unwrap(driver)
+    pool = getattr(driver, "_pool", None)
+    in_use = idle = 0
+    # A snapshot without the pool lock: good enough for metrics, never blocks queries.
+    for connections in list(getattr(pool, "connections", {}).values()):
+        for connection in list(connections):
+            if getattr(connection, "in_use", False):
+                in_use += 1
+            else:
+                idle += 1
+    stats = _stats.get(driver)
+    waits = stats.waits() if stats else []
+    config = getattr(pool, "pool_config", None)
+    return PoolMetrics(
+        max_size=int(getattr(config, "max_connection_pool_size", settings.neo4j_max_pool_size)),
+        in_use=in_use,
+        idle=idle,
+        acquisitions=stats.acquisitions if stats else 0,
+        failed=stats.failed if stats else 0,
+        wait_p50_ms=round(_percentile(waits, 50) * 1000.0, 3),
+        wait_p95_ms=round(_percentile(waits, 95) * 1000.0, 3),
+        wait_max_ms=round((stats.wait_max_s if stats else 0.0) * 1000.0, 3),
+    )
+
+
+def log_pool_metrics(logger: Any, driver: Any) -> PoolMetrics:
+    m = pool_metrics(driver)
+    logger.info(
+        "Neo4j pool: %d acquisition(s) (%d failed), wait p50 %0.2fms / p95 %0.2fms / max %0.2fms; %d in use, %d idle of %d",
+        m.acquisitions,
+        m.failed,
+        m.wait_p50_ms,
+        m.wait_p95_ms,
+        m.wait_max_ms,
+        m.in_use,
+        m.idle,
+        m.max_size,
+    )
+    return m
+
+
+def _run_all(tx: Any, query: str, params: dict[str, Any]) -> list:
+    return list(tx.run(query, params))
+
+
+async def _arun_all(tx: Any, query: str, params: dict[str, Any]) -> list:
+    result = await tx.run(query, params)
+    return [record async for record in result]
+
+
+def read(driver: Any, query: str, params: Optional[dict[str, Any]] = None, *, database: Optional[str] = None) -> list:
+    """All records of `query` from a managed read transaction (retried on transient errors)."""
+    with driver.session(database=database or settings.database) as session:
+        return session.execute_read(_run_all, query, params or {})
+
+
+def write(driver: Any, query: str, params: Optional[dict[str, Any]] = None, *, database: Optional[str] = None) -> list:
+    """All records of `query` from a managed write transaction (retried on transient errors).
+
+    The statement may run more than once, so it must be safe to repeat (MERGE, SET, ...).
+    """
+    with driver.session(database=database or settings.database) as session:
+        return session.execute_write(_run_all, query, params or {})
+
+
+async def aread(driver: Any, query: str, params: Optional[dict[str, Any]] = None, *, database: Optional[str] = None) -> list:
+    """`read` for an `AsyncDriver`."""
+    async with driver.session(database=database or settings.database) as session:
+        return await session.execute_read(_arun_all, query, params or {})
+
+
+async def awrite(driver: Any, query: str, params: Optional[dict[str, Any]] = None, *, database: Optional[str] = None) -> list:
+    """`write` for an `AsyncDriver`."""
+    async with driver.session(database=database or settings.database) as session:
+        return await session.execute_write(_arun_all, query, params or {})
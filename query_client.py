@@ -0,0 +1,161 @@
+"""Thin client for `query_server.py`.
+
+Sends one question to the resident query service, prints the answer like the
+per-pipeline scripts do (streamed into the answer panel unless --no-stream),
+records it via `run_result_writer` (honouring RUN_RESULTS_PATH) once complete and
+prints the server's per-stage latency breakdown, including time to first token.
+
+    python3 query_client.py --pipeline rag --question "..."
+    python3 query_client.py --wait 60   # block until the server is up
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Callable, Optional
+
+from config import settings
+from query_timing import format_timings
+
+
+def _base_url(host: str, port: int) -> str:
+    return f"http://{host}:{port}"
+
+
+def wait_until_ready(base_url: str, *, timeout_s: float) -> bool:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health", timeout=2) as resp:
+                if resp.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def ask(base_url: str, pipeline: str, question: str, *, top_k: int | None = None, timeout_s: float = 600) -> dict[str, Any]:
+    payload = {"pipeline": pipeline, "question": question}
+    if top_k:
+        payload["top_k"] = top_k
+    req = urllib.request.Request(
+        f"{base_url}/query",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout_s) as resp:
+            return json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        detail = e.read().decode("utf-8", "replace")
+        raise RuntimeError(f"query server returned {e.code}: {detail}") from None
+
+
+def ask_stream(
+    base_url: str,
+    pipeline: str,
+    question: str,
+    *,
+    on_token: Callable[[str], None],
+    top_k: int | None = None,
+    timeout_s: float = 600,
+) -> dict[str, Any]:
+    """`ask`, but feeding answer text to `on_token` as the server streams it."""
+    payload: dict[str, Any] = {"pipeline": pipeline, "question": question, "stream": True}
+    if top_k:
+        payload["top_k"] = top_k
+    req = urllib.request.Request(
+        f"{base_url}/query",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout_s) as resp:
+            for line in resp:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if "delta" in event:
+                    on_token(event["delta"])
+                elif "error" in event:
+                    raise RuntimeError(f"query failed on the server: {event['error']}")
+                elif event.get("done"):
+                    return event
+    except urllib.error.HTTPError as e:
+        detail = e.read().decode("utf-8", "replace")
+        raise RuntimeError(f"query server returned {e.code}: {detail}") from None
+    raise RuntimeError("query server closed the stream before the answer was complete")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Ask the resident query server a question")
+    parser.add_argument("--pipeline", choices=("rag", "graph_rag"), help="Which pipeline answers")
+    parser.add_argument("--question", help="User question")
+    parser.add_argument("--top-k", type=int, default=None, help="GraphRAG retrieval top_k")
+    parser.add_argument("--host", default=settings.query_server_host)
+    parser.add_argument("--port", type=int, default=settings.query_server_port)
+    parser.add_argument("--wait", type=float, default=0.0, help="Wait up to N seconds for the server to come up")
+    parser.add_argument(
+        "--stream",
+        action=argparse.BooleanOptionalAction,
+        default=settings.stream_answers,
+        help="Render the answer as it is generated (default: STREAM_ANSWERS)",
+    )
+    args = parser.parse_args()
+
+    base_url = _base_url(args.host, args.port)
+    if args.wait and not wait_until_ready(base_url, timeout_s=args.wait):
+        print(f"Query server at {base_url} did not come up within {args.wait:0.0f}s", file=sys.stderr)
+        return 1
+    if not args.question:
+        return 0
+    if not args.pipeline:
+        parser.error("--pipeline is required with --question")
+
+    # Imported late: --wait polling should not pay for rich.
+    from run_result_writer import write_run_result
+    from ui import print_qa_block, stream_qa_block, wait_for_enter
+
+    t0 = time.perf_counter()
+    first_token_at: Optional[float] = None
+    if args.stream:
+        with stream_qa_block(question=args.question, title=args.pipeline.upper()) as write:
+
+            def on_token(delta: str) -> None:
+                nonlocal first_token_at
+                if first_token_at is None:
+                    first_token_at = time.perf_counter() - t0
+                write(delta)
+
+            result = ask_stream(base_url, args.pipeline, args.question, on_token=on_token, top_k=args.top_k)
+    else:
+        result = ask(base_url, args.pipeline, args.question, top_k=args.top_k)
+    timings = dict(result.get("timings") or {})
+    if first_token_at is not None:
+        timings["client_ttft"] = first_token_at
+    timings["client_total"] = time.perf_counter() - t0
+
+    if not args.stream:
+        print_qa_block(question=args.question, answer=result.get("answer", ""), title=args.pipeline.upper())
+    written = write_run_result(
+        question=args.question,
+        answer=result.get("answer", ""),
+        source=args.pipeline,
+        timings=timings,
+        metrics=result.get("metrics"),
+        sources=result.get("sources") or (),
+    )
+    print(f"[{args.pipeline}] {format_timings(timings)} -> {written.path}")
+    wait_for_enter()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""Resident query service for both pipelines.
+
+Imports `rag/query.py` and `graph_rag/query.py` once, so the Neo4j driver, the
+retriever, GraphRAG and the OpenAI clients stay warm between questions instead of
+being rebuilt by a fresh interpreter per question.
+
+    python3 query_server.py &
+    python3 query_client.py --pipeline graph_rag --question "..."
+
+API (JSON over HTTP on QUERY_SERVER_HOST:QUERY_SERVER_PORT):
+    GET  /health  -> {"status": "ok", "pipelines": [...]}
+    POST /query   {"pipeline": "rag" | "graph_rag", "question": "...", "top_k": 25}
+                  -> {"answer": "...", "source": "...", "timings": {"embed": ..., "ttft": ..., "total": ...},
+                      "metrics": {"prompt.context_tokens": ..., ...}}
+
+With `"stream": true` the reply is chunked NDJSON instead: one `{"delta": "..."}`
+line per piece of answer text as the model produces it, then the object above
+with `"done": true` (or `{"error": "..."}` if the query failed midway).
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+
+# Project root and graph_rag/ (for its sibling-module imports) on sys.path
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(_ROOT)
+sys.path.append(os.path.join(_ROOT, "graph_rag"))
+from config import settings, ensure_openai_key
+from logger_factory import bind, get_logger, new_run_id
+from query_timing import QueryAnswer, format_timings
+
+log = get_logger("query_server")
+
+PIPELINES = ("rag", "graph_rag")
+
+
+class QueryService:
+    """Holds the warm pipeline modules and answers questions against them."""
+
+    def __init__(self, pipelines: tuple[str, ...] = PIPELINES):
+        self.modules: dict[str, Any] = {}
+        for name in pipelines:
+            t0 = time.perf_counter()
+            module = importlib.import_module(f"{name}.query")
+            # Clients are created lazily; a resident server creates them up front.
+            module.warm_up()
+            self.modules[name] = module
+            log.info("Loaded %s pipeline in %0.2fs", name, time.perf_counter() - t0)
+
+    def answer(
+        self,
+        pipeline: str,
+        question: str,
+        *,
+        top_k: int | None = None,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> QueryAnswer:
+        module = self.modules.get(pipeline)
+        if module is None:
+            raise KeyError(f"unknown pipeline {pipeline!r} (available: {', '.join(self.modules)})")
+        if pipeline == "graph_rag" and top_k:
+            return module.answer_question(question, top_k=int(top_k), on_token=on_token)
+        return module.answer_question(question, on_token=on_token)
+
+    def close(self) -> None:
+        for name, module in self.modules.items():
+            closers: list[Callable[[], Any]] = []
+            if name == "graph_rag":
+                if getattr(module.driver, "created", True):
+                    # Pool sizing under real concurrent load (NEO4J_MAX_POOL_SIZE).
+                    from neo4j_connection import log_pool_metrics
+
+                    try:
+                        log_pool_metrics(log, module.driver)
+                    except Exception:
+                        pass
+                # Lazy resources: only what was actually created gets closed.
+                closers = [module.driver.close, module.embeddings.close, module.openai_embeddings.close, module.llm.close]
+            elif name == "rag":
+                closers = [module.client.close]
+            for close in closers:
+                try:
+                    close()
+                except Exception:
+                    pass
+
+
+def make_handler(service: QueryService) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format: str, *args: Any) -> None:  # requests are logged below
+            pass
+
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") == "/health":
+                self._send(200, {"status": "ok", "pipelines": list(service.modules)})
+            else:
+                self._send(404, {"error": f"unknown path {self.path}"})
+
+        def do_POST(self) -> None:
+            if self.path.rstrip("/") != "/query":
+                self._send(404, {"error": f"unknown path {self.path}"})
+                return
+            t0 = time.perf_counter()
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                pipeline = str(body.get("pipeline") or "")
+                question = str(body.get("question") or "").strip()
+                if not question:
+                    self._send(400, {"error": "question is required"})
+                    return
+            except (ValueError, TypeError) as e:
+                self._send(400, {"error": f"bad request: {e}"})
+                return
+
+            log_ctx = bind(log, run_id=new_run_id(), source=pipeline, op="serve_query")
+            if pipeline not in service.modules:
+                self._send(400, {"error": f"unknown pipeline {pipeline!r} (available: {', '.join(service.modules)})"})
+                return
+            if body.get("stream"):
+                self._stream_answer(service, pipeline, question, body.get("top_k"), t0, log_ctx)
+                return
+            try:
+                result = service.answer(pipeline, question, top_k=body.get("top_k"))
+            except Exception as e:
+                log_ctx.exception("Query failed: %s", e)
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+                return
+            self._send(200, self._result_payload(result, question, t0, log_ctx))
+
+        def _result_payload(self, result: QueryAnswer, question: str, t0: float, log_ctx: Any) -> dict[str, Any]:
+            timings = dict(result.timings)
+            timings["server_total"] = round(time.perf_counter() - t0, 4)
+            log_ctx.info("Answered (%s)", format_timings(timings), question=question)
+            return {
+                "answer": result.answer,
+                "source": result.source,
+                "question": question,
+                "timings": timings,
+                "metrics": result.metrics,
+                "sources": list(result.sources),
+            }
+
+        def _stream_answer(
+            self, service: QueryService, pipeline: str, question: str, top_k: Any, t0: float, log_ctx: Any
+        ) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                result = service.answer(pipeline, question, top_k=top_k, on_token=lambda d: self._write_line({"delta": d}))
+            except (BrokenPipeError, ConnectionResetError):
+                log_ctx.warning("Client disconnected while streaming")
+                self.close_connection = True
+                return
+            except Exception as e:
+                log_ctx.exception("Query failed: %s", e)
+                self._write_line({"error": f"{type(e).__name__}: {e}"})
+            else:
+                self._write_line({"done": True, **self._result_payload(result, question, t0, log_ctx)})
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _write_line(self, payload: dict[str, Any]) -> None:
+            raw = json.dumps(payload).encode("utf-8") + b"\n"
+            self.wfile.write(f"{len(raw):x}\r\n".encode("ascii") + raw + b"\r\n")
+            self.wfile.flush()
+
+        def _send(self, code: int, payload: dict[str, Any]) -> None:
+            raw = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve RAG and GraphRAG queries from one warm process")
+    parser.add_argument("--host", default=settings.query_server_host)
+    parser.add_argument("--port", type=int, default=settings.query_server_port)
+    parser.add_argument(
+        "--pipelines",
+        default=",".join(PIPELINES),
+        help="Comma-separated pipelines to load (rag, graph_rag)",
+    )
+    args = parser.parse_args()
+
+    ensure_openai_key()
+    pipelines = tuple(p.strip() for p in args.pipelines.split(",") if p.strip())
+    service = QueryService(pipelines)
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    httpd.daemon_threads = True
+    log.info("Query server listening on http://%s:%d (%s)", args.host, args.port, ", ".join(pipelines))
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
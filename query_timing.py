@@ -0,0 +1,24 @@
+"""Query results and stage-latency formatting shared by the RAG and GraphRAG query paths.
+
+Stage timings themselves are recorded with `tracing.Trace`.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+
+def format_timings(timings: dict[str, float]) -> str:
+    return " ".join(f"{k}={v:0.2f}s" for k, v in timings.items())
+
+
+@dataclass(frozen=True)
+class QueryAnswer:
+    question: str
+    answer: str
+    source: str
+    timings: dict[str, float] = field(default_factory=dict)
+    # Span attributes (token counts, context size, cache hits), flattened as `stage.attr`.
+    metrics: dict[str, Any] = field(default_factory=dict)
+    # Retrieved documents, as `file#chunk_index` (GraphRAG) or cited file names (RAG).
+    sources: tuple[str, ...] = ()
@@ -2,19 +2,26 @@
 
 Uses LangChain for chunking; uses OpenAI SDK to create the hosted vector store
 and upload chunk files. Saves the created vector_store_id to `rag/.rag_store.json`.
+
+Chunks are uploaded straight from memory by a bounded thread pool sharing one
+OpenAI client (and so one HTTP connection pool), then attached to the store with
+the batch file-attach API. Progress is checkpointed to the state file, so an
+interrupted ingest picks up where it stopped; `rebuild-rag.sh` deletes the state
+file to start from scratch.
 """
-from typing import List
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import io
 import json
 import os
 import sys
-import tempfile
 import time
 
 from openai import OpenAI
-try:
-    from langchain_text_splitters import RecursiveCharacterTextSplitter
-except ImportError:  # pragma: no cover
-    from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
 if __name__ == "__main__":
@@ -29,17 +36,148 @@ log = get_logger("rag.ingest")
 
 STATE_PATH = os.path.join(os.path.dirname(__file__), ".rag_store.json")
 
-def save_state(vector_store_id: str, file_ids: List[str]) -> None:
-    data = {
-        "vector_store_id": vector_store_id,
-        "file_ids": file_ids,
-        "name": settings.vector_store_name,
-    }
-    with open(STATE_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+# The vector store batch-attach endpoint accepts at most 500 file ids per call.
+ATTACH_BATCH_SIZE = 500
+# Checkpoint the state file after this many finished uploads.
+CHECKPOINT_EVERY = 25
+
+
+def chunk_key(d: Document) -> str:
+    md = d.metadata or {}
+    return f"{md.get('source')}#{md.get('chunk_index')}:{md.get('content_hash')}"
+
+
+def load_state(path: str = STATE_PATH) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state: Dict[str, Any], path: str = STATE_PATH) -> None:
+    # Write-then-rename so an interrupted ingest never leaves a truncated state file.
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+@dataclass(frozen=True)
+class IngestReport:
+    vector_store_id: str
+    chunks: int
+    uploaded: int
+    resumed: int
+    attached: int
+    latency_s: float
+
+
+def _upload_chunk(client: OpenAI, d: Document, index: int) -> str:
+    md = d.metadata or {}
+    stem = os.path.splitext(str(md.get("source") or "chunk"))[0]
+    # Vector store parsing goes by extension, so keep a .txt filename.
+    name = f"{stem}_{md.get('chunk_index', index)}.txt"
+    buf = io.BytesIO(d.page_content.encode("utf-8"))
+    f = client.files.create(file=(name, buf, "text/plain"), purpose="user_data")
+    return f.id
+
+
+def ingest_documents(
+    client: OpenAI,
+    docs: List[Document],
+    *,
+    concurrency: int,
+    state_path: str = STATE_PATH,
+    on_upload: Optional[Callable[[int], None]] = None,
+) -> IngestReport:
+    """Upload `docs` to the vector store recorded in `state_path` (creating one if needed).
+
+    Chunks already uploaded by an earlier (possibly interrupted) run are skipped;
+    files uploaded but not yet attached are attached now.
+    """
+    t0 = time.perf_counter()
+    state = load_state(state_path)
+    if state and state.get("name") != settings.vector_store_name:
+        log.warning("State file belongs to vector store %r; starting a new one", state.get("name"))
+        state = None
+
+    if state is None:
+        vs = client.vector_stores.create(name=settings.vector_store_name)
+        state = {"vector_store_id": vs.id, "name": settings.vector_store_name, "file_ids": [], "uploads": {}}
+        save_state(state, state_path)
+        log.info("Vector store created: %s", vs.id)
+    else:
+        log.info("Resuming vector store %s (%d chunk(s) already uploaded)", state["vector_store_id"], len(state.get("uploads", {})))
+    vector_store_id = state["vector_store_id"]
+    uploads: Dict[str, str] = state.setdefault("uploads", {})
+    attached: List[str] = state.setdefault("file_ids", [])
+
+    keys = [chunk_key(d) for d in docs]
+    stale = set(uploads) - set(keys)
+    if stale:
+        log.warning("%d uploaded chunk(s) no longer exist in data/; run rebuild-rag.sh to drop them", len(stale))
+    pending = [(i, d) for i, (k, d) in enumerate(zip(keys, docs), start=1) if k not in uploads]
+    resumed = len(docs) - len(pending)
+    if resumed and on_upload is not None:
+        on_upload(resumed)
+
+    uploaded = 0
+    workers = max(1, int(concurrency))
+    in_flight: Dict[Future, str] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-upload") as pool:
+
+            def drain(done) -> None:
+                nonlocal uploaded
+                for fut in done:
+                    key = in_flight.pop(fut)
+                    uploads[key] = fut.result()
+                    uploaded += 1
+                    if on_upload is not None:
+                        on_upload(1)
+                    if uploaded % CHECKPOINT_EVERY == 0:
+                        save_state(state, state_path)
+
+            for i, d in pending:
+                if len(in_flight) >= workers:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    drain(done)
+                in_flight[pool.submit(_upload_chunk, client, d, i)] = keys[i - 1]
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                drain(done)
+    finally:
+        # Whatever finished before a failure is kept for the next run.
+        save_state(state, state_path)
+
+    attached_set = set(attached)
+    to_attach = [uploads[k] for k in keys if k in uploads and uploads[k] not in attached_set]
+    for start in range(0, len(to_attach), ATTACH_BATCH_SIZE):
+        batch = to_attach[start:start + ATTACH_BATCH_SIZE]
+        client.vector_stores.file_batches.create(vector_store_id=vector_store_id, file_ids=batch)
+        attached.extend(batch)
+        save_state(state, state_path)
+
+    return IngestReport(
+        vector_store_id=vector_store_id,
+        chunks=len(docs),
+        uploaded=uploaded,
+        resumed=resumed,
+        attached=len(to_attach),
+        latency_s=time.perf_counter() - t0,
+    )
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingest data/ into an OpenAI Vector Store")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.rag_upload_concurrency,
+        help="Chunk uploads in flight (default: RAG_UPLOAD_CONCURRENCY)",
+    )
+    args = parser.parse_args()
+
     ensure_openai_key()
     run_id = new_run_id()
     log_ctx = bind(log, run_id=run_id, source="rag", op="ingest", model=settings.embedding_model)
@@ -49,43 +187,27 @@ def main() -> None:
     log_ctx.info("Prepared chunks", chunks=len(docs))
 
     client = OpenAI()
-    with status("Creating OpenAI vector store…"):
-        vs = client.vector_stores.create(name=settings.vector_store_name)
-    log_ctx.info("Vector store ready", vector_store_id=vs.id, name=settings.vector_store_name)
-
-    file_ids: List[str] = []
-
-    # Upload each chunk as a separate file and attach to the vector store
-    with progress_task(description="Uploading chunks to vector store…", total=len(docs)) as (progress, task_id):
-        for i, d in enumerate(docs, start=1):
-            src = d.metadata.get("source")
-            t0 = time.perf_counter()
-            with tempfile.NamedTemporaryFile("w+b", suffix=f"_{i}.txt", delete=False) as tmp:
-                tmp.write(d.page_content.encode("utf-8"))
-                tmp.flush()
-                # Upload file
-                with open(tmp.name, "rb") as fh:
-                    f = client.files.create(file=fh, purpose="user_data")
-                file_ids.append(f.id)
-                # Attach to store
-                client.vector_stores.files.create(vector_store_id=vs.id, file_id=f.id)
-
-            log_ctx.debug("Chunk uploaded",chunk=i,source=src,
-                file_id=f.id,
-                latency_s=f"{time.perf_counter() - t0:0.2f}",
+    try:
+        with progress_task(description="Uploading chunks to vector store…", total=len(docs)) as (progress, task_id):
+            report = ingest_documents(
+                client,
+                docs,
+                concurrency=args.concurrency,
+                on_upload=lambda n: progress.update(task_id, advance=n),
             )
-            progress.update(task_id, advance=1)
- 
-            # Best-effort cleanup of temp file
-            try:
-                os.remove(tmp.name)
-            except OSError:
-                pass
-
-    save_state(vs.id, file_ids)
-
-    log_ctx.info("Created/updated vector store", vector_store_id=vs.id, name=settings.vector_store_name)
-    log_ctx.info("Attached files", count=len(file_ids))
+    finally:
+        client.close()
+
+    log_ctx.info(
+        "Created/updated vector store %s: %d uploaded, %d resumed, %d attached in %0.2fs",
+        report.vector_store_id,
+        report.uploaded,
+        report.resumed,
+        report.attached,
+        report.latency_s,
+        vector_store_id=report.vector_store_id,
+        name=settings.vector_store_name,
+    )
 
 if __name__ == "__main__":
     main()
@@ -6,8 +6,7 @@ import json
 import os
 import sys
 import time
-
-from openai import OpenAI
+from typing import Any, Callable
 
 STATE_PATH = os.path.join(os.path.dirname(__file__), ".rag_store.json")
 
@@ -16,11 +15,21 @@ if __name__ == "__main__":
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from config import settings, ensure_openai_key
 from logger_factory import bind, get_logger, new_run_id
+from query_timing import QueryAnswer, format_timings
+from resources import openai_client, unwrap
+from token_utils import count_tokens
+from tracing import Trace
 from run_result_writer import write_run_result
-from ui import print_qa_block, status, wait_for_enter
+from ui import print_qa_block, status, stream_qa_block, wait_for_enter
 
 log = get_logger("rag.query")
-client = OpenAI()
+# Created on first use, so --help and argument errors need no OPENAI_API_KEY.
+client = openai_client()
+
+
+def warm_up() -> None:
+    """Create the lazy OpenAI client now instead of on the first question."""
+    unwrap(client)
 
 
 def build_graphrag_like_messages(*, question: str) -> list[dict]:
@@ -47,58 +56,147 @@ def load_state() -> dict:
     with open(STATE_PATH, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def query():
-    ensure_openai_key()
-
+def answer_question(
+    question: str,
+    *,
+    run_id: str | None = None,
+    on_token: Callable[[str], None] | None = None,
+) -> QueryAnswer:
+    """Run the classic RAG pipeline for `question`, tracing each stage.
+
+    Retrieval and generation happen in one Responses API call (file_search tool),
+    so they are reported as a single `retrieve_generate` span. The response is
+    streamed: `timings["ttft"]` marks the first answer token (after file_search
+    has run), and `on_token` receives each piece of text as it arrives.
+    """
+    run_id = run_id or new_run_id()
+    trace = Trace("rag.query", trace_id=run_id)
+    try:
+        with trace.span("load_state"):
+            vector_store_id = load_state()["vector_store_id"]
+
+        with trace.span("retrieve_generate", question_tokens=count_tokens(question)) as span:
+            t0 = time.perf_counter()
+            # Use the Responses API with retrieval via the vector store
+            stream = client.responses.create(
+                model=settings.chat_model,
+                input=build_graphrag_like_messages(question=question),
+                # File search tool uses the vector store for retrieval
+                tools=[{"type": "file_search", "vector_store_ids": [vector_store_id]}],
+                tool_choice="auto",
+                metadata={"app": "classic-rag", "run_id": run_id},
+                top_p=1.0,
+                stream=True,
+            )
+            parts: list[str] = []
+            response = None
+            for event in stream:
+                kind = getattr(event, "type", None)
+                if kind == "response.output_text.delta":
+                    delta = getattr(event, "delta", "") or ""
+                    if not delta:
+                        continue
+                    if not parts:
+                        trace.mark("ttft")
+                        span.set(first_token_s=round(time.perf_counter() - t0, 4))
+                    parts.append(delta)
+                    if on_token is not None:
+                        on_token(delta)
+                elif kind == "response.completed":
+                    response = getattr(event, "response", None)
+                elif kind in ("response.failed", "error"):
+                    raise RuntimeError(f"Responses stream failed: {getattr(event, 'response', event)}")
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                # Billed tokens, including the retrieved file_search context.
+                span.set(input_tokens=usage.input_tokens, output_tokens=usage.output_tokens)
+
+        out_text = "".join(parts)
+        if not out_text and getattr(response, "output", None):
+            # Iterate over all output items; some may be tool calls (e.g., file_search_call)
+            for item in response.output:
+                # We're interested in message items that contain content parts
+                if getattr(item, "type", None) == "message" and getattr(item, "content", None):
+                    for p in item.content:
+                        if getattr(p, "type", None) == "output_text":
+                            out_text += getattr(p, "text", "")
+        trace.set(answer_tokens=count_tokens(out_text))
+    finally:
+        trace.finish()
+
+    return QueryAnswer(
+        question=question,
+        answer=out_text,
+        source="rag",
+        timings=trace.timings(),
+        metrics=trace.attributes(),
+        sources=_cited_files(response),
+    )
+
+
+def _cited_files(response: Any) -> tuple[str, ...]:
+    """File names the answer cites (file_search `file_citation` annotations), in order."""
+    cited: dict[str, None] = {}
+    for item in getattr(response, "output", None) or []:
+        if getattr(item, "type", None) != "message":
+            continue
+        for p in getattr(item, "content", None) or []:
+            for a in getattr(p, "annotations", None) or []:
+                if getattr(a, "type", None) == "file_citation":
+                    cited[getattr(a, "filename", None) or getattr(a, "file_id", "")] = None
+    cited.pop("", None)
+    return tuple(cited)
+
+
+def query(question: str, *, stream: bool | None = None) -> str:
+    stream = settings.stream_answers if stream is None else stream
     run_id = new_run_id()
     log_ctx = bind(log, run_id=run_id, source="rag", model=settings.chat_model)
 
-    parser = argparse.ArgumentParser(description="Query the OpenAI Vector Store")
-    parser.add_argument("--question", required=True, help="User question")
-    parser.add_argument("--use-citation", required=False, help="Use citation")
-    args = parser.parse_args()
-
-    state = load_state()
-    vector_store_id = state["vector_store_id"]
-
     log_ctx.info("Starting query")
 
-    t0 = time.perf_counter()
-    with status("Calling OpenAI (classic RAG)…"):
-        # Use the Responses API with retrieval via the vector store
-        response = client.responses.create(
-            model=settings.chat_model,
-            input=build_graphrag_like_messages(question=args.question),
-            # File search tool uses the vector store for retrieval
-            tools=[{"type": "file_search", "vector_store_ids": [vector_store_id]}],
-            tool_choice="auto",
-            metadata={"app": "classic-rag", "run_id": run_id},
-            top_p=1.0,
-        )
-    log_ctx.info("OpenAI response received", latency_s=f"{time.perf_counter() - t0:0.2f}")
-
-    # Extract text answer
-    out_text = ""
-
-    # Iterate over all output items; some may be tool calls (e.g., file_search_call)
-    if getattr(response, "output", None):
-        for item in response.output:
-            # We're interested in message items that contain content parts
-            if getattr(item, "type", None) == "message" and getattr(item, "content", None):
-                for p in item.content:
-                    if getattr(p, "type", None) == "output_text":
-                        out_text += getattr(p, "text", "")
-
-    print_qa_block(question=args.question, answer=out_text, title="RAG")
-
-    result = write_run_result(question=args.question, answer=out_text, source="rag")
-    log_ctx.info("Saved run result", path=result.path)
+    if stream:
+        with stream_qa_block(question=question, title="RAG") as write:
+            result = answer_question(question, run_id=run_id, on_token=write)
+    else:
+        with status("Calling OpenAI (classic RAG)…"):
+            result = answer_question(question, run_id=run_id)
+    log_ctx.info(
+        "OpenAI response received (%s)",
+        format_timings(result.timings),
+        latency_s=f"{result.timings['total']:0.2f}",
+    )
+
+    if not stream:
+        print_qa_block(question=question, answer=result.answer, title="RAG")
+
+    written = write_run_result(
+        question=question,
+        answer=result.answer,
+        source="rag",
+        timings=result.timings,
+        metrics=result.metrics,
+        sources=result.sources,
+    )
+    log_ctx.info("Saved run result", path=written.path)
+    return result.answer
 
 
 async def main() -> None:
     try:
+        parser = argparse.ArgumentParser(description="Query the OpenAI Vector Store")
+        parser.add_argument("--question", required=True, help="User question")
+        parser.add_argument("--use-citation", required=False, help="Use citation")
+        parser.add_argument(
+            "--stream",
+            action=argparse.BooleanOptionalAction,
+            default=settings.stream_answers,
+            help="Render the answer as it is generated (default: STREAM_ANSWERS)",
+        )
+        args = parser.parse_args()
+
         ensure_openai_key()
-        query()
+        query(args.question, stream=args.stream)
         wait_for_enter()
     except Exception as e:
         log.exception("Error occurred during query: %s", e)
@@ -0,0 +1,4 @@
+python graph_rag/builder.py --incremental
+python graph_rag/create_vector_index.py
+python graph_rag/expansion.py --explain
+python graph_rag/populate_vector_index.py
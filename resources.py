@@ -0,0 +1,123 @@
+"""Lazily created clients shared by the scripts (Neo4j driver, OpenAI clients, ...).
+
+A module-level `driver = neo4j_driver()` costs nothing at import: the `Lazy`
+stands in for the driver and creates it (importing `neo4j` only then) on first
+attribute access, so `--help`, argument errors and code paths that never touch
+the database don't pay for the import, the driver or an OpenAI API key.
+
+    driver = neo4j_driver()
+    driver.execute_query("RETURN 1")   # driver created here
+    driver.close()                     # no-op if it was never created
+
+Tests and benchmarks can still replace the module attribute outright
+(`query.driver = FakeGraphDriver(...)`).
+"""
+from __future__ import annotations
+
+import inspect
+import threading
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+from config import settings
+
+T = TypeVar("T")
+
+_UNSET: Any = object()
+
+
+class Lazy(Generic[T]):
+    """Proxy for `factory()`, which runs (once, thread-safely) on first attribute access or `get()`.
+
+    `close()` closes the object only if it was created, via `close_fn(obj)` or
+    else `obj.close()`; a later access creates a fresh one. Async objects are
+    closed with `await lazy.aclose()`. A factory may return None (e.g. "no
+    local index"); that result is kept like any other and nothing is closed.
+    """
+
+    def __init__(self, factory: Callable[[], T], *, name: str, close_fn: Optional[Callable[[T], Any]] = None):
+        self._factory = factory
+        self._close_fn = close_fn
+        self._name = name
+        self._lock = threading.Lock()
+        self._obj: Any = _UNSET
+
+    @property
+    def created(self) -> bool:
+        return self._obj is not _UNSET
+
+    def get(self) -> T:
+        obj = self._obj
+        if obj is _UNSET:
+            with self._lock:
+                obj = self._obj
+                if obj is _UNSET:
+                    obj = self._obj = self._factory()
+        return obj
+
+    def _close(self) -> Any:
+        with self._lock:
+            obj, self._obj = self._obj, _UNSET
+        if obj is _UNSET or obj is None:
+            return None
+        if self._close_fn is not None:
+            return self._close_fn(obj)
+        return obj.close()
+
+    def close(self) -> None:
+        self._close()
+
+    async def aclose(self) -> None:
+        """`close()` for objects whose close is a coroutine (`neo4j.AsyncDriver`, `openai.AsyncOpenAI`)."""
+        result = self._close()
+        if inspect.isawaitable(result):
+            await result
+
+    def __getattr__(self, attr: str) -> Any:
+        # Only reached for attributes the proxy itself doesn't define.
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+    def __repr__(self) -> str:
+        return f"<Lazy {self._name} ({'created' if self.created else 'not created'})>"
+
+
+def unwrap(obj: Any) -> Any:
+    """The real object behind a `Lazy` (created if needed); anything else is returned as-is.
+
+    For APIs that type-check their arguments, e.g. `SimpleKGPipeline(driver=...)`.
+    """
+    return obj.get() if isinstance(obj, Lazy) else obj
+
+
+def _make_neo4j_driver() -> Any:
+    from neo4j_connection import create_driver
+
+    return create_driver()
+
+
+def _make_neo4j_async_driver() -> Any:
+    from neo4j_connection import create_async_driver
+
+    return create_async_driver()
+
+
+def _make_openai_client() -> Any:
+    from openai import OpenAI
+
+    return OpenAI()
+
+
+def neo4j_driver() -> Lazy:
+    """A `Lazy` Neo4j driver for NEO4J_URI / NEO4J_USER / NEO4J_PASS (`neo4j_connection.create_driver`)."""
+    return Lazy(_make_neo4j_driver, name="neo4j.driver")
+
+
+def neo4j_async_driver() -> Lazy:
+    """A `Lazy` `neo4j.AsyncDriver` with the same settings; close it with `await driver.aclose()`."""
+    return Lazy(_make_neo4j_async_driver, name="neo4j.async_driver")
+
+
+def openai_client() -> Lazy:
+    """A `Lazy` `openai.OpenAI()` client (reads OPENAI_API_KEY when created)."""
+    return Lazy(_make_openai_client, name="openai.client")
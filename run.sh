@@ -4,11 +4,17 @@
 export RUN_RESULTS_PATH="$(python3 run_result_writer.py --start-session --header 'run.sh batch')"
 echo "Writing all results to: $RUN_RESULTS_PATH"
 
-scripts=(
-  "rag/query.py"
-  "graph_rag/query.py"
+pipelines=(
+  "rag"
+  "graph_rag"
 )
 
+# One resident query server keeps drivers/clients warm for every question.
+python3 query_server.py &
+SERVER_PID=$!
+trap 'kill $SERVER_PID 2>/dev/null' EXIT
+python3 query_client.py --wait 120 || exit 1
+
 questions=(
     "What is our current event streaming platform, and which ADR superseded the previous one? (ids + dates)"
     "Given we switched to Pub/Sub, what ADR(s) still govern event contract/schema governance, and what tooling do we use?"
@@ -21,8 +27,8 @@ questions=(
 )
 
 for q in "${questions[@]}"; do
-  for s in "${scripts[@]}"; do
-    python3 "$s" --question "$q"
+  for p in "${pipelines[@]}"; do
+    python3 query_client.py --pipeline "$p" --question "$q"
   done
 done
 
@@ -1,10 +1,33 @@
+"""Run results: a SQLite store of every answered question, plus run_XXXX.txt exports for humans.
+
+Each `write_run_result` call inserts one row into `run_results/results.sqlite`
+(one transaction, so concurrent writers never interleave) with the question,
+answer, pipeline, per-stage timings, token counts and retrieved sources. A
+session groups the rows of one `run.sh` / `batch_runner.py` execution; its id
+is the XXXX of the session's `run_XXXX.txt`, which keeps receiving the same
+records as readable text.
+
+    python3 run_result_writer.py --list
+    python3 run_result_writer.py --stats                 # p50/p95 per pipeline per session
+    python3 run_result_writer.py --compare 11 12         # two sessions side by side
+    python3 run_result_writer.py --export 12             # rewrite run_0012.txt from the store
+"""
 from __future__ import annotations
 
+import json
+import math
 import os
 import re
+import sqlite3
+import threading
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Mapping, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are still whole records, just not locked.
+    fcntl = None
 
 
 _RUN_FILE_RE = re.compile(r"^run_(\d{4})\.txt$")
@@ -14,9 +37,46 @@ _RUN_FILE_RE = re.compile(r"^run_(\d{4})\.txt$")
 # so the subsequent per-question runs append into the same run_XXXX.txt.
 _SESSION_PATH_ENV = "RUN_RESULTS_PATH"
 
+# Overrides the store location (default: run_results/results.sqlite).
+_DB_PATH_ENV = "RUN_RESULTS_DB"
+
 # Delimiter between records when appending into a session file.
 _RECORD_DELIM = "\n\n----- RUN RECORD -----\n"
 
+# Token counts lifted out of the trace attributes into their own columns,
+# matched by name at any span (`prompt.context_tokens`, `generate.answer_tokens`, ...).
+TOKEN_FIELDS = ("prompt_tokens", "context_tokens", "answer_tokens", "input_tokens", "output_tokens")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT    NOT NULL,
+    header     TEXT,
+    text_path  TEXT    UNIQUE
+);
+CREATE TABLE IF NOT EXISTS results (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id     INTEGER NOT NULL REFERENCES sessions (id),
+    created_at     TEXT    NOT NULL,
+    pipeline       TEXT,
+    question       TEXT    NOT NULL,
+    answer         TEXT    NOT NULL,
+    error          TEXT,
+    latency_s      REAL,
+    ttft_s         REAL,
+    prompt_tokens  INTEGER,
+    context_tokens INTEGER,
+    answer_tokens  INTEGER,
+    input_tokens   INTEGER,
+    output_tokens  INTEGER,
+    sources        TEXT,
+    timings        TEXT,
+    metrics        TEXT
+);
+CREATE INDEX IF NOT EXISTS results_session_pipeline ON results (session_id, pipeline);
+CREATE INDEX IF NOT EXISTS results_pipeline_created ON results (pipeline, created_at);
+"""
+
 
 @dataclass(frozen=True)
 class RunResult:
@@ -24,6 +84,20 @@ class RunResult:
     run_number: int
 
 
+@dataclass(frozen=True)
+class PipelineStats:
+    session_id: int
+    pipeline: str
+    runs: int
+    errors: int
+    p50_s: float
+    p95_s: float
+    ttft_p50_s: float
+    ttft_p95_s: float
+    context_tokens: float
+    answer_tokens: float
+
+
 def _project_root() -> str:
     return os.path.dirname(os.path.abspath(__file__))
 
@@ -32,11 +106,15 @@ def _run_result_dir() -> str:
     return os.path.join(_project_root(), "run_results")
 
 
-def _next_run_number(directory: str) -> int:
+def _db_path() -> str:
+    return os.environ.get(_DB_PATH_ENV) or os.path.join(_run_result_dir(), "results.sqlite")
+
+
+def _max_run_file_number(directory: str) -> int:
     try:
         entries = os.listdir(directory)
     except FileNotFoundError:
-        return 1
+        return 0
 
     max_n = 0
     for name in entries:
@@ -45,7 +123,7 @@ def _next_run_number(directory: str) -> int:
             continue
         max_n = max(max_n, int(match.group(1)))
 
-    return max_n + 1
+    return max_n
 
 
 def _parse_run_number_from_path(path: str) -> int:
@@ -56,84 +134,368 @@ def _parse_run_number_from_path(path: str) -> int:
     return int(match.group(1))
 
 
+def _now() -> str:
+    return datetime.now(timezone.utc).astimezone().isoformat()
+
+
+def _token_fields(metrics: Mapping[str, Any]) -> dict[str, Optional[int]]:
+    out: dict[str, Optional[int]] = {name: None for name in TOKEN_FIELDS}
+    for key, value in metrics.items():
+        name = key.rsplit(".", 1)[-1]
+        if name in out and isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = int(value)
+    return out
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = math.floor(k)
+    hi = math.ceil(k)
+    if lo == hi:
+        return ordered[int(k)]
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class RunResultStore:
+    """SQLite-backed sessions and results; safe to share across threads and processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # One connection shared across threads; every access goes through _lock.
+        # Other processes are serialized by SQLite itself (WAL + busy timeout).
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._seed_session_numbers()
+
+    def _seed_session_numbers(self) -> None:
+        # Session ids continue the run_XXXX.txt numbering in run_results/, which
+        # predates the store (and is shared by every store, RUN_RESULTS_DB or not).
+        # This runs once, when the sequence is first created; afterwards ids come
+        # from AUTOINCREMENT and the directory is only listed again on a clash
+        # (`skip_session_numbers`).
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                seeded = self._conn.execute("SELECT 1 FROM sqlite_sequence WHERE name = 'sessions'").fetchone()
+                if seeded is None:
+                    (max_id,) = self._conn.execute("SELECT coalesce(max(id), 0) FROM sessions").fetchone()
+                    start = max(_max_run_file_number(_run_result_dir()), int(max_id))
+                    self._conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('sessions', ?)", (start,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def skip_session_numbers(self, last: int) -> None:
+        """Make the next new session id larger than `last`."""
+        with self._lock:
+            self._conn.execute("UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = 'sessions'", (last,))
+
+    def delete_session(self, session_id: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def create_session(self, *, header: Optional[str] = None, text_path: Optional[str] = None) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO sessions (created_at, header, text_path) VALUES (?, ?, ?)",
+                (_now(), header.strip() if header else None, text_path),
+            )
+            return int(cur.lastrowid)
+
+    def set_text_path(self, session_id: int, text_path: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE sessions SET text_path = ? WHERE id = ?", (text_path, session_id))
+
+    def session_for_path(self, text_path: str) -> int:
+        """The session id of `text_path`, registering it if it was created outside the store."""
+        number = _parse_run_number_from_path(text_path)
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM sessions WHERE text_path = ?", (text_path,)).fetchone()
+            if row is not None:
+                return int(row[0])
+            if number and self._conn.execute("SELECT 1 FROM sessions WHERE id = ?", (number,)).fetchone() is None:
+                self._conn.execute(
+                    "INSERT INTO sessions (id, created_at, text_path) VALUES (?, ?, ?)", (number, _now(), text_path)
+                )
+                return number
+            cur = self._conn.execute("INSERT INTO sessions (created_at, text_path) VALUES (?, ?)", (_now(), text_path))
+            return int(cur.lastrowid)
+
+    def add_result(
+        self,
+        session_id: int,
+        *,
+        question: str,
+        answer: str,
+        pipeline: Optional[str],
+        timings: Mapping[str, float],
+        metrics: Mapping[str, Any],
+        sources: Sequence[str],
+        error: Optional[str],
+        created_at: Optional[str] = None,
+    ) -> int:
+        tokens = _token_fields(metrics)
+        row = (
+            session_id,
+            created_at or _now(),
+            pipeline,
+            question.strip(),
+            answer.strip(),
+            error,
+            timings.get("total"),
+            timings.get("ttft"),
+            *(tokens[name] for name in TOKEN_FIELDS),
+            json.dumps(list(sources)),
+            json.dumps(dict(timings)),
+            json.dumps(dict(metrics), default=str),
+        )
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO results (session_id, created_at, pipeline, question, answer, error, latency_s, ttft_s, "
+                f"{', '.join(TOKEN_FIELDS)}, sources, timings, metrics) "
+                f"VALUES ({', '.join('?' * len(row))})",
+                row,
+            )
+            return int(cur.lastrowid)
+
+    def sessions(self, limit: int = 20) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.id, s.created_at, s.header, s.text_path, count(r.id) "
+                "FROM sessions s LEFT JOIN results r ON r.session_id = s.id "
+                "GROUP BY s.id ORDER BY s.id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        keys = ("id", "created_at", "header", "text_path", "results")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def results(self, session_id: int) -> list[dict[str, Any]]:
+        with self._lock:
+            cur = self._conn.execute("SELECT * FROM results WHERE session_id = ? ORDER BY id", (session_id,))
+            names = [d[0] for d in cur.description]
+            rows = cur.fetchall()
+        out = []
+        for row in rows:
+            record = dict(zip(names, row))
+            for key in ("sources", "timings", "metrics"):
+                record[key] = json.loads(record[key]) if record[key] else None
+            out.append(record)
+        return out
+
+    def stats(self, session_ids: Optional[Sequence[int]] = None) -> list[PipelineStats]:
+        """Latency / TTFT percentiles and mean token counts per (session, pipeline)."""
+        query = "SELECT session_id, pipeline, latency_s, ttft_s, context_tokens, answer_tokens, error FROM results"
+        params: tuple = ()
+        if session_ids:
+            query += f" WHERE session_id IN ({', '.join('?' * len(session_ids))})"
+            params = tuple(session_ids)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY session_id, pipeline", params).fetchall()
+
+        groups: dict[tuple[int, str], list[tuple]] = {}
+        for row in rows:
+            groups.setdefault((row[0], row[1] or "-"), []).append(row)
+        out = []
+        for (session_id, pipeline), group in groups.items():
+            ok = [r for r in group if not r[6]]
+            latencies = [r[2] for r in ok if r[2] is not None]
+            ttfts = [r[3] for r in ok if r[3] is not None]
+            context = [r[4] for r in ok if r[4] is not None]
+            answer = [r[5] for r in ok if r[5] is not None]
+            out.append(
+                PipelineStats(
+                    session_id=session_id,
+                    pipeline=pipeline,
+                    runs=len(group),
+                    errors=len(group) - len(ok),
+                    p50_s=percentile(latencies, 50),
+                    p95_s=percentile(latencies, 95),
+                    ttft_p50_s=percentile(ttfts, 50),
+                    ttft_p95_s=percentile(ttfts, 95),
+                    context_tokens=sum(context) / len(context) if context else 0.0,
+                    answer_tokens=sum(answer) / len(answer) if answer else 0.0,
+                )
+            )
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_stores: dict[str, RunResultStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store() -> RunResultStore:
+    path = _db_path()
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = RunResultStore(path)
+        return store
+
+
+def _session_header_text(*, created_at: str, header: Optional[str]) -> str:
+    text = f"timestamp: {created_at}\nsession: true\n"
+    if header:
+        text += f"header: {header.strip()}\n"
+    return text + "\n"
+
+
+def _record_text(*, created_at: str, question: str, answer: str, source: Optional[str]) -> str:
+    text = f"timestamp: {created_at}\n"
+    if source:
+        text += f"source: {source}\n"
+    return text + f"\nQuestion:\n{question.strip()}\n\nAnswer:\n{answer.strip()}\n"
+
+
+def _append_text(path: str, text: str) -> None:
+    # One write of the whole record under an exclusive lock: concurrent writers
+    # (batch_runner threads, parallel query_client runs) can't interleave lines.
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            f.write(text)
+            f.flush()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _new_text_session(*, header: Optional[str], session: bool) -> RunResult:
+    store = get_store()
+    os.makedirs(_run_result_dir(), exist_ok=True)
+    while True:
+        run_number = store.create_session(header=header)
+        path = os.path.join(_run_result_dir(), f"run_{run_number:04d}.txt")
+        try:
+            # "x": never append to a run_XXXX.txt that another store (RUN_RESULTS_DB)
+            # or an older run already numbered.
+            with open(path, "x", encoding="utf-8") as f:
+                if session:
+                    f.write(_session_header_text(created_at=_now(), header=header))
+        except FileExistsError:
+            store.delete_session(run_number)
+            store.skip_session_numbers(_max_run_file_number(_run_result_dir()))
+            continue
+        store.set_text_path(run_number, path)
+        return RunResult(path=path, run_number=run_number)
+
+
 def create_run_session_file(*, header: Optional[str] = None) -> RunResult:
-    """Create a new run_XXXX.txt file and return its path.
+    """Create a new session (store row + run_XXXX.txt) and return its text path.
 
     This is meant to be called once per `run.sh` execution. Individual query runs
-    should then append their Question/Answer records into this file via
+    should then append their Question/Answer records into this session via
     `RUN_RESULTS_PATH`.
     """
 
-    directory = _run_result_dir()
-    os.makedirs(directory, exist_ok=True)
-
-    run_number = _next_run_number(directory)
-    filename = f"run_{run_number:04d}.txt"
-    path = os.path.join(directory, filename)
-
-    now = datetime.now(timezone.utc).astimezone()
-
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(f"timestamp: {now.isoformat()}\n")
-        f.write("session: true\n")
-        if header:
-            f.write(f"header: {header.strip()}\n")
-        f.write("\n")
+    return _new_text_session(header=header, session=True)
 
-    return RunResult(path=path, run_number=run_number)
 
+def write_run_result(
+    *,
+    question: str,
+    answer: str,
+    source: Optional[str] = None,
+    timings: Optional[Mapping[str, float]] = None,
+    metrics: Optional[Mapping[str, Any]] = None,
+    sources: Sequence[str] = (),
+    error: Optional[str] = None,
+) -> RunResult:
+    """Record a query run result.
 
-def write_run_result(*, question: str, answer: str, source: Optional[str] = None) -> RunResult:
-    """Write a query run result.
+    The result is stored with its metrics (`timings["total"]` / `["ttft"]`,
+    token counts from `metrics`, retrieved `sources`) and appended as text to
+    the session's run_XXXX.txt.
 
-    Default behavior: creates a new `run_results/run_XXXX.txt` file per call.
+    Default behavior: each call is its own session with a new
+    `run_results/run_XXXX.txt` file.
 
-    Session behavior: if the env var `RUN_RESULTS_PATH` is set, appends the
-    result as a new record into that file. This enables one output file per
-    `run.sh` execution.
+    Session behavior: if the env var `RUN_RESULTS_PATH` is set, the result joins
+    that file's session. This enables one output file per `run.sh` execution.
     """
 
+    store = get_store()
     session_path = os.environ.get(_SESSION_PATH_ENV)
     if session_path:
-        os.makedirs(os.path.dirname(session_path), exist_ok=True)
-        now = datetime.now(timezone.utc).astimezone()
-        with open(session_path, "a", encoding="utf-8") as f:
-            f.write(_RECORD_DELIM)
-            f.write(f"timestamp: {now.isoformat()}\n")
-            if source:
-                f.write(f"source: {source}\n")
-            f.write("\n")
-            f.write("Question:\n")
-            f.write(question.strip())
-            f.write("\n\n")
-            f.write("Answer:\n")
-            f.write(answer.strip())
-            f.write("\n")
-
-        return RunResult(path=session_path, run_number=_parse_run_number_from_path(session_path))
-
-    directory = _run_result_dir()
-    os.makedirs(directory, exist_ok=True)
-
-    run_number = _next_run_number(directory)
-    filename = f"run_{run_number:04d}.txt"
-    path = os.path.join(directory, filename)
-
-    now = datetime.now(timezone.utc).astimezone()
-
+        run = RunResult(path=session_path, run_number=store.session_for_path(session_path))
+        delim = _RECORD_DELIM
+    else:
+        run = _new_text_session(header=None, session=False)
+        delim = ""
+
+    created_at = _now()
+    store.add_result(
+        run.run_number,
+        question=question,
+        answer=answer,
+        pipeline=source,
+        timings=timings or {},
+        metrics=metrics or {},
+        sources=sources,
+        error=error,
+        created_at=created_at,
+    )
+    _append_text(run.path, delim + _record_text(created_at=created_at, question=question, answer=answer, source=source))
+    return run
+
+
+def export_session_text(session_id: int, path: Optional[str] = None) -> str:
+    """Rewrite a session's run_XXXX.txt (or `path`) from the store; returns the path written."""
+    store = get_store()
+    meta = next((s for s in store.sessions(limit=1_000_000) if s["id"] == session_id), None)
+    if meta is None:
+        raise KeyError(f"No run session {session_id}")
+    path = path or meta["text_path"] or os.path.join(_run_result_dir(), f"run_{session_id:04d}.txt")
+    records = store.results(session_id)
+    parts = []
+    if meta["header"] is not None or len(records) != 1:
+        parts.append(_session_header_text(created_at=meta["created_at"], header=meta["header"]))
+    for i, r in enumerate(records):
+        text = _record_text(created_at=r["created_at"], question=r["question"], answer=r["answer"], source=r["pipeline"])
+        parts.append(text if i == 0 and not parts else _RECORD_DELIM + text)
     with open(path, "w", encoding="utf-8") as f:
-        f.write(f"timestamp: {now.isoformat()}\n")
-        if source:
-            f.write(f"source: {source}\n")
-        f.write("\n")
-        f.write("Question:\n")
-        f.write(question.strip())
-        f.write("\n\n")
-        f.write("Answer:\n")
-        f.write(answer.strip())
-        f.write("\n")
+        f.write("".join(parts))
+    return path
+
 
-    return RunResult(path=path, run_number=run_number)
+def _print_stats(stats: list[PipelineStats]) -> None:
+    print(
+        f"{'session':>7} {'pipeline':>10} {'runs':>5} {'errors':>6} {'p50_s':>7} {'p95_s':>7} "
+        f"{'ttft50':>7} {'ttft95':>7} {'ctx_tok':>8} {'ans_tok':>8}"
+    )
+    for s in stats:
+        print(
+            f"{s.session_id:>7} {s.pipeline:>10} {s.runs:>5} {s.errors:>6} {s.p50_s:>7.2f} {s.p95_s:>7.2f} "
+            f"{s.ttft_p50_s:>7.2f} {s.ttft_p95_s:>7.2f} {s.context_tokens:>8.0f} {s.answer_tokens:>8.0f}"
+        )
+
+
+def _print_compare(before: int, after: int) -> None:
+    stats = get_store().stats([before, after])
+    by_key = {(s.session_id, s.pipeline): s for s in stats}
+    print(f"{'pipeline':>10} {'metric':>14} {before:>10} {after:>10} {'change':>8}")
+    for pipeline in sorted({s.pipeline for s in stats}):
+        a, b = by_key.get((before, pipeline)), by_key.get((after, pipeline))
+        if a is None or b is None:
+            print(f"{pipeline:>10} {'(missing)':>14} {'-' if a is None else a.runs:>10} {'-' if b is None else b.runs:>10}")
+            continue
+        for metric in ("p50_s", "p95_s", "ttft_p50_s", "ttft_p95_s", "context_tokens", "answer_tokens"):
+            x, y = getattr(a, metric), getattr(b, metric)
+            change = f"{(y - x) / x * 100.0:+.0f}%" if x else "-"
+            print(f"{pipeline:>10} {metric:>14} {x:>10.2f} {y:>10.2f} {change:>8}")
 
 
 if __name__ == "__main__":
@@ -150,8 +512,23 @@ if __name__ == "__main__":
         required=False,
         help="Optional header line to write into the session file",
     )
+    parser.add_argument("--list", action="store_true", help="List recent sessions")
+    parser.add_argument("--stats", action="store_true", help="Latency / token percentiles per pipeline per session")
+    parser.add_argument("--sessions", help="Comma-separated session ids for --stats (default: all)")
+    parser.add_argument("--compare", nargs=2, type=int, metavar=("BEFORE", "AFTER"), help="Compare two sessions")
+    parser.add_argument("--export", type=int, metavar="SESSION", help="Rewrite a session's run_XXXX.txt from the store")
     args = parser.parse_args()
 
     if args.start_session:
         result = create_run_session_file(header=args.header)
         print(result.path)
+    if args.list:
+        for s in get_store().sessions():
+            print(f"{s['id']:>5} {s['created_at']} results={s['results']} {s['header'] or ''}".rstrip())
+    if args.stats:
+        ids = [int(x) for x in args.sessions.split(",") if x.strip()] if args.sessions else None
+        _print_stats(get_store().stats(ids))
+    if args.compare:
+        _print_compare(*args.compare)
+    if args.export is not None:
+        print(export_session_text(args.export))
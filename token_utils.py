@@ -0,0 +1,47 @@
+import os
+import threading
+from typing import Any, Optional
+
+from logger_factory import get_logger
+
+log = get_logger("token_utils")
+
+# Encoding shared by text-embedding-3-* and the gpt-4/5 family.
+_ENCODING_NAME = os.getenv("TOKEN_ENCODING", "cl100k_base")
+
+_encoding: Optional[Any] = None
+_encoding_failed = False
+_lock = threading.Lock()
+
+
+def _get_encoding() -> Optional[Any]:
+    global _encoding, _encoding_failed
+    if _encoding is not None or _encoding_failed:
+        return _encoding
+    with _lock:
+        if _encoding is None and not _encoding_failed:
+            try:
+                import tiktoken
+
+                _encoding = tiktoken.get_encoding(_ENCODING_NAME)
+            except Exception as e:
+                # tiktoken is optional and downloads its BPE file on first use;
+                # fall back to the ~4 chars/token estimate when it is unavailable.
+                _encoding_failed = True
+                log.debug("tiktoken unavailable (%s); estimating tokens as chars/4", e)
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Token count of `text` using a local tokenizer (no API calls)."""
+    if not text:
+        return 0
+    enc = _get_encoding()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return max(1, (len(text) + 3) // 4)
+
+
+def is_exact() -> bool:
+    """False when counts are chars/4 estimates rather than real tokenizer output."""
+    return _get_encoding() is not None
@@ -0,0 +1,221 @@
+"""Lightweight per-request tracing for the query pipelines.
+
+A `Trace` collects nested, timed spans with attributes (token counts, context
+size, cache hits, ...). When it finishes the spans go to the exporter selected
+by TRACE_EXPORTER:
+
+- `log` (default): one structured line per span through `logger_factory`
+- `otel`: replayed as OpenTelemetry spans (needs `opentelemetry-api`, plus an SDK
+  / exporter configured by the caller, e.g. via `opentelemetry-instrument`)
+- `none`: timings are still available via `Trace.timings()`, nothing is emitted
+
+    trace = Trace("graph_rag.query", trace_id=run_id)
+    with trace.span("embed") as span:
+        vec = embedder.embed_query(question)
+        span.set(question_tokens=count_tokens(question))
+    trace.finish()
+    trace.timings()  # {"embed": 0.21, "total": 0.21}
+
+`trace.mark("ttft")` records a point in time rather than a duration (here: when
+the first answer token arrived); it shows up in `timings()` next to the spans.
+"""
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+from config import settings
+from logger_factory import bind, get_logger
+
+log = get_logger("tracing")
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    duration_s: float = 0.0
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class Trace:
+    """Nested spans for one request; not shared across threads."""
+
+    def __init__(self, name: str, *, trace_id: Optional[str] = None, **attributes: Any):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.root = Span(name=name, span_id=_new_id(), parent_id=None, start_ns=time.time_ns(), attributes=dict(attributes))
+        self.spans: list[Span] = []
+        self._stack: list[Span] = [self.root]
+        self._t0 = time.perf_counter()
+        self._finished = False
+        # Points in time (seconds since the trace started), e.g. `ttft`.
+        self.marks: dict[str, float] = {}
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        parent = self._stack[-1]
+        span = Span(name=name, span_id=_new_id(), parent_id=parent.span_id, start_ns=time.time_ns(), attributes=dict(attributes))
+        self.spans.append(span)
+        self._stack.append(span)
+        t0 = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            span.duration_s = time.perf_counter() - t0
+            self._stack.pop()
+
+    def mark(self, name: str) -> float:
+        """Record `name` as happening now (first call wins); returns seconds since the trace started."""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self._t0
+            self.root.set(**{f"{name}_s": round(self.marks[name], 4)})
+        return self.marks[name]
+
+    def set(self, **attributes: Any) -> None:
+        """Attach attributes to the root span."""
+        self.root.set(**attributes)
+
+    @property
+    def total_s(self) -> float:
+        return self.root.duration_s if self._finished else time.perf_counter() - self._t0
+
+    def path(self, span: Span) -> str:
+        """Dotted span name from the first child of the root down to `span`."""
+        by_id = {s.span_id: s for s in self.spans}
+        parts = [span.name]
+        parent = by_id.get(span.parent_id or "")
+        while parent is not None:
+            parts.append(parent.name)
+            parent = by_id.get(parent.parent_id or "")
+        return ".".join(reversed(parts))
+
+    def timings(self) -> dict[str, float]:
+        """Span durations keyed by dotted path (`retrieve.expand`), marks, plus `total`."""
+        out: dict[str, float] = {}
+        for span in self.spans:
+            key = self.path(span)
+            out[key] = round(out.get(key, 0.0) + span.duration_s, 4)
+        for name, at in self.marks.items():
+            out[name] = round(at, 4)
+        out["total"] = round(self.total_s, 4)
+        return out
+
+    def attributes(self) -> dict[str, Any]:
+        """All span attributes flattened as `path.attr` (root attributes unprefixed)."""
+        out = dict(self.root.attributes)
+        for span in self.spans:
+            prefix = self.path(span)
+            for k, v in span.attributes.items():
+                out[f"{prefix}.{k}"] = v
+        return out
+
+    def finish(self) -> None:
+        if self._finished:
+            return
+        self.root.duration_s = time.perf_counter() - self._t0
+        self._finished = True
+        try:
+            get_exporter().export(self)
+        except Exception as e:  # tracing must never break a query
+            log.warning("Span export failed: %s", e)
+
+
+def _format_attrs(attributes: dict[str, Any]) -> str:
+    return " ".join(f"{k}={v}" for k, v in attributes.items())
+
+
+class LogSpanExporter:
+    """Emits each span as one log line: `span <path> <ms> k=v ...`."""
+
+    def __init__(self) -> None:
+        self.log = get_logger("tracing.spans")
+
+    def export(self, trace: Trace) -> None:
+        ctx = bind(self.log, run_id=trace.trace_id, op=trace.name)
+        for span in trace.spans:
+            ctx.info(
+                "span %s %0.1fms %s",
+                trace.path(span),
+                span.duration_s * 1000.0,
+                _format_attrs(span.attributes),
+                span_id=span.span_id,
+                parent_id=span.parent_id,
+            )
+        ctx.info("span %s %0.1fms %s", trace.name, trace.root.duration_s * 1000.0, _format_attrs(trace.root.attributes))
+
+
+class OTelSpanExporter:
+    """Replays finished spans through the OpenTelemetry API with their real timestamps."""
+
+    def __init__(self) -> None:
+        from opentelemetry import trace as otel_trace
+
+        self._otel = otel_trace
+        self.tracer = otel_trace.get_tracer("graph-rag-demo")
+
+    def export(self, trace: Trace) -> None:
+        def clean(attrs: dict[str, Any]) -> dict[str, Any]:
+            return {k: v if isinstance(v, (bool, int, float, str)) else str(v) for k, v in attrs.items()}
+
+        root_end = trace.root.start_ns + int(trace.root.duration_s * 1e9)
+        root = self.tracer.start_span(
+            trace.name, start_time=trace.root.start_ns, attributes=clean({"trace_id": trace.trace_id, **trace.root.attributes})
+        )
+        started = {trace.root.span_id: root}
+        for span in trace.spans:
+            parent = started.get(span.parent_id or "", root)
+            otel_span = self.tracer.start_span(
+                span.name,
+                context=self._otel.set_span_in_context(parent),
+                start_time=span.start_ns,
+                attributes=clean(span.attributes),
+            )
+            started[span.span_id] = otel_span
+        # Children first so every parent ends after its spans.
+        for span in reversed(trace.spans):
+            started[span.span_id].end(end_time=span.start_ns + int(span.duration_s * 1e9))
+        root.end(end_time=root_end)
+
+
+class NullSpanExporter:
+    def export(self, trace: Trace) -> None:
+        return None
+
+
+_exporter: Any = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> Any:
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            kind = settings.trace_exporter.strip().lower()
+            if kind in {"none", "off", "0"}:
+                _exporter = NullSpanExporter()
+            elif kind == "otel":
+                try:
+                    _exporter = OTelSpanExporter()
+                except ImportError:
+                    log.warning("TRACE_EXPORTER=otel but opentelemetry is not installed; logging spans instead")
+                    _exporter = LogSpanExporter()
+            else:
+                _exporter = LogSpanExporter()
+        return _exporter
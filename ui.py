@@ -3,10 +3,11 @@ from __future__ import annotations
 from contextlib import contextmanager
 import os
 import sys
-from typing import Iterator, Optional
+from typing import Callable, Iterator, Optional
 
 from rich.console import Console
 from rich import box
+from rich.live import Live
 from rich.panel import Panel
 from rich.progress import (
     BarColumn,
@@ -91,6 +92,52 @@ def print_qa_block(*, question: str, answer: str, title: str = "RESULT") -> None
     console.print()
 
 
+@contextmanager
+def stream_qa_block(*, question: str, title: str = "RESULT") -> Iterator[Callable[[str], None]]:
+    """Like `print_qa_block`, but the answer panel fills in as text arrives.
+
+    Yields a `write(delta)` callback; the final panel stays on screen when the
+    block exits.
+
+        with stream_qa_block(question=q, title="RAG") as write:
+            for delta in deltas:
+                write(delta)
+    """
+
+    console = get_console()
+    q = (question or "").strip()
+    parts: list[str] = []
+
+    def render() -> Panel:
+        a = "".join(parts).strip()
+        return Panel(
+            a or "[dim]waiting for the first token…[/dim]",
+            title="Answer",
+            border_style="green",
+            box=box.ROUNDED,
+            expand=True,
+        )
+
+    console.print()
+    console.rule(f"[bold]{title}[/bold]")
+    console.print(Panel(q, title="Question", border_style="cyan", box=box.ROUNDED, expand=True))
+    # Transient live view while streaming, then the final panel printed normally so
+    # the block looks the same on terminals and in captured output.
+    with Live(render(), console=console, refresh_per_second=12, transient=True) as live:
+
+        def write(delta: str) -> None:
+            if delta:
+                parts.append(delta)
+                live.update(render())
+
+        yield write
+    if not "".join(parts).strip():
+        parts.append("(empty)")
+    console.print(render())
+    console.rule()
+    console.print()
+
+
 def wait_for_enter(*, prompt: str = "Press Enter to continue…", env_var: str = "NO_PAUSE") -> None:
     """Wait for Enter in interactive terminals.
 